@@ -0,0 +1,226 @@
+"""
+adaptive.py - Adaptive stratified fault sampling with a convergence stop
+
+A fixed --runs budget is either more runs than the estimate needs or too
+few. With --margin, collect.py runs the campaign plan in rounds instead of
+all at once: the plan's faults are grouped into strata
+
+  register  x  bit range (fault_space.BANDS: 0-7, 8-15, 16-31, 32-63)
+            x  injection-time window (WINDOWS equal slices of the plan's points)
+
+and after a pilot of PILOT runs per stratum, every round goes to the strata
+whose next runs shrink the variance of the stratified benign/SDC/crash/hang
+estimate the most (Neyman-style greedy allocation). The campaign stops as
+soon as every outcome rate is known to within the margin (normal interval
+at CONFIDENCE), or when the plan (--runs, now a budget cap) is used up.
+
+  python3 collect.py native basicmath --mode checkpoint --margin 0.02
+  python3 collect.py marvin basicmath --margin 0.03
+
+Stratum weights are the strata's shares of the plan, which is itself drawn
+from the fault space, so the estimate is for the same space as a full
+campaign. Outcomes are logged to <store>/adaptive.jsonl, so a resumed
+campaign restores its statistics (and may continue with a smaller margin).
+A failed run goes back into its stratum's pool (RETRIES times, then it is
+given up and reported), so a stratum cannot drop out of the estimate unseen.
+"""
+
+import collections
+import heapq
+import json
+import math
+import os
+
+import fault_space
+
+CONFIDENCE = 0.95
+Z = {0.90: 1.6449, 0.95: 1.9600, 0.99: 2.5758}
+PILOT = 4      # runs per stratum before variance-based allocation
+WINDOWS = 5    # injection-time windows
+RETRIES = 2    # failed runs go back into their stratum's pool this often
+LOG_FILE = "adaptive.jsonl"
+
+
+def wilson(successes, n, z=Z[CONFIDENCE]):
+    """Wilson score interval (low, high) of a proportion"""
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+class Strata:
+    """Stratum key (reg, band, window) of a fault site (reg, bit, point or None)"""
+
+    def __init__(self, sites, windows=WINDOWS):
+        points = [point for _, _, point in sites if point is not None]
+        self.low, self.high = (min(points), max(points) + 1) if points else (0, 1)
+        self.windows = windows if points else 1
+
+    def key(self, site):
+        reg, bit, point = site
+        band = next(i for i, (lo, hi) in enumerate(fault_space.BANDS) if lo <= bit < hi)
+        window = 0 if point is None else (point - self.low) * self.windows // (self.high - self.low)
+        return reg, band, window
+
+    def describe(self, key):
+        reg, band, window = key
+        lo, hi = fault_space.BANDS[band]
+        text = f"x{reg} bits {lo}-{hi - 1}"
+        if self.windows > 1:
+            width = (self.high - self.low) / self.windows
+            text += f" @{self.low + window * width:.0f}-{self.low + (window + 1) * width:.0f}"
+        return text
+
+
+class AdaptiveSampler:
+    """
+    Round scheduler over a campaign plan. site(task) -> (reg, bit, point or
+    None); todo: the plan's tasks not run yet; log_path: outcome log
+    (appended; read back on resume)
+    """
+
+    def __init__(self, plan, todo, site, run_id, outcomes, margin, log_path,
+                 confidence=CONFIDENCE, pilot=PILOT, resumed=False):
+        self.run_id = run_id
+        self.outcomes = outcomes
+        self.margin = margin
+        self.z = Z[confidence]
+        self.pilot = pilot
+        self.strata = Strata([site(task) for task in plan])
+        self.key = {run_id(task): self.strata.key(site(task)) for task in plan}
+
+        sizes = collections.Counter(self.key.values())
+        self.weights = {key: count / len(plan) for key, count in sizes.items()}
+        self.pool = {key: collections.deque() for key in sizes}  # not run yet, plan order
+        for task in todo:
+            self.pool[self.key[run_id(task)]].append(task)
+        self.counts = {key: collections.Counter() for key in sizes}
+        self.n = collections.Counter()
+        self.attempts = collections.Counter()  # failures per run id
+        self.failed = collections.Counter()    # given-up runs per stratum
+
+        if resumed and os.path.exists(log_path):
+            done = set(self.key) - {run_id(task) for task in todo}
+            observed = {}
+            with open(log_path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        observed[record["run"]] = record["outcome"]  # last one wins (rerun after a crash)
+            for run, outcome in observed.items():
+                if run in done:
+                    self._count(run, outcome)
+        self.log = open(log_path, "a" if resumed else "w")
+
+    def _count(self, run, outcome):
+        key = self.key[run]
+        self.counts[key][outcome] += 1
+        self.n[key] += 1
+
+    def observe(self, task, outcome):
+        run = self.run_id(task)
+        self._count(run, outcome)
+        self.log.write(json.dumps({"run": run, "outcome": outcome}) + "\n")
+        self.log.flush()
+
+    def fail(self, task):
+        """A task of the last round failed: back into its pool, or given up after RETRIES"""
+        run = self.run_id(task)
+        self.attempts[run] += 1
+        if self.attempts[run] <= RETRIES:
+            self.pool[self.key[run]].appendleft(task)
+        else:
+            self.failed[self.key[run]] += 1
+
+    def close(self):
+        self.log.close()
+
+    # ----------------------------------------
+    # Allocation
+    # ----------------------------------------
+
+    def _spread(self, key, n):
+        """Sum over outcomes of p(1-p) with (x+1)/(n+2) smoothing (never 0)"""
+        return sum((self.counts[key][o] + 1) / (n + 2) * (1 - (self.counts[key][o] + 1) / (n + 2))
+                   for o in self.outcomes)
+
+    def _priority(self, key, n):
+        if n < self.pilot:
+            return (1, -n)  # pilot first, emptiest strata first
+        gain = self.weights[key] ** 2 * self._spread(key, n) * (1 / n - 1 / (n + 1))
+        return (0, gain)
+
+    def next_round(self, size):
+        """Up to `size` tasks for the next round, greedily by variance reduction"""
+        planned = collections.Counter()
+        heap = [(tuple(-x for x in self._priority(key, self.n[key])), key)
+                for key, pool in self.pool.items() if pool]
+        heapq.heapify(heap)
+        batch = []
+        while heap and len(batch) < size:
+            _, key = heapq.heappop(heap)
+            batch.append(self.pool[key].popleft())
+            planned[key] += 1
+            if self.pool[key]:
+                n = self.n[key] + planned[key]
+                heapq.heappush(heap, (tuple(-x for x in self._priority(key, n)), key))
+        return batch
+
+    def remaining(self):
+        return sum(len(pool) for pool in self.pool.values())
+
+    # ----------------------------------------
+    # Estimates
+    # ----------------------------------------
+
+    def estimate(self):
+        """{outcome: (rate, half width)} of the stratified estimate (sampled strata)"""
+        sampled = [key for key in self.weights if self.n[key]]
+        total = sum(self.weights[key] for key in sampled)
+        result = {}
+        for outcome in self.outcomes:
+            rate = variance = 0.0
+            for key in sampled:
+                w, n = self.weights[key] / total, self.n[key]
+                rate += w * self.counts[key][outcome] / n
+                p = (self.counts[key][outcome] + 1) / (n + 2)
+                variance += w * w * p * (1 - p) / n
+            result[outcome] = (rate, self.z * math.sqrt(variance)) if sampled else (0.0, 1.0)
+        return result
+
+    def converged(self):
+        """Pilot done everywhere (or stratum exhausted) and every rate within the margin"""
+        if any(self.n[key] < self.pilot and self.pool[key] for key in self.weights):
+            return False
+        return all(half <= self.margin for _, half in self.estimate().values())
+
+    def describe(self):
+        return (f"{len(self.weights)} strata (register x bit range x {self.strata.windows} windows), "
+                f"pilot {self.pilot}, stop at ±{self.margin:.1%} ({self.z:.2f} sigma)")
+
+    def report(self, widest=5):
+        """Summary lines: stratified estimate, then the strata with the widest intervals"""
+        lines = [f"Stratified estimate ({sum(self.n.values())} runs):"]
+        for outcome, (rate, half) in self.estimate().items():
+            lines.append(f"  - {outcome}: {rate:.2%} ± {half:.2%}")
+        intervals = []
+        for key in self.weights:
+            if self.n[key]:
+                width = max(high - low for low, high in
+                            (wilson(self.counts[key][o], self.n[key], self.z) for o in self.outcomes))
+                intervals.append((width, key))
+        if self.failed:
+            lines.append(f"Failed runs (given up after {RETRIES} retries, not in the estimate): "
+                         f"{sum(self.failed.values())} in {len(self.failed)} strata")
+            for key, count in self.failed.most_common(widest):
+                unsampled = " - no runs, stratum not in the estimate" if not self.n[key] else ""
+                lines.append(f"  {self.strata.describe(key):28s} failed={count}{unsampled}")
+        if intervals:
+            lines.append("Widest strata:")
+            for width, key in sorted(intervals, reverse=True)[:widest]:
+                rates = ", ".join(f"{o} {self.counts[key][o] / self.n[key]:.0%}" for o in self.outcomes)
+                lines.append(f"  {self.strata.describe(key):28s} n={self.n[key]:<4d} ±{width / 2:.1%}  ({rates})")
+        return lines
@@ -0,0 +1,224 @@
+"""
+aiocampaign.py - asyncio collection core for the exec-based collectors
+
+One event loop keeps FI_WORKERS target executions in flight (each pinned to a
+campaign core like campaign.py's workers), enforces a per-run deadline and
+turns every run into an outcome instead of dropping it:
+
+  benign : exit 0, stdout identical to the golden run
+  SDC    : exit 0, different stdout (silent data corruption)
+  crash  : non-zero exit or killed by a signal
+  hang   : deadline expired, process group killed (counts up to the kill)
+
+Runs are started with hpc.spawn_counted() rather than
+asyncio.create_subprocess_exec(): the counter group has to be attached while
+the child is still held before exec, which the asyncio API cannot do. Exit is
+awaited through a pidfd in the event loop, stdout through a read pipe.
+
+Environment overrides (plus campaign.py's FI_WORKERS / FI_CPUS / FI_ORDERED):
+  FI_TIMEOUT : per-run deadline in seconds (default 10)
+  FI_TRACE   : record per-interval counter traces, e.g. 100us (see hpc.py)
+"""
+
+import asyncio
+import collections
+import hashlib
+import os
+import signal
+
+import campaign
+import fault_plan
+import hpc
+
+OUTCOMES = ("benign", "SDC", "crash", "hang")
+OUTCOME_HEADER = campaign.HPC_HEADER + ["outcome", "exit_code", "signal"]
+
+def outcome_header(events=None):
+    """OUTCOME_HEADER for a campaign event set (hpc.campaign_events() by default)"""
+    return hpc.event_columns(events) + OUTCOME_HEADER[len(hpc.HPC_EVENTS):]
+
+
+# trace: per-interval counter deltas (hpc trace mode), None if not traced
+# echo: fault the tool reported applying (fault_plan.parse_echo), None if none
+RunResult = collections.namedtuple("RunResult", "counts status hung digest trace echo")
+
+
+def campaign_timeout():
+    return float(os.environ.get("FI_TIMEOUT", "10"))
+
+
+def describe():
+    """One-line summary for the collector banners"""
+    return f"asyncio, {campaign.describe()}, {campaign_timeout():g}s deadline"
+
+
+# ============================================
+# Outcomes
+# ============================================
+
+def exit_fields(status):
+    """Raw wait status -> (exit_code, signal); exit_code -1 if killed by a signal"""
+    if os.WIFSIGNALED(status):
+        return -1, os.WTERMSIG(status)
+    return os.WEXITSTATUS(status), 0
+
+
+HANG_SIGNAL = -1  # signal field of a run the C tools killed at their deadline (run_deadline.h)
+
+
+def classify_exit(exit_code, sig):
+    """Outcome from the exit alone (no stdout to compare): benign, crash, or hang (tool deadline)"""
+    if sig == HANG_SIGNAL:
+        return "hang"
+    return "crash" if sig or exit_code != 0 else "benign"
+
+
+def classify(result, golden_digest=None):
+    """Marvin's benign / SDC / crash, plus hang (see module docstring)"""
+    if result.hung:
+        return "hang"
+    outcome = classify_exit(*exit_fields(result.status))
+    if outcome == "benign" and golden_digest is not None and result.digest != golden_digest:
+        return "SDC"
+    return outcome
+
+
+def outcome_row(result, label, golden_digest=None):
+    """RunResult -> row of outcome_header()"""
+    return list(result.counts) + [label, classify(result, golden_digest), *exit_fields(result.status)]
+
+
+# ============================================
+# One run
+# ============================================
+
+async def _read_all(fd):
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, 'rb', 0))
+    try:
+        return await reader.read()
+    finally:
+        transport.close()
+
+
+async def _exited(pid):
+    """Wait (without reaping) until pid has exited"""
+    loop = asyncio.get_running_loop()
+    pidfd = os.pidfd_open(pid)
+    done = loop.create_future()
+    loop.add_reader(pidfd, lambda: done.done() or done.set_result(None))
+    try:
+        await done
+    finally:
+        loop.remove_reader(pidfd)
+        os.close(pidfd)
+
+
+async def run_one(argv, timeout=None, env=None, cpu=None, events=None):
+    """
+    Execute argv once with counters attached and a deadline.
+    Returns: RunResult(counts, status, hung, digest of stdout, trace, echo)
+    """
+    if timeout is None:
+        timeout = campaign_timeout()
+    trace = hpc.campaign_trace()
+
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    try:
+        pid, group = hpc.spawn_counted(argv, env, events, stdout=out_w, cpu=cpu, trace=trace, stderr=err_w)
+    except OSError:
+        os.close(out_r)
+        os.close(err_r)
+        raise
+    finally:
+        os.close(out_w)
+        os.close(err_w)
+
+    output = asyncio.ensure_future(_read_all(out_r))
+    errors = asyncio.ensure_future(_read_all(err_r))
+    hung = False
+    try:
+        await asyncio.wait_for(_exited(pid), timeout)
+    except asyncio.TimeoutError:
+        # Hang: kill the tool and its target together
+        hung = True
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    counts, status = hpc.reap_counted(pid, group, events)
+    try:
+        stdout = await asyncio.wait_for(output, timeout)
+    except asyncio.TimeoutError:
+        stdout = b""  # a grandchild kept the pipe open
+    try:
+        stderr = await asyncio.wait_for(errors, timeout)
+    except asyncio.TimeoutError:
+        stderr = b""
+    trace = group.trace if group is not None else None
+    echo = fault_plan.parse_echo(stderr.decode("utf-8", "replace"))
+    return RunResult(counts, status, hung, hashlib.sha1(stdout).hexdigest(), trace, echo)
+
+
+def golden_digest(argv, env=None):
+    """stdout digest of one fault-free run of argv (reference for SDC)"""
+    return asyncio.run(run_one(argv, env=env)).digest
+
+
+# ============================================
+# Campaign
+# ============================================
+
+async def _slot(cpu, make_run, tasks, results):
+    for i, task in tasks:
+        argv, env = make_run(task)
+        try:
+            result = await run_one(argv, env=env, cpu=cpu)
+        except Exception as e:
+            print(f"Error at run {task}: {e}")
+            result = None
+        await results.put((i, task, result))
+
+
+def run_campaign(make_run, tasks, workers=None, cpus=None, ordered=None):
+    """
+    Execute every task with a bounded number of concurrent runs.
+    make_run(task) -> (argv, env) describes the run (env None: inherit).
+    Yields (task, RunResult or None) pairs like campaign.run_campaign().
+    """
+    if cpus is None:
+        cpus = campaign.campaign_cpus()
+    if workers is None:
+        workers = campaign.campaign_workers(cpus)
+    if ordered is None:
+        ordered = campaign.campaign_ordered()
+
+    tasks = list(tasks)
+    loop = asyncio.new_event_loop()
+    try:
+        results = asyncio.Queue()
+        # Slots share one task iterator (single thread: no locking needed)
+        task_iter = enumerate(tasks)
+        slots = [loop.create_task(_slot(cpus[i % len(cpus)], make_run, task_iter, results))
+                 for i in range(workers)]
+
+        pending = {}
+        next_index = 0
+        for _ in range(len(tasks)):
+            i, task, result = loop.run_until_complete(results.get())
+            if not ordered:
+                yield task, result
+                continue
+            # Ordered: hold results back until all earlier tasks are done
+            pending[i] = (task, result)
+            while next_index in pending:
+                yield pending.pop(next_index)
+                next_index += 1
+
+        loop.run_until_complete(asyncio.gather(*slots))
+    finally:
+        loop.close()
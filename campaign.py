@@ -0,0 +1,237 @@
+"""
+campaign.py - Shared parallel campaign engine for the collect_*.py scripts
+
+Runs are fanned out over a process pool with one worker pinned per core
+(sched_setaffinity), so a campaign uses every (isolated) core of the Pi while
+each run still stays on a single core and the HPC counters are not polluted
+by core migration. Results are merged back in the parent, which is the only
+process that writes the CSV.
+
+Campaigns are resumable (open_campaign): the output store carries a
+manifest.json with the seed and the planned task list, and every committed
+chunk records the run ids it completed. Rerunning the same command skips
+those runs and appends the rest instead of starting over.
+
+Environment overrides:
+  FI_WORKERS : number of concurrent runs (default: one per campaign CPU)
+  FI_CPUS    : cores to pin workers on, e.g. "1-3" (default: isolated cores,
+               otherwise every core this process may run on)
+  FI_ORDERED : 1 = merge results in run order, 0 = as soon as they finish
+  FI_SEED    : seed for the planned fault list (default: random, recorded)
+  FI_FRESH   : 1 = discard an existing campaign in the output store
+"""
+
+import functools
+import json
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+
+import sample_store
+
+HPC_HEADER = ["cycles", "instructions", "cache_misses", "branch_misses", "label"]
+
+
+# ============================================
+# CPU selection
+# ============================================
+
+def parse_cpu_list(text):
+    """Parse a kernel style cpu list ("0,2-3") into a sorted list of ints"""
+    cpus = set()
+    for part in text.strip().split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+    return sorted(cpus)
+
+
+def isolated_cpus():
+    """Cores reserved with isolcpus= (empty list if none)"""
+    try:
+        with open("/sys/devices/system/cpu/isolated") as f:
+            return parse_cpu_list(f.read())
+    except OSError:
+        return []
+
+
+def campaign_cpus():
+    """Cores the workers are pinned to"""
+    if os.environ.get("FI_CPUS"):
+        return parse_cpu_list(os.environ["FI_CPUS"])
+    return isolated_cpus() or sorted(os.sched_getaffinity(0))
+
+
+def campaign_workers(cpus=None):
+    """Concurrency level (defaults to one worker per campaign core)"""
+    if os.environ.get("FI_WORKERS"):
+        return max(1, int(os.environ["FI_WORKERS"]))
+    return len(cpus if cpus is not None else campaign_cpus())
+
+
+def campaign_ordered():
+    return os.environ.get("FI_ORDERED", "1") != "0"
+
+
+def describe():
+    """One-line summary for the collector banners"""
+    cpus = campaign_cpus()
+    order = "ordered" if campaign_ordered() else "unordered"
+    return f"{campaign_workers(cpus)} workers on CPUs {cpus} ({order})"
+
+
+# ============================================
+# Worker pool
+# ============================================
+
+def _pin_worker(cpus):
+    """
+    Pool initializer: pin this worker (and everything it spawns) to one core,
+    round-robin by worker number (a worker the Pool respawns gets the next
+    number, so it never waits for a core)
+    """
+    cpu = cpus[(mp.current_process()._identity[0] - 1) % len(cpus)]
+    os.sched_setaffinity(0, {cpu})
+
+
+def _call(run_fn, task):
+    return task, run_fn(task)
+
+
+def run_campaign(run_fn, tasks, workers=None, cpus=None, ordered=None):
+    """
+    Execute run_fn(task) for every task on a pinned worker pool.
+    Yields (task, result) pairs; in ordered mode they come back in task order.
+
+    run_fn must be a module-level function (it is sent to the workers by name)
+    and should return plain data (e.g. a CSV row or None).
+    """
+    if cpus is None:
+        cpus = campaign_cpus()
+    if workers is None:
+        workers = campaign_workers(cpus)
+    if ordered is None:
+        ordered = campaign_ordered()
+
+    # Always fork: workers inherit the collector's configuration and the
+    # collect_*.py scripts are not import-safe under spawn/forkserver.
+    ctx = mp.get_context("fork")
+
+    # Round-robin cores over workers (more workers than cores share cores)
+    with ctx.Pool(workers, initializer=_pin_worker, initargs=(list(cpus),)) as pool:
+        call = functools.partial(_call, run_fn)
+        results = pool.imap(call, tasks) if ordered else pool.imap_unordered(call, tasks)
+        for task, result in results:
+            yield task, result
+
+
+# ============================================
+# Resumable campaigns
+# ============================================
+
+def run_id(task):
+    """Run id of a planned task: the task itself, or its first field"""
+    return task[0] if isinstance(task, (tuple, list)) else task
+
+
+def _manifest_path(store_path):
+    return os.path.join(store_path, "manifest.json")
+
+
+def open_campaign(store_path, make_plan, config, header=sample_store.DEFAULT_HEADER, kinds=None,
+                  trace_columns=None, **defaults):
+    """
+    Start or resume the campaign writing to store_path.
+    make_plan(rng) -> list of tasks (JSON-serializable; see run_id()), drawn
+    from the seeded rng so the plan is reproducible. config: dict that must
+    match for a rerun to count as the same campaign (benchmark, runs, mode).
+    Returns: (writer, plan, todo) - writer is a durable SampleWriter, todo
+    the tasks not completed yet (in plan order). kinds, trace_columns: see SampleWriter
+    """
+    manifest = None
+    if os.environ.get("FI_FRESH", "0") != "1" and os.path.exists(_manifest_path(store_path)):
+        with open(_manifest_path(store_path)) as f:
+            manifest = json.load(f)
+        if manifest["config"] != config:
+            print(f"Error: {store_path} holds a different campaign ({manifest['config']}).")
+            print("Rerun with FI_FRESH=1 to discard it, or use another benchmark/output.")
+            sys.exit(1)
+
+    if manifest is None:
+        seed = int(os.environ.get("FI_SEED", random.randrange(2 ** 32)))
+        manifest = {
+            "config": config,
+            "seed": seed,
+            "argv": sys.argv,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "plan": make_plan(random.Random(seed)),
+        }
+        writer = sample_store.SampleWriter(store_path, header=header, mode="w",
+                                           durable=True, track_runs=True, kinds=kinds,
+                                           trace_columns=trace_columns,
+                                           **defaults)
+        # Manifest after the (emptied) store: a crash in between only loses the plan
+        tmp = _manifest_path(store_path) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, _manifest_path(store_path))
+    else:
+        writer = sample_store.SampleWriter(store_path, header=header, mode="a",
+                                           durable=True, track_runs=True, kinds=kinds,
+                                           trace_columns=trace_columns,
+                                           **defaults)
+
+    # JSON turned tuples into lists
+    plan = [tuple(task) if isinstance(task, list) else task for task in manifest["plan"]]
+    todo = [task for task in plan if run_id(task) not in writer.completed]
+    write_status(store_path, "running")
+    return writer, plan, todo
+
+
+def _status_path(store_path):
+    return os.path.join(store_path, "collector.json")
+
+
+def write_status(store_path, state):
+    """
+    <store>/collector.json: pid and state of the collector writing the store
+    ("running", then "done", "converged" or "budget" once it stops early);
+    read by detector.py --follow
+    """
+    tmp = _status_path(store_path) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"pid": os.getpid(), "state": state, "time": time.strftime("%Y-%m-%d %H:%M:%S")}, f)
+    os.replace(tmp, _status_path(store_path))
+
+
+def collector_stopped(store_path):
+    """The store's collector reached a final state or exited (None: no status written)"""
+    try:
+        with open(_status_path(store_path)) as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if status["state"] != "running":
+        return True
+    try:
+        os.kill(status["pid"], 0)
+    except ProcessLookupError:
+        return True  # killed or crashed without a final state
+    except PermissionError:
+        pass
+    return False
+
+
+def describe_resume(plan, todo):
+    """Banner line for open_campaign()"""
+    done = len(plan) - len(todo)
+    return f"resuming, {done}/{len(plan)} runs already done" if done else "new campaign"
@@ -0,0 +1,895 @@
+"""
+collect.py - Unified collector: one entry point for every injection method
+
+  python3 collect.py <method> [benchmark] [--runs N] [--mode MODE] [--counters perf|rusage]
+                     [--events SET] [--trace INTERVAL] [--sites uniform|live|pruned] [--margin M]
+                     [--cache N]
+  python3 collect.py --list
+
+The injection method (pure run, ptrace runner, ptrace injector, GDB, software
+FI) is a plugin registered in METHODS; the counter backend is hpc.py's
+(--counters / FI_COUNTERS). Every method runs on the same execution core:
+resumable campaign (campaign.open_campaign), pinned workers, outcome columns,
+progress and summary. A method only describes its runs:
+
+  async              : argv/env of one run, executed by aiocampaign.py
+                       (per-run deadline, SDC against a golden run)
+  forkserver / gdb   : run_task(task) on a pinned campaign worker
+  batch / checkpoint : run_chunk(tasks), one tool process per chunk
+
+The old collect_*.py scripts are thin wrappers around main().
+Mode defaults come from FI_CHECKPOINT / FI_BATCH / FI_FORKSERVER as before.
+--sites live / pruned (FI_SITES) draws native faults from the binary's
+fault-space index (fault_space.py) instead of uniformly.
+--margin (FI_MARGIN) runs the plan in adaptive stratified rounds and stops
+once the outcome rates are known to within the margin (adaptive.py).
+--cache N (FI_CACHE) measures every deterministic fault spec N times and
+serves repeated specs from an on-disk result cache (result_cache.py).
+"""
+
+import argparse
+import collections
+import os
+import subprocess
+import sys
+
+import adaptive
+import aiocampaign
+import campaign
+import fault_plan
+import fault_space
+import forkserver
+import gdb_pool
+import hpc
+import native_batch
+import result_cache
+
+# ============================================
+# Configuration
+# ============================================
+TOTAL_RUNS = 3000
+BATCH_CHUNK = 100  # runs per batch-mode tool process
+CKPT_CHUNK = 100   # faults sharing one golden run
+ROUND_RUNS = 200   # runs per adaptive round (at least one chunk per worker)
+
+BENCHMARKS = {
+    "basicmath": "./basicmath_bench",
+    "qsort": "./qsort_bench",
+    "sha": "./sha_bench",
+    "target": "./target_app"
+}
+
+CHUNKED_MODES = {"batch": BATCH_CHUNK, "checkpoint": CKPT_CHUNK}
+
+METHODS = {}
+
+Phase = collections.namedtuple("Phase", "output config label env")
+
+
+def register(cls):
+    """Class decorator: make a Method available as `collect.py <cls.name>`"""
+    METHODS[cls.name] = cls
+    return cls
+
+
+def sample(counts, label, outcome, exit_code, sig, **meta):
+    """
+    One sample row (outcome_header() columns + run metadata) as a dict.
+    counts None (e.g. a GDB run that never reached main): the row is still
+    stored with its outcome and counted=0, so its counter columns (0 in the
+    store) are not read as measured zeros (features.counted_mask)
+    """
+    if counts is None:
+        row = dict.fromkeys(hpc.event_columns(), None)
+        meta = dict(meta, counted=0)
+    else:
+        row = dict(zip(hpc.event_columns(), counts))
+    row.update(label=label, outcome=outcome, exit_code=exit_code, signal=sig, **meta)
+    return row
+
+
+# ============================================
+# Methods
+# ============================================
+
+class Method:
+    """
+    Base class of the injection methods (see module docstring).
+    modes: mode -> tool run in front of the target (None: target itself)
+    """
+
+    name = None
+    collector = None      # "collector" key of the campaign manifest
+    title = None
+    label = 0
+    output = None         # store path, {benchmark} filled in
+    modes = {"async": None}
+    site_modes = ()       # modes that take explicit fault sites (--sites live)
+    default_benchmark = "basicmath"
+    build_hint = "make all"
+
+    def __init__(self, benchmark, runs=TOTAL_RUNS, mode=None):
+        self.benchmark = benchmark
+        self.runs = runs
+        self.mode = mode or self.default_mode()
+        self.tool = self.modes[self.mode]
+        self.target = BENCHMARKS[benchmark]
+        self.phase = None
+        self.margin = float(os.environ["FI_MARGIN"]) if os.environ.get("FI_MARGIN") else None
+        self.repeats = int(os.environ.get("FI_CACHE") or 0)
+        self.cache = None
+
+    def default_mode(self):
+        for mode, switch in (("checkpoint", "FI_CHECKPOINT"), ("batch", "FI_BATCH"),
+                             ("forkserver", "FI_FORKSERVER")):
+            if mode in self.modes and os.environ.get(switch, "0") == "1":
+                return mode
+        return next(iter(self.modes))
+
+    def binaries(self):
+        return [self.target] + ([self.tool] if self.tool else [])
+
+    def phases(self):
+        """Campaigns to run, one output store each"""
+        return [Phase(self.output.format(benchmark=self.benchmark), {}, self.label, None)]
+
+    def config(self, phase):
+        """Campaign identity stored in the manifest (see campaign.open_campaign)"""
+        config = {"collector": self.collector, "benchmark": self.benchmark, "runs": self.runs}
+        config.update(phase.config)
+        if len(self.modes) > 1:
+            config["mode"] = self.mode
+        if hpc.backend() != "perf":
+            config["counters"] = hpc.backend()  # no resume mixing rusage stand-in and perf rows
+        if hpc.campaign_events() != hpc.HPC_EVENTS:
+            config["events"] = list(hpc.campaign_events())
+        if hpc.campaign_trace():
+            config["trace"] = os.environ["FI_TRACE"]
+        if self.margin is not None:
+            config["adaptive"] = True  # not the margin: a resumed campaign may tighten it
+        return config
+
+    def make_plan(self, rng):
+        return list(range(1, self.runs + 1))
+
+    def explicit_sites(self):
+        """Plans name the fault site of every task (site()), needed by --margin"""
+        return False
+
+    def site(self, task):
+        """
+        (reg, bit, point or None) a task injects, read from fault_fields();
+        None if the task names no flip (explicit_sites() is then False)
+        """
+        fields = self.fault_fields(task)
+        if fields.get("reg", fault_plan.NO_FLIP) == fault_plan.NO_FLIP:
+            return None
+        return fields["reg"], fields["bit"], fields.get("point")
+
+    def cache_spec(self, task):
+        """Deterministic fault a task injects (result_cache.py key), None: never cached"""
+        return None
+
+    def cache_context(self, phase):
+        """Everything besides the fault spec a run's result depends on"""
+        return {"method": self.collector, "mode": self.mode, "label": phase.label, "phase": phase.config,
+                "counters": hpc.backend(), "events": list(hpc.campaign_events()),
+                "trace": os.environ["FI_TRACE"] if hpc.campaign_trace() else None}
+
+    def banner(self):
+        """Method-specific banner lines"""
+        return []
+
+    def record(self, task, rows):
+        """Called in the parent for every finished task (before its rows are committed)"""
+
+    def close(self):
+        pass
+
+    # ----------------------------------------
+    # async mode
+    # ----------------------------------------
+
+    def argv(self, task):
+        return ([self.tool] + self.tool_args(task) if self.tool else []) + [self.target]
+
+    def make_run(self, task):
+        return self.argv(task), self.phase.env
+
+    def tool_args(self, task):
+        """Tool options carrying the task's planned fault ([]: the tool draws its own)"""
+        return []
+
+    def fault_fields(self, task):
+        """Extra columns of a task's rows (the planned fault)"""
+        return {}
+
+    def check_echo(self, task, echo):
+        """False if the tool reports a different fault than planned (the run is retried)"""
+        return True
+
+    def golden_env(self):
+        """Environment of the fault-free reference run (SDC detection)"""
+        return self.phase.env
+
+    # ----------------------------------------
+    # forkserver / gdb modes (pinned campaign workers)
+    # ----------------------------------------
+
+    def run_task(self, task):
+        """One task -> list of sample rows, None if it failed (retried on resume)"""
+        try:
+            counts, status, echo, hung = forkserver.run_attached(self.target, tool=self.tool,
+                                                                 args=self.tool_args(task))
+        except Exception as e:
+            print(f"Error at run {task}: {e}")
+            return None
+        if echo is not None and not self.check_echo(task, echo):
+            print(f"Error at run {task}: tool applied {echo}")
+            return None
+        exit_code, sig = aiocampaign.exit_fields(status)
+        kind = "hang" if hung else aiocampaign.classify_exit(exit_code, sig)
+        return [sample(counts, self.phase.label, kind, exit_code, sig,
+                       run=campaign.run_id(task), **self.fault_fields(task))]
+
+    # ----------------------------------------
+    # batch / checkpoint modes (one tool process per chunk)
+    # ----------------------------------------
+
+    def batch_spec(self, task):
+        """Batch tool spec (run, reg, bit, delay_us) of a task, None: the tool draws (-c)"""
+        return None
+
+    def run_chunk(self, chunk):
+        """Batch mode: chunk of tasks -> sample rows (None if the chunk failed)"""
+        specs = [self.batch_spec(task) for task in chunk]
+        if None in specs:
+            specs = None
+            tasks = {i: task for i, task in enumerate(chunk, 1)}  # tool counts runs from 1
+        else:
+            tasks = {campaign.run_id(task): task for task in chunk}
+        rows = []
+        try:
+            for record in native_batch.stream_batch(self.tool, self.target, runs=len(chunk), specs=specs):
+                if "error" in record:
+                    raise ValueError(f"tool rejected run {record['run']}: {record['error']}")
+                task = tasks[record["run"]]
+                echo = {name: record[name] for name in ("run", "reg", "bit")}
+                if specs is not None and not self.check_echo(task, echo):
+                    raise ValueError(f"tool applied {echo} for {task}")
+                row = native_batch.hpc_row(record, self.phase.label)
+                row["run"] = campaign.run_id(task)
+                row.update(self.fault_fields(task))
+                rows.append(row)
+        except Exception as e:
+            print(f"Error in batch chunk: {e}")
+            return None
+        return rows
+
+
+@register
+class Normal(Method):
+    name = "normal"
+    collector = "normal"
+    title = "Normal Data Collection"
+    output = "data/normal_{benchmark}.store"
+
+
+@register
+class PureNormal(Method):
+    name = "pure"
+    collector = "pure_normal"
+    title = "Pure Normal Execution (NO ptrace)"
+    output = "data/pure_normal_{benchmark}.store"
+
+
+class Native(Method):
+    """
+    ptrace tools of the simple_injector family, driven by a seeded fault
+    plan (fault_plan.py): every task is (run_id, point, reg, bit), handed to
+    the tool and echoed back with the outcome
+    """
+    flips = True
+
+    def make_plan(self, rng):
+        trigger = "delay_us" if self.mode == "batch" else "insn"
+        return fault_plan.uniform(rng, self.runs, trigger, flip=self.flips)
+
+    def explicit_sites(self):
+        return self.flips
+
+    def tool_args(self, task):
+        return fault_plan.tool_args(task)
+
+    def batch_spec(self, task):
+        return fault_plan.batch_spec(task)
+
+    def check_echo(self, task, echo):
+        return fault_plan.matches(task, echo)
+
+    def fault_fields(self, task):
+        fields = dict(zip(("point", "reg", "bit", "weight"), task[1:]))
+        if not self.flips:
+            del fields["reg"], fields["bit"]
+        return fields
+
+    def cache_spec(self, task):
+        # batch triggers after a delay (us): the same spec is a different fault every time
+        return tuple(task[1:4]) if self.flips and self.mode != "batch" else None
+
+
+@register
+class PtraceRunner(Native):
+    """Same trigger as simple_injector, no flip (label=0: normal)"""
+    name = "ptrace"
+    collector = "ptrace_normal"
+    title = "Ptrace Normal Execution (with ptrace overhead)"
+    output = "data/ptrace_normal_{benchmark}.store"
+    modes = {"async": "./simple_runner",
+             "forkserver": "./simple_runner",
+             "batch": "./simple_runner_fast"}
+    flips = False
+
+
+@register
+class PtraceInjector(Native):
+    """Exact instruction trigger via counter overflow (label=3: ptrace native)"""
+    name = "native"
+    collector = "native_fault"
+    title = "Native Fault Injection (ptrace)"
+    label = 3
+    output = "data/faulty_{benchmark}_native.store"
+    modes = {"async": "./simple_injector",
+             "forkserver": "./simple_injector",
+             "batch": "./simple_injector_fast",
+             "checkpoint": "./simple_injector_ckpt"}
+    # exec-relative instruction counts, like the index (forkserver counts from main)
+    site_modes = ("async", "checkpoint")
+
+    def __init__(self, benchmark, runs=TOTAL_RUNS, mode=None):
+        super().__init__(benchmark, runs, mode)
+        self.sites = os.environ.get("FI_SITES", "uniform")
+        self.index = fault_space.load_index(self.target) if self.sites != "uniform" else None
+        self.space = fault_space.PrunedSpace(self.index) if self.sites == "pruned" and self.index else None
+
+    def config(self, phase):
+        config = super().config(phase)
+        if self.index is not None:
+            config["sites"] = f"{self.sites}:{self.index['hash'][:16]}"
+        return config
+
+    def banner(self):
+        if self.index is None:
+            return []
+        lines = [f"Sites: {self.sites} ({fault_space.describe(self.index)})"]
+        if self.space is not None:
+            lines.append(f"Pruned: {self.space.describe()}")
+            if self.runs >= self.space.classes:
+                lines.append(f"  every class fits the budget: {self.space.classes} runs (exhaustive)")
+        return lines
+
+    def make_plan(self, rng):
+        """
+        (run_id, point, reg, bit) faults - uniform, or live sites - or
+        (run_id, point, reg, bit, weight) def-use class representatives
+        """
+        if self.space is not None:
+            # One run per def-use class, its outcome counts `weight` sites
+            return [(run_id, *fault) for run_id, fault in enumerate(self.space.draw(rng, self.runs), 1)]
+        if self.index is not None:
+            # Only sites whose bits are read later (dead registers are trivially benign)
+            sampler = fault_space.SiteSampler(self.index)
+            return [(run_id, *sampler.draw(rng)) for run_id in range(1, self.runs + 1)]
+        # Same window as simple_injector's own draw (10K~60K), x0~x7, bit 0~63
+        return super().make_plan(rng)
+
+    def run_chunk(self, chunk):
+        if self.mode != "checkpoint":
+            return super().run_chunk(chunk)
+
+        # One golden run for the whole chunk of (run_id, point, reg, bit) faults
+        faults = "".join(f"{point} {reg} {bit}\n" for _, point, reg, bit, *_ in chunk)
+        try:
+            result = subprocess.run([self.tool, self.target], input=faults.encode(),
+                                    stdout=subprocess.PIPE,
+                                    timeout=aiocampaign.campaign_timeout() * (len(chunk) + 1))
+            output = result.stdout
+            if result.returncode != 0:
+                print(f"Error in checkpoint chunk: {self.tool} exited with {result.returncode}")
+        except subprocess.TimeoutExpired as e:
+            print(f"Error in checkpoint chunk: {self.tool} timed out")
+            output = e.stdout or b""
+        except Exception as e:
+            print(f"Error in checkpoint chunk: {e}")
+            return None
+
+        # id,instructions,reg,bit,exit_code,signal,cycles,instructions,cache_misses,branch_misses
+        # Only the faults that came back get rows; the rest are retried on the next start
+        rows = []
+        for line in output.decode('utf-8').splitlines():
+            parts = line.split(',')
+            if len(parts) == 10:
+                exit_code, sig = int(parts[4]), int(parts[5])
+                # id = position in this chunk's fault list; point/reg/bit as the tool applied them
+                fault = chunk[int(parts[0])]
+                echo = {"point": int(parts[1]), "reg": int(parts[2]), "bit": int(parts[3])}
+                if not self.check_echo(fault, echo):
+                    print(f"Error in checkpoint chunk: tool applied {echo} for {fault}")
+                    return None
+                fields = dict(self.fault_fields(fault), **echo)
+                rows.append(sample([int(p) for p in parts[6:]], self.label,
+                                   aiocampaign.classify_exit(exit_code, sig), exit_code, sig,
+                                   run=fault[0], **fields))
+        return rows
+
+
+@register
+class GdbNormal(Method):
+    """GDB run WITHOUT bit-flip (break main, run, next x3, continue)"""
+    name = "gdb"
+    collector = "gdb_normal"
+    title = "GDB Normal Execution (NO bit-flip)"
+    output = "data/gdb_normal_{benchmark}.store"
+    modes = {"gdb": None}
+
+    def flip(self, task):
+        """(register, bit) to flip for a task, None for no flip"""
+        return None, None
+
+    def run_task(self, task):
+        """One run on this worker's persistent GDB/MI session"""
+        reg, bit = self.flip(task)
+        try:
+            outcome, counts = gdb_pool.get_session(self.target).run(reg, bit)
+        except Exception as e:
+            print(f"Error at run {task}: {e}")
+            return None
+        exit_code, sig = gdb_pool.exit_fields(outcome)
+        kind = "hang" if outcome == "hang" else aiocampaign.classify_exit(exit_code, sig)
+        meta = {"run": campaign.run_id(task)}
+        if reg is not None:
+            meta.update(reg=int(reg[1:]), bit=bit)
+        return [sample(counts, self.phase.label, kind, exit_code, sig, **meta)]
+
+
+@register
+class GdbFault(GdbNormal):
+    """Random register bit-flip through GDB (label=2, formerly collect_fault.py)"""
+    name = "gdb-fault"
+    collector = "gdb_fault"
+    title = "GDB Fault Injection"
+    label = 2
+    output = "data/faulty_{benchmark}_gdb.store"
+    default_benchmark = "target"
+    registers = ["x0", "x1", "x2", "x3", "x4", "x5"]
+
+    def make_plan(self, rng):
+        return [(run_id, rng.choice(self.registers), rng.randint(0, 63))
+                for run_id in range(1, self.runs + 1)]
+
+    def flip(self, task):
+        return task[1], task[2]
+
+    def explicit_sites(self):
+        return True
+
+    def site(self, task):
+        return int(task[1][1:]), task[2], None  # always the same point (after main)
+
+    def cache_spec(self, task):
+        return task[1], task[2]
+
+
+@register
+class Marvin(GdbFault):
+    """
+    Marvin-style campaign: NUM_RUNS_PER_FAULT runs per fault, classified
+    per fault (benign / SDC / crash / hang) and logged like Marvin
+    """
+    name = "marvin"
+    collector = "marvin"
+    title = "Marvin-style Fault Injection Data Collection"
+    label = 1
+    output = "data/faulty_{benchmark}_marvin.store"
+    default_benchmark = "basicmath"
+    registers = ["x0", "x1", "x2", "x3", "x4", "x5", "x6", "x7"]
+    runs_per_fault = 1
+    log_file = None
+
+    def config(self, phase):
+        config = super().config(phase)
+        config["faults"] = config.pop("runs")
+        return config
+
+    def make_plan(self, rng):
+        return [(fault_id, rng.choice(self.registers), rng.randint(0, 63))
+                for fault_id in range(self.runs)]
+
+    def cache_spec(self, fault):
+        return (*super().cache_spec(fault), self.runs_per_fault)
+
+    def banner(self):
+        return [f"Runs per fault: {self.runs_per_fault}",
+                f"Log: data/fault_log_{self.benchmark}_marvin.txt"]
+
+    def run_task(self, fault):
+        runs = []
+        for _ in range(self.runs_per_fault):
+            rows = super().run_task(fault)
+            if rows is None:
+                return None  # GDB failure: retried on resume
+            runs.extend(rows)
+            if rows[0]["outcome"] != "benign":
+                break  # Crash occurred
+
+        # Marvin's classification: all clean = benign, none clean = crash/hang,
+        # some clean = SDC
+        clean = sum(1 for row in runs if row["outcome"] == "benign")
+        if clean == 0:
+            outcome = runs[-1]["outcome"]
+        elif clean == self.runs_per_fault:
+            outcome = "benign"
+        else:
+            outcome = "SDC"
+        for row in runs:
+            row["outcome"] = outcome  # outcome of the whole fault
+        return runs
+
+    def record(self, fault, rows):
+        if self.log_file is None:
+            log_path = f"data/fault_log_{self.benchmark}_marvin.txt"
+            # A resumed campaign keeps the log of the faults already done
+            self.log_file = open(log_path, mode='a' if self.resumed else 'w')
+        fault_id, target_reg, bit_pos = fault
+        self.log_file.write(f"{fault_id}: reg: {target_reg} pos: {bit_pos}\n")
+        self.log_file.write(f"{rows[0]['outcome']}\n")
+
+    def close(self):
+        if self.log_file is not None:
+            self.log_file.close()
+
+
+@register
+class SoftwareFI(Method):
+    """ENABLE_FAULT compiled into the benchmark: normal and fault store"""
+    name = "software-fi"
+    collector = "software_fi"
+    title = "Software-based Fault Injection"
+    build_hint = "gcc -DBENCHMARK=1 example_benchmark_with_fi.c -o basicmath_bench_fi -lm"
+
+    def __init__(self, benchmark, runs=TOTAL_RUNS, mode=None):
+        super().__init__(benchmark, runs, mode)
+        self.target = "./basicmath_bench_fi"
+
+    def phases(self):
+        return [Phase(f"data/software_{kind}_{self.benchmark}.store",
+                      {"enable_fault": enable_fault}, enable_fault,
+                      dict(os.environ, ENABLE_FAULT=str(enable_fault)))
+                for kind, enable_fault in (("normal", 0), ("fault", 1))]
+
+    def golden_env(self):
+        # SDC 기준 출력 (ENABLE_FAULT=0 golden run), also for the fault store
+        return dict(os.environ, ENABLE_FAULT="0")
+
+
+# ============================================
+# Shared execution core
+# ============================================
+
+_method = None  # inherited by the forked campaign workers
+
+
+def _run_task(task):
+    return _method.run_task(task)
+
+
+def _run_chunk(chunk):
+    return _method.run_chunk(chunk)
+
+
+def execute(method):
+    """
+    Yield (tasks, rows or None) for the current phase's todo list; with a
+    result cache, repeated fault specs are run once (per repeat) and served
+    """
+    cache = method.cache
+    if cache is None:
+        yield from run_tasks(method, method.todo)
+        return
+    pending = method.todo
+    while pending:
+        hits, misses, pending = cache.split(pending)
+        for task in hits:
+            yield [task], cache.serve(task, **method.fault_fields(task))
+        if not misses:
+            break  # nothing deferred either
+        for tasks, rows in run_tasks(method, misses):
+            if rows is not None:
+                cache.add(tasks, rows)
+            yield tasks, rows
+
+
+def run_tasks(method, todo):
+    """Yield (tasks, rows or None) of actually executed tasks"""
+    if method.mode == "async":
+        # Reference stdout for SDC: one fault-free run of the target itself
+        golden = aiocampaign.golden_digest([method.target], method.golden_env())
+        for task, result in aiocampaign.run_campaign(method.make_run, todo):
+            if result is None:
+                yield [task], None
+                continue
+            if result.echo is not None and not method.check_echo(task, result.echo):
+                print(f"Error at run {task}: tool applied {result.echo}")
+                yield [task], None
+                continue
+            row = dict(zip(aiocampaign.outcome_header(), aiocampaign.outcome_row(
+                result, method.phase.label, golden)), run=campaign.run_id(task))
+            row.update(method.fault_fields(task))
+            if result.trace is not None:
+                row["trace"] = result.trace
+            yield [task], [row]
+    elif method.mode in CHUNKED_MODES:
+        size = CHUNKED_MODES[method.mode]
+        chunks = [todo[i:i + size] for i in range(0, len(todo), size)]
+        for chunk, rows in campaign.run_campaign(_run_chunk, chunks):
+            yield chunk, rows
+    else:
+        for task, rows in campaign.run_campaign(_run_task, todo):
+            yield [task], rows
+
+
+def collect_phase(method, phase):
+    """Run (or resume) one campaign; returns the outcome counts of this session"""
+    writer, plan, todo = campaign.open_campaign(
+        phase.output, method.make_plan, method.config(phase),
+        header=aiocampaign.outcome_header(), kinds=dict.fromkeys(hpc.event_columns(), "u64"),
+        trace_columns=hpc.trace_columns() if hpc.campaign_trace() else None,
+        benchmark=method.benchmark)
+    method.phase = phase
+    method.todo = todo
+    method.resumed = len(todo) < len(plan)
+    print(f"Output: {phase.output}")
+    print(f"Campaign: {campaign.describe_resume(plan, todo)}")
+    sampler = None
+    if method.margin is not None:
+        sampler = adaptive.AdaptiveSampler(plan, todo, method.site, campaign.run_id, aiocampaign.OUTCOMES,
+                                           method.margin, os.path.join(phase.output, adaptive.LOG_FILE),
+                                           resumed=method.resumed)
+        print(f"Adaptive: {sampler.describe()}")
+    method.cache = None
+    if method.repeats:
+        key = result_cache.cache_key(method.cache_context(phase), method.binaries())
+        method.cache = result_cache.ResultCache(key, method.cache_spec, campaign.run_id, method.repeats)
+        print(f"Cache: {method.cache.describe()}")
+    print()
+
+    outcomes = collections.Counter()
+    state = "done"
+    with writer:
+        done = len(plan) - len(todo)
+        success_count = 0
+        while True:
+            if sampler is not None:
+                # Next round, or stop: converged / plan used up
+                if sampler.converged():
+                    state = "converged"
+                    print(f"✓ Converged: every outcome rate within ±{method.margin:.1%}")
+                    if sampler.failed:
+                        print(f"  (excluding {sum(sampler.failed.values())} failed runs, see below)")
+                    break
+                method.todo = sampler.next_round(round_runs(method))
+                if not method.todo:
+                    state = "budget"
+                    print("Plan used up before convergence (raise --runs for a larger budget)")
+                    break
+
+            for tasks, rows in execute(method):
+                done += len(tasks)
+                for task in tasks:
+                    task_rows = [row for row in rows or () if row["run"] == campaign.run_id(task)]
+                    if not task_rows or not all(hpc.counted_row(row) for row in task_rows):
+                        # Failed, or no counter columns for this event set: retried on the next start
+                        if sampler is not None:
+                            sampler.fail(task)  # and in a later round of this session
+                        continue
+                    for row in task_rows:
+                        outcomes[row["outcome"]] += 1
+                        writer.writerow(row)
+                        success_count += 1
+                    method.record(task, task_rows)
+                    if sampler is not None:
+                        sampler.observe(task, task_rows[0]["outcome"])
+                    writer.complete(campaign.run_id(task))
+
+                # Progress log (every 100 runs, or every chunk)
+                if len(tasks) > 1 or done % 100 == 0:
+                    print(f"Progress: {done}/{len(plan)} runs... (Collected: {success_count})")
+                    print(f"  {describe_outcomes(outcomes)}")
+            if sampler is None:
+                break
+
+    campaign.write_status(phase.output, state)  # after the last commit: detector.py --follow stops
+    if method.cache is not None:
+        method.cache.close()
+        print(method.cache.report())
+    if sampler is not None:
+        sampler.close()
+        print()
+        for line in sampler.report():
+            print(line)
+    return outcomes
+
+
+def round_runs(method):
+    """Adaptive round size: enough for every worker (one chunk each in chunked modes)"""
+    if method.mode in CHUNKED_MODES:
+        return max(ROUND_RUNS, CHUNKED_MODES[method.mode] * campaign.campaign_workers())
+    return ROUND_RUNS
+
+
+def describe_events():
+    events = hpc.campaign_events()
+    groups = hpc.schedule(events)
+    if len(groups) == 1:
+        return ",".join(events)
+    return (f"{','.join(events)}; {len(groups)} groups of <= {hpc.pmu_counters()}, "
+            f"multiplexed and scaled")
+
+
+def describe_outcomes(outcomes):
+    return ", ".join(f"{name}: {outcomes[name]}" for name in aiocampaign.OUTCOMES)
+
+
+def collect(method):
+    print("=" * 60)
+    print(method.title)
+    print("=" * 60)
+    print(f"Method: {method.name} (mode: {method.mode})")
+    print(f"Benchmark: {method.benchmark}")
+    print(f"Target: {method.target}" + (f" via {method.tool}" if method.tool else ""))
+    print(f"Total runs: {method.runs}" + (f" × {len(method.phases())}" if len(method.phases()) > 1 else ""))
+    for line in method.banner():
+        print(line)
+    print(f"Parallel: {aiocampaign.describe() if method.mode == 'async' else campaign.describe()}")
+    print(f"Counters: {hpc.backend()} ({describe_events()})")
+    if hpc.campaign_trace():
+        recorded = "" if hpc.backend() == "perf" else " - not recorded by the rusage stand-in"
+        print(f"Trace: every {os.environ['FI_TRACE']} ({', '.join(hpc.trace_columns())}){recorded}")
+    print("=" * 60)
+    print()
+
+    global _method
+    _method = method
+    try:
+        for phase in method.phases():
+            outcomes = collect_phase(method, phase)
+            total = sum(outcomes.values())
+            print()
+            print("=" * 60)
+            print(f"✓ Done! Saved to '{phase.output}'")
+            if total:
+                print("Outcomes (this session):")
+                for name in aiocampaign.OUTCOMES:
+                    print(f"  - {name}: {outcomes[name]} ({outcomes[name] / total * 100:.1f}%)")
+            print("=" * 60)
+            print()
+    finally:
+        method.close()
+
+
+# ============================================
+# CLI
+# ============================================
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="collect.py", description="Collect HPC samples with one injection method")
+    parser.add_argument("method", nargs="?", help="injection method (see --list)")
+    parser.add_argument("benchmark", nargs="?", help=f"one of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--runs", type=int, default=TOTAL_RUNS, help="runs (faults) per campaign")
+    parser.add_argument("--mode", help="execution mode of the method (default: FI_* switches)")
+    parser.add_argument("--counters", choices=["perf", "rusage"],
+                        help="counter backend (default: perf if available)")
+    parser.add_argument("--events", help=f"HPC event set: {', '.join(hpc.EVENT_SETS)} or a comma list "
+                                         "(generic, ARMv8 names, r<hex>; default: FI_EVENTS)")
+    parser.add_argument("--trace", help="per-interval counter trace, e.g. 100us, 2ms, 1000000insn "
+                                        "(async mode; default: FI_TRACE)")
+    parser.add_argument("--sites", choices=["uniform", "live", "pruned"],
+                        help="fault sites: uniform, live registers or one per def-use class "
+                             "(fault_space.py; default: FI_SITES or uniform)")
+    parser.add_argument("--margin", type=float,
+                        help="adaptive stratified sampling: stop when every outcome rate is within "
+                             "this margin, e.g. 0.02 (--runs = budget; default: FI_MARGIN)")
+    parser.add_argument("--cache", type=int, metavar="REPEATS",
+                        help="memoize results per deterministic fault spec: measure each spec REPEATS "
+                             "times, serve the rest (result_cache.py; default: FI_CACHE, 0 = off)")
+    parser.add_argument("--list", action="store_true", help="list the registered methods")
+    return parser, parser.parse_intermixed_args(argv)
+
+
+def main(argv):
+    parser, args = parse_args(argv)
+    if args.list or args.method is None:
+        print("Methods:")
+        for name, cls in METHODS.items():
+            print(f"  {name:12s} {cls.title} [modes: {', '.join(cls.modes)}]")
+        return 0 if args.list else 1
+
+    if args.method not in METHODS:
+        print(f"Error: Unknown method '{args.method}'")
+        print(f"Available: {', '.join(METHODS)}")
+        return 1
+    cls = METHODS[args.method]
+
+    benchmark = args.benchmark or cls.default_benchmark
+    if benchmark not in BENCHMARKS:
+        print(f"Error: Unknown benchmark '{benchmark}'")
+        print(f"Available: {', '.join(BENCHMARKS.keys())}")
+        return 1
+    if args.mode is not None and args.mode not in cls.modes:
+        print(f"Error: method '{cls.name}' has no mode '{args.mode}'")
+        print(f"Available: {', '.join(cls.modes)}")
+        return 1
+    if args.counters:
+        # Environment, so forked workers and tools see the same choice
+        os.environ["FI_COUNTERS"] = args.counters
+    if args.events:
+        os.environ["FI_EVENTS"] = args.events
+    if args.trace:
+        os.environ["FI_TRACE"] = args.trace
+    if args.sites:
+        os.environ["FI_SITES"] = args.sites
+    if args.margin is not None:
+        os.environ["FI_MARGIN"] = str(args.margin)
+    if args.cache is not None:
+        os.environ["FI_CACHE"] = str(args.cache)
+    try:
+        events = hpc.campaign_events()
+        trace = hpc.campaign_trace()
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    # Resolved once here: the C tools use their rusage stand-in only on a rusage campaign
+    os.environ["FI_COUNTERS"] = hpc.backend()
+
+    method = cls(benchmark, args.runs, args.mode)
+    if method.mode in CHUNKED_MODES and events != hpc.HPC_EVENTS:
+        # The C tools open their own four-event group (hpc_counters.h)
+        print(f"Error: mode '{method.mode}' counts the default events only")
+        print("Use --mode async or forkserver for other event sets")
+        return 1
+    if trace and method.mode != "async":
+        # Traces are read from the ring buffer of the group aiocampaign attaches
+        print(f"Error: traces are recorded in async mode only (not '{method.mode}')")
+        return 1
+    if os.environ.get("FI_SITES", "uniform") != "uniform":
+        if method.mode not in cls.site_modes:
+            print(f"Error: method '{cls.name}' takes index sites in modes: {', '.join(cls.site_modes) or 'none'}")
+            return 1
+        if method.index is None:
+            print(f"Error: {method.target} has no fault-space index")
+            print(f"Please run: make golden_profile && python3 fault_space.py profile {method.target}")
+            return 1
+    if method.margin is not None:
+        if not method.explicit_sites():
+            print(f"Error: --margin needs faults with known sites (method '{cls.name}', mode '{method.mode}')")
+            print("Use native, gdb-fault or marvin")
+            return 1
+        if os.environ.get("FI_SITES") == "pruned":
+            # class representatives carry weights; the strata would ignore them
+            print("Error: --margin does not combine with --sites pruned")
+            return 1
+    missing = [path for path in method.binaries() if not os.path.exists(path)]
+    if missing:
+        print(f"Error: {', '.join(missing)} not found.")
+        print(f"Please compile: {cls.build_hint}")
+        return 1
+
+    os.makedirs("data", exist_ok=True)
+    collect(method)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,291 @@
+"""
+detector.py - Streaming fault detector
+
+Scores runs with the scaler and model saved by train_ml_model.py while a
+campaign is still running. Samples are queued and scored in micro-batches
+(one vectorized scaler.transform + predict per batch): a batch is scored when
+it holds --batch runs or when its oldest run has waited --latency seconds,
+whichever comes first, so throughput scales with the batch size while every
+verdict stays within the latency bound.
+
+  python3 detector.py --follow data/faulty_basicmath_native.store   # rows as the collector commits them
+  python3 detector.py < samples.csv                                 # CSV on stdin (header first)
+  python3 detector.py --intervals < trace.csv                       # per-interval deltas, summed per run
+  python3 detector.py --model-file models/detector_rf.npz < samples.csv  # exported RF, no scikit-learn
+
+Input columns: the model's raw counter columns (cycles, instructions, ...)
+and optionally run and benchmark; derived features (train_ml_model.py
+--features derived) are recomputed from them with the golden baseline of the
+row's benchmark stored in the model ("*" without a benchmark column). With --intervals every line is one interval of a run and a
+final=1 column marks its last interval; the run is scored on its totals.
+
+Output: one "run,verdict,score" line per run on stdout (verdict fault/normal,
+score = model confidence that the run is faulty), a summary on stderr.
+"""
+
+import argparse
+import collections
+import csv
+import json
+import os
+import pickle
+import select
+import sys
+import time
+
+import numpy as np
+
+import campaign
+import features
+import sample_store
+
+MODEL_FILE = "models/detector.pkl"
+BATCH = 1024
+LATENCY = 0.05  # seconds
+
+
+# ============================================
+# Model
+# ============================================
+
+class Detector:
+    """Micro-batching front end of a persisted scaler + classifier"""
+
+    def __init__(self, artifact, model="rf", batch=BATCH, latency=LATENCY):
+        self.columns = artifact.get("columns", artifact["features"])
+        self.features = artifact["features"]
+        self.baseline = artifact.get("baseline")
+        self.scaler = artifact["scaler"]
+        self.model = artifact["models"][model]
+        self.normal = list(self.model.classes_).index(artifact["normal_label"])
+        self.batch = batch
+        self.latency = latency
+        self.keys = []
+        self.rows = []
+        self.benchmarks = []
+        self.oldest = None
+        self.counts = collections.Counter()
+
+    def submit(self, key, values, benchmark=None):
+        """
+        Queue one run; returns the verdicts of a batch if one became due.
+        benchmark: selects the golden baseline of derived features ("*" if None)
+        """
+        if not self.rows:
+            self.oldest = time.monotonic()
+        self.keys.append(key)
+        self.rows.append(values)
+        self.benchmarks.append(features.ALL_BENCHMARKS if benchmark is None else benchmark)
+        if len(self.rows) >= self.batch:
+            return self.flush()
+        return self.poll()
+
+    def timeout(self):
+        """Seconds until the queued batch is due (None if nothing is queued)"""
+        if not self.rows:
+            return None
+        return max(0.0, self.oldest + self.latency - time.monotonic())
+
+    def poll(self):
+        if self.rows and self.timeout() == 0:
+            return self.flush()
+        return []
+
+    def flush(self):
+        """Score everything queued: list of (key, is_fault, score)"""
+        if not self.rows:
+            return []
+        data = dict(zip(self.columns, np.asarray(self.rows, dtype=np.float64).T))
+        data["benchmark"] = np.asarray(self.benchmarks, dtype=object)  # per-benchmark baselines, like training
+        X = self.scaler.transform(features.model_input(data, self.features, self.baseline))
+        if hasattr(self.model, "predict_proba"):
+            score = 1.0 - self.model.predict_proba(X)[:, self.normal]
+            fault = score > 0.5
+        else:
+            # SVC without probabilities: signed distance, positive = not normal
+            decision = self.model.decision_function(X)
+            score = -decision if self.normal == 0 else decision
+            fault = score > 0
+        verdicts = list(zip(self.keys, fault.tolist(), score.tolist()))
+        self.counts["fault"] += int(fault.sum())
+        self.counts["normal"] += len(verdicts) - int(fault.sum())
+        self.keys = []
+        self.rows = []
+        self.benchmarks = []
+        return verdicts
+
+
+def load_artifact(path=MODEL_FILE):
+    if path.endswith(".npz"):
+        # export_model.py arrays: numpy only (fast start on the Pi)
+        import export_model
+        return export_model.load_flat(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# ============================================
+# Sources
+# ============================================
+
+def follow_store(path, columns, interval):
+    """
+    Yield (run, values, benchmark) for the rows of a store as the collector
+    commits them (meta.json row count), skipping rows without measured
+    counters (features.counted_mask); stops once the campaign plan is complete or
+    the collector has stopped (adaptive convergence, budget, exit).
+    Yields None when nothing new arrived within `interval` (lets the
+    caller flush a due batch).
+    """
+    seen = 0
+    while True:
+        done = _campaign_done(path)  # before the row count: no commit is missed
+        rows = sample_store.rows(path) if os.path.exists(os.path.join(path, "meta.json")) else 0
+        if rows > seen:
+            has_run = "run" in sample_store.present_columns(path)
+            data = sample_store.load(path, features.input_columns(path, columns + (["run"] if has_run else [])))
+            values = np.column_stack([data[name][seen:rows] for name in columns])
+            runs = data["run"][seen:rows].tolist() if has_run else range(seen, rows)
+            benchmarks = data["benchmark"][seen:rows].tolist() if "benchmark" in data else [None] * (rows - seen)
+            keep = features.counted_mask({name: data[name][seen:rows] for name in data})
+            counted = keep.tolist() if keep is not None else [True] * (rows - seen)
+            for run, row, benchmark, measured in zip(runs, values.tolist(), benchmarks, counted):
+                if measured:
+                    yield run, row, benchmark
+            seen = rows
+        elif done:
+            return
+        else:
+            time.sleep(interval)
+            yield None
+
+
+def _campaign_done(path):
+    manifest = os.path.join(path, "manifest.json")
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return False  # collector not started yet
+    if not os.path.exists(manifest):
+        return True  # plain store: read once
+    if campaign.collector_stopped(path):
+        return True  # converged / stopped early, or the collector exited
+    with open(manifest) as f:
+        planned = len(json.load(f)["plan"])
+    with open(os.path.join(path, "meta.json")) as f:
+        return len(json.load(f)["completed"]) >= planned
+
+
+def read_lines(stream, timeout):
+    """Yield complete lines from a pipe; None whenever `timeout()` expires first"""
+    fd = stream.fileno()
+    buf = b""
+    while True:
+        wait = timeout()
+        ready = select.select([fd], [], [], wait)[0]
+        if not ready:
+            yield None
+            continue
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            if buf:
+                yield buf.decode()
+            return
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            yield line.decode()
+
+
+def follow_csv(stream, columns, timeout, intervals=False):
+    """
+    Yield (run, values, benchmark) from CSV lines (or None on timeout, see
+    read_lines); benchmark None without a benchmark column.
+    intervals=True: sum the per-interval deltas of each run and yield it
+    once its final=1 line arrives.
+    """
+    header = None
+    totals = {}
+    benchmarks = {}
+    for n, line in enumerate(read_lines(stream, timeout)):
+        if line is None:
+            yield None
+            continue
+        if not line.strip():
+            continue
+        fields = next(csv.reader([line]))
+        if header is None:
+            header = {name: i for i, name in enumerate(fields)}
+            missing = [name for name in columns if name not in header]
+            if missing:
+                raise ValueError(f"input lacks feature columns {missing}")
+            continue
+        run = fields[header["run"]] if "run" in header else n
+        values = [float(fields[header[name]]) for name in columns]
+        benchmark = fields[header["benchmark"]] if "benchmark" in header else None
+        if not intervals:
+            yield run, values, benchmark
+            continue
+        total = totals.setdefault(run, [0.0] * len(columns))
+        benchmarks[run] = benchmark
+        for i, value in enumerate(values):
+            total[i] += value
+        if "final" in header and fields[header["final"]] == "1":
+            yield run, totals.pop(run), benchmarks.pop(run)
+    for run, total in totals.items():
+        yield run, total, benchmarks[run]  # runs whose final interval never came
+
+
+# ============================================
+# Main
+# ============================================
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="detector.py", description="Streaming fault detector")
+    parser.add_argument("--model-file", default=MODEL_FILE)
+    parser.add_argument("--model", default="rf", choices=["rf", "svm"])
+    parser.add_argument("--follow", metavar="STORE", help="score a store's rows as they are committed")
+    parser.add_argument("--intervals", action="store_true", help="stdin carries per-interval deltas")
+    parser.add_argument("--batch", type=int, default=BATCH, help="max runs per inference batch")
+    parser.add_argument("--latency", type=float, default=LATENCY, help="max seconds a run waits")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.model_file):
+        print(f"Error: {args.model_file} not found. Train first: python3 train_ml_model.py",
+              file=sys.stderr)
+        return 1
+    artifact = load_artifact(args.model_file)
+    if args.model not in artifact["models"]:
+        print(f"Error: {args.model_file} has no {args.model} model ({', '.join(artifact['models'])})",
+              file=sys.stderr)
+        return 1
+    if any(name in features.TRACE_FEATURES for name in artifact["features"]):
+        print(f"Error: {args.model_file} uses trace features, which need the stored traces "
+              f"(score the store with train_ml_model.py --predict)", file=sys.stderr)
+        return 1
+    detector = Detector(artifact, args.model, args.batch, args.latency)
+
+    if args.follow:
+        source = follow_store(args.follow, detector.columns, args.latency / 2)
+    else:
+        source = follow_csv(sys.stdin, detector.columns, detector.timeout, args.intervals)
+
+    out = sys.stdout
+    start = time.monotonic()
+    for item in source:
+        verdicts = detector.poll() if item is None else detector.submit(*item)
+        for run, fault, score in verdicts:
+            out.write(f"{run},{'fault' if fault else 'normal'},{score:.4f}\n")
+        if verdicts:
+            out.flush()
+    for run, fault, score in detector.flush():
+        out.write(f"{run},{'fault' if fault else 'normal'},{score:.4f}\n")
+    out.flush()
+
+    total = sum(detector.counts.values())
+    elapsed = time.monotonic() - start
+    print(f"✓ {total} runs scored ({detector.counts['fault']} fault, {detector.counts['normal']} normal)"
+          f" in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,229 @@
+"""
+export_model.py - Compile the trained scaler + Random Forest for the Pi
+
+Flattens the StandardScaler and every tree of the Random Forest in a model
+artifact (train_ml_model.py) into plain node arrays:
+
+  models/detector_rf.npz   numpy arrays, evaluated by FlatForest (numpy only,
+                           no scikit-learn / pandas import, loads in ms)
+  models/detector_rf.h     the same arrays as a C header with
+                           fi_detector_score(), for simple_runner / simple_injector
+
+  python3 export_model.py                         # models/detector.pkl -> models/detector_rf.{npz,h}
+  python3 detector.py --model-file models/detector_rf.npz < samples.csv
+
+Trees compare float32 features against double thresholds, exactly like
+scikit-learn, so the exported forest gives the same votes as the original.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+MODEL_FILE = "models/detector.pkl"
+FLAT_FILE = "models/detector_rf.npz"
+HEADER_FILE = "models/detector_rf.h"
+
+
+# ============================================
+# Flat (array-backed) model
+# ============================================
+
+class FlatScaler:
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class FlatForest:
+    """
+    All trees in one set of node arrays (child indices are global, -1 = leaf);
+    predict_proba walks every (sample, tree) pair one level per step
+    """
+
+    def __init__(self, roots, left, right, feature, threshold, proba, classes):
+        self.roots = roots
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.proba = proba
+        self.classes_ = classes
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        while True:
+            inner = self.left[node] >= 0
+            if not inner.any():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(inner, np.where(go_left, self.left[node], self.right[node]), node)
+        return self.proba[node].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def flatten(artifact):
+    """Scaler + RF of an artifact -> dict of arrays (FLAT_FILE layout)"""
+    forest = artifact["models"]["rf"]
+    roots, left, right, feature, threshold, proba = [], [], [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        leaf = tree.children_left < 0
+        roots.append(offset)
+        left.append(np.where(leaf, -1, tree.children_left + offset))
+        right.append(np.where(leaf, -1, tree.children_right + offset))
+        feature.append(np.where(leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        value = tree.value[:, 0, :]
+        proba.append(value / value.sum(axis=1, keepdims=True))  # counts or fractions, by sklearn version
+        offset += tree.node_count
+    return {
+        "mean": artifact["scaler"].mean_.astype(np.float64),
+        "scale": artifact["scaler"].scale_.astype(np.float64),
+        "roots": np.array(roots, dtype=np.int32),
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "proba": np.concatenate(proba).astype(np.float32),
+        "classes": np.asarray(forest.classes_, dtype=np.int64),
+        "meta": np.array(json.dumps({
+            "key": artifact.get("key"),
+            "columns": artifact.get("columns", artifact["features"]),
+            "features": artifact["features"],
+            "baseline": artifact.get("baseline"),
+            "normal_label": artifact["normal_label"],
+        })),
+    }
+
+
+def load_flat(path=FLAT_FILE):
+    """FLAT_FILE -> artifact-like dict (scaler, models["rf"], features, ...) for detector.py"""
+    with np.load(path) as flat:
+        arrays = {name: flat[name] for name in flat.files}
+    meta = json.loads(str(arrays.pop("meta")))
+    forest = FlatForest(arrays["roots"], arrays["left"], arrays["right"], arrays["feature"],
+                        arrays["threshold"], arrays["proba"], arrays["classes"])
+    return dict(meta, scaler=FlatScaler(arrays["mean"], arrays["scale"]), models={"rf": forest})
+
+
+# ============================================
+# C header
+# ============================================
+
+def _c_double(value):
+    return repr(float(value))  # shortest round-trip literal, e.g. 0.5, 1e-05
+
+
+def _c_array(ctype, name, values, fmt, per_line=8):
+    items = [fmt(value) for value in values]
+    lines = [", ".join(items[i:i + per_line]) for i in range(0, len(items), per_line)]
+    return f"static const {ctype} {name}[{len(items)}] = {{\n    " + ",\n    ".join(lines) + ",\n};\n"
+
+
+def write_header(flat, path=HEADER_FILE):
+    meta = json.loads(str(flat["meta"]))
+    if meta["features"] != meta["columns"]:
+        raise ValueError("C export needs a model trained on raw counters (train_ml_model.py --features raw)")
+    normal = list(flat["classes"]).index(meta["normal_label"])
+    fault = 1.0 - flat["proba"][:, normal]  # P(fault) at every node (only leaves are read)
+    names = ", ".join(f'"{name}"' for name in meta["features"])
+
+    with open(path, "w") as f:
+        f.write(f"""/*
+ * detector_rf.h - Fault detector Random Forest (generated by export_model.py, do not edit)
+ *
+ * Model {meta["key"]}: StandardScaler + {len(flat["roots"])} trees, {len(flat["left"])} nodes.
+ * Input: the raw counters in FI_DETECTOR_FEATURES order (same as hpc_counters.h
+ * for the default event set), e.g. after hpc_read():
+ *
+ *     double x[FI_DETECTOR_FEATURES] = {{cycles, instructions, cache_misses, branch_misses}};
+ *     int faulty = fi_detector_score(x) > 0.5;
+ */
+
+#ifndef DETECTOR_RF_H
+#define DETECTOR_RF_H
+
+#include <stdint.h>
+
+#define FI_DETECTOR_FEATURES {len(meta["features"])}
+#define FI_DETECTOR_TREES {len(flat["roots"])}
+
+static const char *const fi_detector_feature_names[FI_DETECTOR_FEATURES] = {{{names}}};
+
+""")
+        f.write(_c_array("double", "fi_detector_mean", flat["mean"], _c_double, 4))
+        f.write(_c_array("double", "fi_detector_scale", flat["scale"], _c_double, 4))
+        f.write(_c_array("int32_t", "fi_detector_roots", flat["roots"], str, 16))
+        f.write(_c_array("int32_t", "fi_detector_left", flat["left"], str, 16))
+        f.write(_c_array("int32_t", "fi_detector_right", flat["right"], str, 16))
+        f.write(_c_array("uint8_t", "fi_detector_feature", flat["feature"], str, 32))
+        f.write(_c_array("double", "fi_detector_threshold", flat["threshold"], _c_double, 4))
+        f.write(_c_array("float", "fi_detector_fault", fault, lambda v: _c_double(v) + "f", 8))
+        f.write("""
+/* Mean P(fault) over the trees (scikit-learn predict_proba) */
+static inline double fi_detector_score(const double *raw) {
+    float x[FI_DETECTOR_FEATURES];
+    for (int i = 0; i < FI_DETECTOR_FEATURES; i++)
+        x[i] = (float)((raw[i] - fi_detector_mean[i]) / fi_detector_scale[i]);
+
+    double sum = 0.0;
+    for (int t = 0; t < FI_DETECTOR_TREES; t++) {
+        int32_t node = fi_detector_roots[t];
+        while (fi_detector_left[node] >= 0)
+            node = x[fi_detector_feature[node]] <= fi_detector_threshold[node]
+                 ? fi_detector_left[node] : fi_detector_right[node];
+        sum += fi_detector_fault[node];
+    }
+    return sum / FI_DETECTOR_TREES;
+}
+
+#endif /* DETECTOR_RF_H */
+""")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="export_model.py", description="Export the RF detector for the Pi")
+    parser.add_argument("--model-file", default=MODEL_FILE)
+    parser.add_argument("--output", default=FLAT_FILE, help="numpy arrays (.npz)")
+    parser.add_argument("--header", default=HEADER_FILE, help="C header ('' = skip)")
+    args = parser.parse_args(argv)
+
+    import pickle  # unpickling the artifact imports scikit-learn (export side only)
+
+    with open(args.model_file, "rb") as f:
+        artifact = pickle.load(f)
+    flat = flatten(artifact)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    np.savez(args.output, **flat)
+    size = sum(value.nbytes for value in flat.values())
+    print(f"✓ Saved: {args.output} ({len(flat['roots'])} trees, {len(flat['left'])} nodes, {size / 1024:.0f} KiB)")
+
+    # Sanity check: same probabilities as scikit-learn on random standardized inputs
+    X = np.random.RandomState(0).normal(size=(1000, len(flat["mean"]))) * flat["scale"] + flat["mean"]
+    scaled = artifact["scaler"].transform(X)
+    diff = np.abs(load_flat(args.output)["models"]["rf"].predict_proba(scaled)
+                  - artifact["models"]["rf"].predict_proba(scaled)).max()
+    print(f"  max |P - P_sklearn| on 1000 random inputs: {diff:.2e}")
+    if args.header:
+        try:
+            write_header(flat, args.header)
+            print(f"✓ Saved: {args.header}")
+        except ValueError as error:
+            print(f"✗ {args.header}: {error}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,175 @@
+/*
+ * fast_run.h - Sleep-triggered run of simple_injector_fast / simple_runner_fast
+ *
+ * run_one() is one fork/ptrace cycle: run the target for delay_us, stop it,
+ * read the pc, flip bit `bit` of x<reg> (reg < 0: nothing is flipped, the
+ * runner) and continue it to the end under the FI_TIMEOUT deadline.
+ * Batch records (one per run on stdout):
+ *   run,reg,bit,pc,exit_code,signal,cycles,instructions,cache_misses,branch_misses
+ *   error,run,<reason> : spec rejected, nothing was run (native_batch.py)
+ */
+
+#ifndef FAST_RUN_H
+#define FAST_RUN_H
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <fcntl.h>
+#include <sys/ptrace.h>
+#include <sys/types.h>
+#include <sys/wait.h>
+#include <sys/user.h>
+#include <sys/uio.h>
+#include <sys/resource.h>
+#include <unistd.h>
+#include <linux/elf.h>
+#include <string.h>
+
+#include "forkserver.h"
+#include "hpc_counters.h"
+#include "run_deadline.h"
+
+#define FAST_MAX_REG 30  // x0~x30
+#define FAST_MAX_BIT 63
+
+struct user_pt_regs_arm64 {
+    __u64 regs[31];
+    __u64 sp;
+    __u64 pc;
+    __u64 pstate;
+};
+
+struct run_result {
+    unsigned long long pc;
+    int status;
+    int failed;  // perf counters unavailable on a perf campaign: no record
+    int hung;    // killed at the FI_TIMEOUT deadline
+    uint64_t values[HPC_NUM_EVENTS];
+};
+
+/*
+ * One fork/ptrace cycle. attach_pid != 0: drive a fork-server copy instead
+ * of exec'ing target. counted: attach the HPC group (batch mode).
+ * target_reg < 0: no injection.
+ */
+static inline void run_one(const char *target, pid_t attach_pid, int counted,
+                           int target_reg, int target_bit, long delay_us,
+                           struct run_result *res) {
+    pid_t target_pid;
+    struct user_pt_regs_arm64 regs;
+    struct iovec iov;
+    struct hpc_group group;
+    struct rusage usage;
+    int have_group = 0;
+    int status;
+    int sig = 0;
+
+    memset(res, 0, sizeof(*res));
+
+    // Fork a child process
+    if (attach_pid) {
+        // Attach to a pre-initialized fork-server child (stopped before main)
+        target_pid = attach_pid;
+        if (attach_forkserver_child(target_pid) < 0) {
+            perror("attach");
+            exit(1);
+        }
+    } else {
+        target_pid = fork();
+    }
+
+    if (target_pid == 0) {
+        // [Child Process] stop once so the parent can attach counters before exec
+        if (counted) {
+            int devnull = open("/dev/null", O_WRONLY);
+            dup2(devnull, 1);  // stdout carries our records
+        }
+        ptrace(PTRACE_TRACEME, 0, NULL, NULL);
+        raise(SIGSTOP);
+        execl(target, target, NULL);
+        exit(1);
+    }
+
+    // [Parent Process]
+    if (!attach_pid) {
+        waitpid(target_pid, &status, 0);  // SIGSTOP before exec
+        if (counted)
+            have_group = hpc_open(&group, target_pid, 1, 1) == 0;
+        ptrace(PTRACE_CONT, target_pid, 0, 0);
+        waitpid(target_pid, &status, 0);  // exec stop: program start
+    } else if (counted) {
+        have_group = hpc_open(&group, target_pid, 0, 1) == 0;
+    }
+    if (counted && !have_group && !hpc_standin_selected()) {
+        // Never rusage stand-ins in the perf columns of a perf campaign
+        fprintf(stderr, "perf counters unavailable (FI_COUNTERS=rusage for the stand-in)\n");
+        kill(target_pid, SIGKILL);
+        waitpid(target_pid, &status, 0);
+        res->failed = 1;
+        return;
+    }
+
+    // Let program run for the given time (the whole run is bounded by FI_TIMEOUT)
+    deadline_start(target_pid);
+    ptrace(PTRACE_CONT, target_pid, 0, 0);
+    usleep(delay_us);
+
+    // Stop the child (SIGSTOP works for TRACEME and SEIZE tracees alike,
+    // PTRACE_INTERRUPT only for the latter; CONT below suppresses it)
+    kill(target_pid, SIGSTOP);
+    deadline_wait4(target_pid, &status, 0, &usage);
+
+    if (WIFSTOPPED(status)) {
+        // Read Registers
+        iov.iov_base = &regs;
+        iov.iov_len = sizeof(regs);
+        ptrace(PTRACE_GETREGSET, target_pid, NT_PRSTATUS, &iov);
+        res->pc = regs.pc;
+
+        if (target_reg >= 0) {
+            // Inject Fault and write back
+            regs.regs[target_reg] ^= (1ULL << target_bit);
+            ptrace(PTRACE_SETREGSET, target_pid, NT_PRSTATUS, &iov);
+        }
+
+        // Continue until the end, forwarding the target's own signals
+        // (e.g. SIGSEGV caused by the fault) so crashes show up as such
+        for (;;) {
+            ptrace(PTRACE_CONT, target_pid, 0, sig);
+            if (deadline_wait4(target_pid, &status, 0, &usage) < 0)
+                break;
+            if (!WIFSTOPPED(status))
+                break;
+            sig = (WSTOPSIG(status) == SIGSTOP) ? 0 : WSTOPSIG(status);
+        }
+    }
+    deadline_stop();
+    res->status = status;
+    res->hung = deadline_expired();
+
+    if (have_group) {
+        hpc_read(&group, res->values);
+        hpc_close(&group);
+    } else if (counted) {
+        hpc_standin(&usage, res->values);
+    }
+}
+
+static inline void print_record(long run_id, int reg, int bit, const struct run_result *res) {
+    if (res->failed)
+        return;  // no record: the collector retries the run
+    printf("%ld,%d,%d,%llu,%d,%d,%llu,%llu,%llu,%llu\n",
+           run_id, reg, bit, res->pc,
+           WIFEXITED(res->status) ? WEXITSTATUS(res->status) : -1,
+           res->hung ? HANG_SIGNAL : WIFSIGNALED(res->status) ? WTERMSIG(res->status) : 0,
+           (unsigned long long)res->values[0], (unsigned long long)res->values[1],
+           (unsigned long long)res->values[2], (unsigned long long)res->values[3]);
+    fflush(stdout);
+}
+
+static inline void print_error(long run_id, const char *reason) {
+    printf("error,%ld,%s\n", run_id, reason);
+    fflush(stdout);
+}
+
+#endif
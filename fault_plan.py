@@ -0,0 +1,76 @@
+"""
+fault_plan.py - Seeded fault plans shared by collect.py and the C tools
+
+The campaign manifest's seed (campaign.open_campaign, FI_SEED) draws every
+fault up front, so a run is fully described by its plan entry
+
+  (run_id, point, reg, bit)   point: trigger (instructions since exec, or
+                              delay_us in batch mode); reg / bit: -1 for the
+                              runners (nothing flipped)
+
+and the collector hands it to the tool instead of letting the tool draw:
+
+  simple_injector / simple_runner   -i <run> -n <point> [-r <reg> -x <bit>]
+  simple_injector_fast / _runner    -s specs "<run> <reg> <bit> <delay_us>"
+  simple_injector_ckpt              "<point> <reg> <bit>" lines
+
+Each tool echoes the fault it applied with the outcome (simple_injector /
+simple_runner: "fi-echo <run> <point> <reg> <bit> <pc>" on stderr, the
+batch and checkpoint tools in their records), and the collector checks it
+against the plan. Rerunning a campaign with the same manifest reproduces
+the same faults, and failed runs are retried with the same spec.
+"""
+
+ECHO_PREFIX = "fi-echo"
+NO_FLIP = -1
+
+# Random ranges the tools use when they draw themselves
+TRIGGERS = {"insn": (10000, 59999), "delay_us": (10000, 99999)}
+
+
+def uniform(rng, runs, trigger="insn", registers=8, flip=True):
+    """runs faults (run ids 1..runs): uniform trigger point, x0..x<registers-1>, bit 0~63"""
+    low, high = TRIGGERS[trigger]
+    plan = []
+    for run_id in range(1, runs + 1):
+        point = rng.randint(low, high)
+        if flip:
+            plan.append((run_id, point, rng.randint(0, registers - 1), rng.randint(0, 63)))
+        else:
+            plan.append((run_id, point, NO_FLIP, NO_FLIP))
+    return plan
+
+
+def tool_args(task):
+    """simple_injector / simple_runner options of a plan entry"""
+    run_id, point, reg, bit = task[:4]
+    args = ["-i", str(run_id), "-n", str(point)]
+    if reg != NO_FLIP:
+        args += ["-r", str(reg), "-x", str(bit)]
+    return args
+
+
+def batch_spec(task):
+    """simple_injector_fast / simple_runner_fast -s spec (run, reg, bit, delay_us) of a plan entry"""
+    run_id, delay_us, reg, bit = task[:4]
+    return run_id, reg, bit, delay_us
+
+
+def parse_echo(text):
+    """Last "fi-echo" line of a tool's stderr -> dict(run, point, reg, bit, pc), None if absent"""
+    echo = None
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 6 and parts[0] == ECHO_PREFIX:
+            try:
+                echo = dict(zip(("run", "point", "reg", "bit", "pc"), (int(p, 0) for p in parts[1:])))
+            except ValueError:
+                continue
+    return echo
+
+
+def matches(task, echo):
+    """The echoed fault is the planned one (fields the echo carries)"""
+    run_id, point, reg, bit = task[:4]
+    planned = {"run": run_id, "point": point, "reg": reg, "bit": bit}
+    return all(echo[name] == value for name, value in planned.items() if name in echo)
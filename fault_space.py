@@ -0,0 +1,525 @@
+"""
+fault_space.py - Golden-run fault-space index per benchmark binary
+
+One golden run per binary (golden_profile, single-stepped through the
+injection window) records every executed instruction; a backward pass over
+that dynamic trace gives, for each injection point, which registers are live
+there and how many of their low bits the program still reads before
+overwriting them. Flipping a dead register (or a bit above the read width)
+is trivially benign, so campaigns can draw only live sites instead.
+
+The index is keyed by the sha256 of the binary and stored once:
+
+  data/fault_space/<binary>-<hash16>.json
+    points  injection positions (instructions since exec, simple_injector -n)
+    pcs     pc at each point          insns  instruction word at each point
+    live    31 chars per point, live width of x0..x30 in bytes (0, 1, 2, 4, 8)
+    tail    instruction words of the lookahead after the window
+    ended   the program exited inside window + lookahead
+    total   dynamic instruction count of the golden run
+
+  python3 fault_space.py profile ./basicmath_bench [--start 10000 --end 60000]
+  python3 fault_space.py info ./basicmath_bench
+  python3 collect.py native basicmath --mode checkpoint --sites live
+  python3 collect.py native basicmath --mode checkpoint --sites pruned
+  python3 fault_space.py estimate ./basicmath_bench data/faulty_basicmath_native.store
+
+--sites pruned goes one step further (def-use equivalence): flipping bit b
+of x3 at any point between two accesses of x3 reaches the next access with
+the same state, so the sites in between form one class. One representative
+per class is injected and its outcome counts for the class size (the
+`weight` column); classes that end in a write are benign without a run.
+
+Standard library only (runs on the Pi next to the collectors). The ARM64
+decoder is conservative: when an encoding is not understood, its register
+fields count as read and nothing as written, which can only keep a site live.
+"""
+
+import argparse
+import bisect
+import collections
+import hashlib
+import json
+import os
+import subprocess
+import sys
+
+VERSION = 2
+INDEX_DIR = "data/fault_space"
+PROFILER = "./golden_profile"
+WINDOW = (10000, 60000)  # simple_injector's random injection range
+LOOKAHEAD = 256
+REGISTERS = 31           # x0..x30
+WIDTH_CHARS = {0: "0", 8: "1", 16: "2", 32: "4", 64: "8"}
+BANDS = ((0, 8), (8, 16), (16, 32), (32, 64))  # bits a read of 8/16/32/64 bits adds
+
+
+# ============================================
+# ARM64 register use
+# ============================================
+
+def _field(word, shift):
+    return (word >> shift) & 31
+
+
+def decode(word):
+    """
+    General-purpose registers an instruction reads and writes:
+    (reads {reg: bits read (8/16/32/64)}, writes {reg}); register 31
+    (sp / xzr) is not tracked. Covers the base A64 classes, conservative
+    for the rest.
+    """
+    reads, writes = {}, set()
+    rd, rn, rm, ra = _field(word, 0), _field(word, 5), _field(word, 16), _field(word, 10)
+    width = 64 if word >> 31 else 32
+
+    def read(reg, bits=64):
+        if reg != 31:
+            reads[reg] = max(reads.get(reg, 0), bits)
+
+    def write(reg):
+        if reg != 31:
+            writes.add(reg)
+
+    op0 = (word >> 25) & 0xf
+    if op0 in (0b1000, 0b1001):
+        # Data processing - immediate
+        op = (word >> 23) & 0x7
+        if op in (0b000, 0b001):                      # adr / adrp
+            write(rd)
+        elif op == 0b101:                             # movn / movz / movk
+            if (word >> 29) & 3 == 0b11:
+                read(rd, width)                       # movk keeps the other bits
+            write(rd)
+        else:                                         # add/sub, logical, bitfield, extract
+            read(rn, width)
+            if op == 0b110 and (word >> 29) & 3 == 0b01:
+                read(rd, width)                       # bfm inserts into rd
+            if op == 0b111:
+                read(rm, width)                       # extr
+            write(rd)
+    elif op0 in (0b1010, 0b1011):
+        # Branches, exception generation, system
+        if (word >> 26) & 0x1f == 0b00101:            # b / bl
+            if word >> 31:
+                write(30)
+        elif (word >> 25) & 0x3f in (0b011010, 0b011011):  # cbz/cbnz, tbz/tbnz
+            read(rd, 64 if (word >> 31) or (word >> 25) & 1 else width)
+        elif (word >> 25) & 0x7f == 0b0101010:        # b.cond
+            pass
+        elif (word >> 24) == 0b11010100:              # svc / hvc / brk
+            if word & 0x1f == 0b00001:                # svc: x8 = number, x0..x5 arguments
+                for reg in (0, 1, 2, 3, 4, 5, 8):
+                    read(reg)
+                write(0)
+        elif (word >> 22) == 0b1101010100:            # system
+            if (word >> 21) & 1:                      # mrs / sysl
+                write(rd)
+            elif (word >> 19) & 3:                    # msr / sys with a register
+                read(rd)
+        elif (word >> 25) == 0b1101011:               # br / blr / ret (+ pointer auth)
+            read(rn)
+            if (word >> 11) & 1:
+                read(rd)                              # modifier register
+            if (word >> 21) & 0xf == 0b0001:
+                write(30)                             # blr
+        else:
+            read(rd), read(rn), read(rm)
+    elif op0 & 0b0101 == 0b0100:
+        _decode_load_store(word, read, write)
+    elif op0 & 0b0111 == 0b0101:
+        # Data processing - register
+        if (word >> 24) & 0x1f == 0b11011:            # madd / msub / smaddl / ...
+            read(rn, width), read(rm, width), read(ra, 64)
+            write(rd)
+        elif (word >> 21) & 0xff == 0b11010010:       # ccmp / ccmn (flags only)
+            read(rn, width)
+            if not (word >> 11) & 1:
+                read(rm, width)
+        elif (word >> 21) & 0xff == 0b11010110 and (word >> 30) & 1:  # 1 source
+            read(rn, width)
+            if _field(word, 16) == 0b00001:
+                read(rd)                              # pac* / aut* modify rd
+            write(rd)
+        else:                                         # shifted/extended, carry, 2 source, csel
+            read(rn, width), read(rm, width)
+            write(rd)
+    elif op0 & 0b0111 == 0b0111:
+        # Data processing - SIMD & FP: only moves / conversions touch x registers
+        if (word >> 24) & 0x5f == 0b00011110 and (word >> 21) & 1 and (word >> 10) & 0x3f == 0:
+            if (word >> 16) & 7 in (0b010, 0b011, 0b111):   # scvtf / ucvtf / fmov from x
+                read(rn, width)
+            else:                                     # fcvt* / fmov to x
+                write(rd)
+        elif word & 0xbfe08400 == 0x0e000400:         # dup / ins (general), smov / umov
+            if (word >> 11) & 0xf in (0b0001, 0b0011):
+                read(rn)
+            else:
+                write(rd)
+    else:
+        read(rd), read(rn), read(rm)                  # unallocated / SVE: unknown
+    return reads, writes
+
+
+def _decode_load_store(word, read, write):
+    rt, rn, rs, rt2 = _field(word, 0), _field(word, 5), _field(word, 16), _field(word, 10)
+    simd = (word >> 26) & 1
+    size_bits = 8 << (word >> 30)
+    kind = (word >> 27) & 0x7
+    if not (kind == 0b011 and not (word >> 24) & 1):
+        read(rn)                                      # base address (literals are pc-relative)
+    if kind == 0b001 and not simd:
+        # Exclusive / acquire-release / compare-and-swap
+        load = (word >> 22) & 1
+        if (word >> 21) & 1 and (word >> 23) & 1:     # cas: rs = old value
+            read(rs), read(rt)
+            write(rs)
+        elif load:
+            write(rt)
+            if (word >> 21) & 1:
+                write(rt2)
+        else:
+            read(rt, size_bits)
+            if (word >> 21) & 1:
+                read(rt2, size_bits)
+            if not (word >> 23) & 1:
+                write(rs)                             # stxr status
+    elif kind == 0b011 and not (word >> 24) & 1:
+        # Load literal (pc-relative; prfm has opc 11)
+        reads_literal = (word >> 30) != 0b11
+        if not simd and reads_literal:
+            write(rt)
+    elif kind == 0b101:
+        # Load / store pair
+        load = (word >> 22) & 1
+        if (word >> 23) & 3 in (0b01, 0b11):
+            write(rn)                                 # post- / pre-index writeback
+        if not simd:
+            bits = 64 if (word >> 31) else 32
+            if load:
+                write(rt), write(rt2)
+            else:
+                read(rt, bits), read(rt2, bits)
+    elif kind == 0b111:
+        # Load / store register
+        opc = (word >> 22) & 3
+        if not (word >> 24) & 1:
+            if (word >> 21) & 1:
+                if (word >> 10) & 3 == 0b10:
+                    read(rs)                          # register offset
+                elif (word >> 10) & 3 == 0b00 and not simd:
+                    read(rs)                          # atomic ldadd / swp / ...: rt = old value
+                    write(rt)
+                    return
+                else:
+                    write(rn)                         # ldraa/ldrab writeback
+            elif (word >> 10) & 1:
+                write(rn)                             # post- / pre-index writeback
+        if simd:
+            return
+        if opc == 0b00:
+            read(rt, size_bits)
+        elif not (size_bits == 64 and opc == 0b10):   # not prfm
+            write(rt)
+    else:
+        # SIMD structure loads / stores: post-index register and writeback
+        if (word >> 23) & 1:
+            if rs != 31:
+                read(rs)
+            write(rn)
+
+
+# ============================================
+# Liveness over the golden trace
+# ============================================
+
+def liveness(insns, ended):
+    """
+    Live width of x0..x30 before each instruction of a dynamic trace
+    (backward pass). ended: the program exited right after the trace;
+    otherwise everything is assumed live after it.
+    """
+    live = [0] * REGISTERS if ended else [64] * REGISTERS
+    result = [None] * len(insns)
+    for i in range(len(insns) - 1, -1, -1):
+        reads, writes = decode(insns[i])
+        for reg in writes:
+            live[reg] = 0
+        for reg, bits in reads.items():
+            live[reg] = max(live[reg], bits)
+        result[i] = "".join(WIDTH_CHARS[width] for width in live)
+    return result
+
+
+# ============================================
+# Index
+# ============================================
+
+def binary_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def index_path(binary, digest=None):
+    digest = digest or binary_hash(binary)
+    return os.path.join(INDEX_DIR, f"{os.path.basename(binary)}-{digest[:16]}.json")
+
+
+def load_index(binary):
+    """Index of this exact binary (content hash), None if not profiled yet"""
+    path = index_path(binary)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        index = json.load(f)
+    return index if index.get("version") == VERSION else None
+
+
+def build_index(binary, start=WINDOW[0], end=WINDOW[1], lookahead=LOOKAHEAD, profiler=PROFILER):
+    """Run the golden profile once and write the index; returns it"""
+    result = subprocess.run([profiler, "-s", str(start), "-e", str(end), "-l", str(lookahead), binary],
+                            stdout=subprocess.PIPE, check=True, text=True)
+    trace, info = [], {}
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[0].isdigit():
+            trace.append((int(parts[0]), int(parts[1], 16), int(parts[2], 16)))
+        elif len(parts) == 2:
+            info[parts[0]] = parts[1]
+    if not trace:
+        raise RuntimeError(f"{binary}: golden run produced no trace (exited before {start} instructions?)")
+
+    # Trace shorter than window + lookahead: the program exited inside it
+    ended = len(trace) < end + lookahead - start
+    live = liveness([insn for _, _, insn in trace], ended)
+    inside = [i for i, (position, _, _) in enumerate(trace) if position < end]
+    digest = binary_hash(binary)
+    index = {
+        "version": VERSION,
+        "binary": os.path.basename(binary),
+        "hash": digest,
+        "window": [start, end],
+        "lookahead": lookahead,
+        "total": int(info.get("total", -1)),
+        "status": int(info.get("status", -1)),
+        "base": info.get("base"),
+        "points": [trace[i][0] for i in inside],
+        "pcs": [trace[i][1] for i in inside],
+        "insns": [trace[i][2] for i in inside],
+        "live": [live[i] for i in inside],
+        "tail": [insn for position, _, insn in trace if position >= end],
+        "ended": ended,
+    }
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    path = index_path(binary, digest)
+    with open(path + ".tmp", "w") as f:
+        json.dump(index, f)
+    os.replace(path + ".tmp", path)
+    return index
+
+
+def live_width(index, i, reg):
+    """Live low bits of x<reg> at the index's i-th point"""
+    return int(index["live"][i][reg]) * 8
+
+
+class SiteSampler:
+    """
+    Uniform draws over the live (point, register, bit) sites of an index,
+    restricted to `registers` (e.g. x0..x7 like the injectors)
+    """
+
+    def __init__(self, index, registers=range(8)):
+        self.sites = []
+        self.cum_weights = []
+        total = 0
+        for i, point in enumerate(index["points"]):
+            for reg in registers:
+                width = live_width(index, i, reg)
+                if width:
+                    total += width
+                    self.sites.append((point, reg, width))
+                    self.cum_weights.append(total)
+        if not self.sites:
+            raise ValueError(f"{index['binary']}: no live site in x{min(registers)}..x{max(registers)}")
+
+    def draw(self, rng):
+        """(point, reg, bit) for a random.Random"""
+        point, reg, width = rng.choices(self.sites, cum_weights=self.cum_weights)[0]
+        return point, reg, rng.randrange(width)
+
+    def total(self):
+        return self.cum_weights[-1]
+
+
+# ============================================
+# Def-use equivalence classes (--sites pruned)
+# ============================================
+
+def equivalence_classes(index, registers=range(8)):
+    """
+    Def-use equivalence classes of the index's (point, register, bit) sites.
+    A class is a run of window points with no access to the register in
+    between; it ends at the next read covering the bit (live class) or at a
+    write (dead: the flip is overwritten, benign). Bits of one width band
+    (BANDS) share their class boundaries, so classes come in groups.
+    Returns (groups, dead): groups = [(point, reg, lo, hi, size)], bits
+    lo..hi-1 of x<reg> are one class each of `size` window points,
+    represented by `point` (the last window point before the access); dead =
+    number of sites in dead classes.
+    """
+    points = index["points"]
+    window = len(points)
+    start = {(reg, band): 0 for reg in registers for band in range(len(BANDS))}  # first trace index of the open class
+    groups = []
+    dead = 0
+
+    def close(reg, band, k, read):
+        nonlocal dead
+        first, last = start[reg, band], min(k, window - 1)  # inject before instruction k, window part only
+        start[reg, band] = k + 1
+        if last < first:
+            return
+        lo, hi = BANDS[band]
+        if read:
+            groups.append((points[last], reg, lo, hi, last - first + 1))
+        else:
+            dead += (last - first + 1) * (hi - lo)
+
+    for k, word in enumerate(index["insns"] + index["tail"]):
+        if k >= window and min(start.values()) >= window:
+            break  # every class of the window is closed
+        reads, writes = decode(word)
+        for reg in registers:
+            if reg in reads:
+                for band, (_, hi) in enumerate(BANDS):
+                    if hi <= reads[reg]:
+                        close(reg, band, k, read=True)
+            if reg in writes:
+                for band in range(len(BANDS)):
+                    close(reg, band, k, read=False)
+
+    # Still open at the end of the trace: dead if the program exited, else
+    # unknown (kept, still equivalent: nothing touches the register after)
+    end = len(index["insns"]) + len(index["tail"])
+    for reg, band in start:
+        close(reg, band, end, read=not index["ended"])
+    return groups, dead
+
+
+class PrunedSpace:
+    """Live equivalence classes of an index, drawn without replacement"""
+
+    def __init__(self, index, registers=range(8)):
+        self.groups, self.dead = equivalence_classes(index, registers)
+        self.cum_classes = []
+        classes = 0
+        for _, _, lo, hi, _ in self.groups:
+            classes += hi - lo
+            self.cum_classes.append(classes)
+        self.classes = classes
+        self.live = sum(size * (hi - lo) for _, _, lo, hi, size in self.groups)
+        self.sites = len(index["points"]) * len(registers) * 64  # = live + dead
+
+    def draw(self, rng, n):
+        """
+        n distinct classes, uniformly (all of them if n >= classes):
+        [(point, reg, bit, size)] in class order
+        """
+        picks = range(self.classes) if n >= self.classes else sorted(rng.sample(range(self.classes), n))
+        faults = []
+        for c in picks:
+            g = bisect.bisect_right(self.cum_classes, c)
+            point, reg, lo, _, size = self.groups[g]
+            faults.append((point, reg, lo + c - (self.cum_classes[g - 1] if g else 0), size))
+        return faults
+
+    def describe(self):
+        return (f"{self.classes} live classes for {self.live} sites, "
+                f"{self.dead}/{self.sites} sites dead ({self.dead / self.sites:.1%}, benign without a run)")
+
+    def estimate(self, outcomes, weights):
+        """
+        Outcome rates over all sites from the runs of a pruned campaign: the
+        class-size weighted rates of the live classes, plus the dead sites
+        as benign
+        """
+        total = sum(weights)
+        live_share = self.live / self.sites
+        rates = collections.Counter()
+        for outcome, weight in zip(outcomes, weights):
+            rates[outcome] += live_share * weight / total
+        rates["benign"] += self.dead / self.sites
+        return rates
+
+
+def describe(index, registers=range(8)):
+    points = len(index["points"])
+    live_bits = sum(live_width(index, i, reg) for i in range(points) for reg in registers)
+    space = points * len(registers) * 64
+    return (f"{index['binary']} ({index['hash'][:16]}): {points} points in {index['window']}, "
+            f"total {index['total']} instructions; live x{min(registers)}..x{max(registers)} bits: "
+            f"{live_bits}/{space} ({live_bits / space:.1%})" if space else f"{index['binary']}: empty index")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="fault_space.py", description="Golden-run fault-space index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    profile = sub.add_parser("profile", help="profile a binary (once per content hash)")
+    profile.add_argument("binary")
+    profile.add_argument("--start", type=int, default=WINDOW[0])
+    profile.add_argument("--end", type=int, default=WINDOW[1])
+    profile.add_argument("--lookahead", type=int, default=LOOKAHEAD)
+    profile.add_argument("--force", action="store_true", help="profile again even if indexed")
+    info = sub.add_parser("info", help="summary of a binary's index")
+    info.add_argument("binary")
+    estimate = sub.add_parser("estimate", help="outcome rates of a --sites pruned campaign")
+    estimate.add_argument("binary")
+    estimate.add_argument("store")
+    args = parser.parse_args(argv)
+
+    if args.command == "profile":
+        index = None if args.force else load_index(args.binary)
+        if index is not None:
+            print(f"✓ Already indexed: {index_path(args.binary)}")
+        else:
+            if not os.path.exists(PROFILER):
+                print(f"Error: {PROFILER} not found. Please compile: make golden_profile")
+                return 1
+            index = build_index(args.binary, args.start, args.end, args.lookahead)
+            print(f"✓ Saved: {index_path(args.binary, index['hash'])}")
+        print(describe(index))
+        return 0
+
+    index = load_index(args.binary)
+    if index is None:
+        print(f"✗ {args.binary}: not profiled (python3 fault_space.py profile {args.binary})")
+        return 1
+    print(describe(index))
+    if args.command == "info":
+        print(PrunedSpace(index).describe())
+        return 0
+
+    import sample_store  # numpy (analysis side)
+
+    with open(os.path.join(args.store, "manifest.json")) as f:
+        sites = json.load(f)["config"].get("sites")
+    if sites != "pruned:" + index["hash"][:16]:
+        print(f"✗ {args.store}: not a --sites pruned campaign of this binary (sites: {sites})")
+        return 1
+    space = PrunedSpace(index)
+    data = sample_store.load(args.store, ["outcome", "weight"])
+    outcomes, weights = list(data["outcome"]), [int(w) for w in data["weight"]]
+    print(space.describe())
+    print(f"Runs: {len(outcomes)} representatives for {sum(weights)} live sites")
+    rates = space.estimate(outcomes, weights)
+    for outcome in sorted(rates, key=lambda name: -rates[name]):
+        print(f"  - {outcome}: {rates[outcome]:.2%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
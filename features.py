@@ -0,0 +1,298 @@
+"""
+features.py - Derived features for the ML and visualization code
+
+Raw counters scale with the benchmark's length, so a model trained on
+basicmath does not transfer to qsort or sha. This stage derives
+length-independent features with vectorized numpy (no per-row Python):
+
+  ipc                 instructions / cycles
+  mpki                cache misses per 1000 instructions
+  branch_mpki         branch misses per 1000 instructions
+  branch_miss_rate    branch misses / branches (event set with "branches")
+  <feature>_z         z-score against the golden runs of the same benchmark
+
+Traced stores (hpc.py trace mode) also get rolling-window statistics of the
+per-interval IPC / MPKI (trace_ipc_min, trace_ipc_std_max, trace_mpki_max).
+
+Results are cached next to the data (data/x.features.npz) and keyed by the
+content hash of the data and of the golden runs, so train_ml_model.py and the
+visualization scripts share one computation:
+
+  python3 features.py data/faulty_basicmath_native --golden data/ptrace_normal_basicmath
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+import sample_store
+
+VERSION = 2
+WINDOW = 8  # trace intervals per rolling window
+RATIOS = ["ipc", "mpki", "branch_mpki", "branch_miss_rate"]
+TRACE_FEATURES = ["trace_ipc_min", "trace_ipc_std_max", "trace_mpki_max"]
+ALL_BENCHMARKS = "*"
+
+
+# ============================================
+# Vectorized derivations
+# ============================================
+
+def _per_kilo(numerator, denominator):
+    return np.divide(numerator * 1000.0, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+def ratios(data):
+    """Length-independent ratios of a dict of counter arrays (missing events skipped)"""
+    get = {name: np.asarray(data[name], dtype=np.float64)
+           for name in ("cycles", "instructions", "cache_misses", "branch_misses", "branches") if name in data}
+    derived = {}
+    if "instructions" in get and "cycles" in get:
+        derived["ipc"] = _per_kilo(get["instructions"], get["cycles"]) / 1000.0
+    if "instructions" in get:
+        if "cache_misses" in get:
+            derived["mpki"] = _per_kilo(get["cache_misses"], get["instructions"])
+        if "branch_misses" in get:
+            derived["branch_mpki"] = _per_kilo(get["branch_misses"], get["instructions"])
+    if "branches" in get and "branch_misses" in get:
+        derived["branch_miss_rate"] = _per_kilo(get["branch_misses"], get["branches"]) / 1000.0
+    return derived
+
+
+def _columns(data):
+    """Raw counters + ratios: the columns that get z-scores"""
+    columns = {name: np.asarray(data[name], dtype=np.float64) for name in sample_store.feature_columns(list(data))}
+    columns.update(ratios(data))
+    return columns
+
+
+def baseline(data, benchmarks=None):
+    """
+    Golden-run statistics {benchmark: {feature: [mean, std]}} (plain data, it
+    goes into model artifacts); "*" holds the statistics of all golden runs
+    """
+    columns = _columns(data)
+    groups = {ALL_BENCHMARKS: slice(None)}
+    if benchmarks is not None:
+        benchmarks = np.asarray(benchmarks)
+        groups.update({str(name): benchmarks == name for name in np.unique(benchmarks)})
+    return {group: {name: [float(values[mask].mean()), float(values[mask].std())]
+                    for name, values in columns.items()}
+            for group, mask in groups.items()}
+
+
+def zscores(data, base, benchmarks=None):
+    """<feature>_z against the golden runs of each row's benchmark ("*" if unknown)"""
+    columns = _columns(data)
+    rows = len(next(iter(columns.values()))) if columns else 0
+    groups = {ALL_BENCHMARKS: np.ones(rows, dtype=bool)}
+    if benchmarks is not None:
+        benchmarks = np.asarray(benchmarks)
+        for name in np.unique(benchmarks):
+            if str(name) in base:
+                groups[str(name)] = benchmarks == name
+                groups[ALL_BENCHMARKS] &= benchmarks != name
+    derived = {}
+    for name, values in columns.items():
+        if name not in base[ALL_BENCHMARKS]:
+            continue
+        z = np.zeros(rows)
+        for group, mask in groups.items():
+            mean, std = base[group][name]
+            z[mask] = (values[mask] - mean) / (std if std > 0 else 1.0)
+        derived[f"{name}_z"] = z
+    return derived
+
+
+def derive(data, base=None, benchmarks=None):
+    """Ratios (+ z-scores if a golden baseline is given) of a dict of counter arrays"""
+    derived = ratios(data)
+    if base is not None:
+        derived.update(zscores(data, base, benchmarks))
+    return derived
+
+
+def model_input(data, names, base=None):
+    """
+    Feature matrix [rows, len(names)] from raw counter columns: raw names are
+    taken as is, derived ones computed with derive() (model artifacts store
+    names and base, so the detector reproduces the training features)
+    """
+    benchmarks = data.get("benchmark")
+    derived = derive(data, base, benchmarks) if any(name not in data for name in names) else {}
+    return np.column_stack([np.asarray(data[name] if name in data else derived[name], dtype=np.float64)
+                            for name in names])
+
+
+def input_columns(path, columns):
+    """
+    Columns to read for model_input(): plus "benchmark" if the data has it,
+    so derived features use the per-benchmark golden baseline like load(),
+    and "counted" for counted_mask()
+    """
+    available = sample_store.data_columns(path)
+    return columns + [name for name in ("benchmark", "counted") if name in available and name not in columns]
+
+
+def counted_mask(data):
+    """
+    Rows whose counters were measured (dict of arrays or DataFrame): False
+    where counted=0 (collect.sample: outcome only, the counters are missing,
+    not zero); None if the data has no counted column
+    """
+    if "counted" not in data:
+        return None
+    return np.asarray(data["counted"]) != 0
+
+
+def counted_only(data):
+    """data (dict of arrays or DataFrame) without the rows counted_mask() drops"""
+    keep = counted_mask(data)
+    if keep is None:
+        return data
+    if hasattr(data, "columns"):
+        return data[keep].reset_index(drop=True)
+    return {name: np.asarray(values)[keep] for name, values in data.items()}
+
+
+def counted_rows(path):
+    """Row count of a data set without the rows counted_mask() drops"""
+    if "counted" not in sample_store.data_columns(path):
+        return sample_store.row_count(path)
+    return sum(int(np.count_nonzero(chunk["counted"] != 0))
+               for chunk in sample_store.iter_chunks(path, ["counted"]))
+
+
+def trace_features(traces, columns, window=WINDOW):
+    """
+    Per-run rolling-window statistics of the per-interval IPC and MPKI:
+    minimum windowed IPC, largest windowed IPC standard deviation and
+    largest windowed MPKI (0 for untraced runs)
+    """
+    index = {name: i for i, name in enumerate(columns)}
+    if "instructions" not in index:
+        return {}
+    result = {name: np.zeros(len(traces)) for name in TRACE_FEATURES}
+    for run, trace in enumerate(traces):
+        if len(trace) < window:
+            continue
+        trace = np.asarray(trace, dtype=np.float64)
+        instructions = trace[:, index["instructions"]]
+        windows = np.lib.stride_tricks.sliding_window_view
+        if "cycles" in index:
+            ipc = _per_kilo(instructions, trace[:, index["cycles"]]) / 1000.0
+            rolling = windows(ipc, window)
+            result["trace_ipc_min"][run] = rolling.mean(axis=1).min()
+            result["trace_ipc_std_max"][run] = rolling.std(axis=1).max()
+        if "cache_misses" in index:
+            # windowed MPKI = misses / instructions over the whole window
+            misses = windows(trace[:, index["cache_misses"]], window).sum(axis=1)
+            result["trace_mpki_max"][run] = _per_kilo(misses, windows(instructions, window).sum(axis=1)).max()
+    return result
+
+
+def traced(path):
+    """The data set has traces trace_features() can use (hpc.py trace mode)"""
+    return "instructions" in sample_store.trace_columns(path)
+
+
+def trace_arrays(path, golden=None, window=WINDOW):
+    """TRACE_FEATURES of load() (counted rows, row order)"""
+    derived = load(path, golden, window)
+    return {name: derived[name] for name in TRACE_FEATURES}
+
+
+# ============================================
+# Disk cache (data/x.features.npz)
+# ============================================
+
+def cache_path(path):
+    found = sample_store.find(path)
+    if found is None:
+        raise FileNotFoundError(f"{path}: no {sample_store.STORE_SUFFIX} or .csv data")
+    base = found[:-len(sample_store.STORE_SUFFIX)] if found.endswith(sample_store.STORE_SUFFIX) else found[:-4]
+    return base + ".features.npz"
+
+
+def _cache_key(path, golden, window):
+    digest = hashlib.sha256(json.dumps([VERSION, window]).encode())
+    digest.update(sample_store.content_hash(path).encode())
+    if golden is not None:
+        digest.update(sample_store.content_hash(golden).encode())
+    return digest.hexdigest()
+
+
+def golden_baseline(golden):
+    """baseline() of a golden-run data set (all its counted rows, per benchmark)"""
+    data = counted_only(_read(golden))
+    data.pop("counted", None)
+    return baseline(data, data.pop("benchmark", None))
+
+
+def _read(path):
+    """Counter columns (+ benchmark, counted) of a store or CSV as numpy arrays"""
+    columns = input_columns(path, sample_store.feature_columns(sample_store.data_columns(path)))
+    found = sample_store.find(path)
+    if found.endswith(".csv"):
+        import pandas as pd
+        frame = pd.read_csv(found, usecols=columns)
+        return {name: frame[name].to_numpy() for name in columns}
+    return {name: np.asarray(values) for name, values in sample_store.load(found, columns).items()}
+
+
+def load(path, golden=None, window=WINDOW):
+    """
+    Derived features of a data set (dict name -> array, row order of the
+    rows counted_mask() keeps), computed once and cached in
+    data/x.features.npz; golden: golden-run data set for the z-scores
+    (None = ratios only)
+    """
+    cache = cache_path(path)
+    key = _cache_key(path, golden, window)
+    if os.path.exists(cache):
+        with np.load(cache) as cached:
+            if str(cached["_key"]) == key:
+                return {name: cached[name] for name in cached.files if name != "_key"}
+
+    data = _read(path)
+    benchmarks = data.pop("benchmark", None)
+    keep = counted_mask(data)
+    data.pop("counted", None)
+    derived = derive(data, golden_baseline(golden) if golden is not None else None, benchmarks)
+
+    found = sample_store.find(path)
+    if not found.endswith(".csv"):
+        traces, trace_columns = sample_store.load_traces(found)
+        if trace_columns:
+            derived.update(trace_features(traces, trace_columns, window))
+    if keep is not None:
+        derived = {name: values[keep] for name, values in derived.items()}
+
+    tmp = cache + ".tmp.npz"
+    np.savez(tmp, _key=np.array(key), **derived)
+    os.replace(tmp, cache)
+    return derived
+
+
+def main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="features.py", description="Compute and cache derived features")
+    parser.add_argument("data", nargs="+")
+    parser.add_argument("--golden", help="golden-run data set for the z-scores")
+    parser.add_argument("--window", type=int, default=WINDOW)
+    args = parser.parse_args(argv)
+
+    for path in args.data:
+        derived = load(path, args.golden, args.window)
+        print(f"✓ {path} -> {cache_path(path)}")
+        for name, values in derived.items():
+            print(f"  {name:20s} mean {values.mean():12.4f}  std {values.std():12.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
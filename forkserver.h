@@ -0,0 +1,61 @@
+/*
+ * forkserver.h - Shared definitions for the AFL-style fork server
+ *
+ * forkserver_preload.so (LD_PRELOAD) stops the benchmark just before main()
+ * and forks pre-initialized copies on request. The collector talks to it over
+ * two pipes on fixed fds (AFL convention), and simple_runner_fast /
+ * simple_injector_fast attach to the forked children with "-p <pid>".
+ */
+
+#ifndef FORKSERVER_H
+#define FORKSERVER_H
+
+#include <signal.h>
+#include <stdint.h>
+#include <sys/ptrace.h>
+#include <sys/types.h>
+#include <sys/wait.h>
+
+#define FORKSRV_FD 198          /* control pipe: collector -> server   */
+#define FORKSRV_STATUS_FD 199   /* status pipe:  server -> collector   */
+
+/* Sent after every child exit: wait status + rusage of the child */
+struct forksrv_result {
+    int32_t status;
+    int32_t pad;
+    uint64_t utime_us;
+    uint64_t stime_us;
+    uint64_t minflt;
+    uint64_t majflt;
+    uint64_t nvcsw;
+    uint64_t nivcsw;
+};
+
+/*
+ * Attach to a fork-server child. The child waits in a SIGSTOP group-stop
+ * just before main(); on return it is held in a ptrace stop at the same
+ * point, exactly like a freshly exec'd PTRACE_TRACEME child.
+ * Returns 0 on success, -1 on error.
+ */
+static inline int attach_forkserver_child(pid_t pid) {
+    int status;
+
+    // SEIZE (not ATTACH) so PTRACE_INTERRUPT works later on
+    if (ptrace(PTRACE_SEIZE, pid, 0, 0) < 0)
+        return -1;
+    if (waitpid(pid, &status, 0) < 0 || !WIFSTOPPED(status))
+        return -1;  // group-stop reported to the new tracer
+
+    // End the group-stop; keep resuming through job-control notifications
+    // until SIGCONT itself is about to be delivered (no user code runs)
+    kill(pid, SIGCONT);
+    for (;;) {
+        ptrace(PTRACE_CONT, pid, 0, 0);
+        if (waitpid(pid, &status, 0) < 0 || !WIFSTOPPED(status))
+            return -1;
+        if (WSTOPSIG(status) == SIGCONT && (status >> 16) == 0)
+            return 0;
+    }
+}
+
+#endif
@@ -0,0 +1,205 @@
+"""
+forkserver.py - Persistent fork-server launcher for the target benchmarks
+
+The benchmark is started once with forkserver_preload.so (LD_PRELOAD,
+LD_BIND_NOW=1), which stops it just before main() and forks fresh,
+pre-initialized copies on request (AFL style). The dynamic loader, libm
+relocations and startup page faults are paid once per worker instead of
+once per run, which removes them from both the latency and the counters.
+
+simple_runner_fast / simple_injector_fast attach to the forked copies with
+`-p <pid>`; see forkserver.h for the pipe protocol. Every run has the same
+deadline as aiocampaign.py (FI_TIMEOUT): a hung copy is killed (with the
+tool's process group) and reported as a hang.
+"""
+
+import os
+import select
+import signal
+import struct
+import types
+
+import aiocampaign
+import fault_plan
+import hpc
+
+FORKSRV_FD = 198
+FORKSRV_STATUS_FD = 199
+PRELOAD = os.path.abspath("./forkserver_preload.so")
+
+FORKSRV_HELLO = 0x46535256
+# struct forksrv_result: int32 status, int32 pad, 6 x uint64 rusage fields
+RESULT_FORMAT = "<ii6Q"
+RESULT_SIZE = struct.calcsize(RESULT_FORMAT)
+
+
+def _read_exact(fd, size):
+    buf = b""
+    while len(buf) < size:
+        chunk = os.read(fd, size - len(buf))
+        if not chunk:
+            raise EOFError("fork server died")
+        buf += chunk
+    return buf
+
+
+class ForkServer:
+    """One fork server per target binary (and per campaign worker)"""
+
+    def __init__(self, target, env=None):
+        if not os.path.exists(PRELOAD):
+            raise FileNotFoundError(f"{PRELOAD} not found. Please compile: make all")
+
+        env = dict(os.environ if env is None else env)
+        env["LD_PRELOAD"] = PRELOAD
+        env["LD_BIND_NOW"] = "1"  # resolve every symbol before the first fork
+
+        ctl_r, ctl_w = os.pipe()
+        st_r, st_w = os.pipe()
+        self.target = target
+        self.pid = os.fork()
+
+        if self.pid == 0:
+            # [Server] fixed fds 198/199, output of every run discarded
+            try:
+                os.dup2(ctl_r, FORKSRV_FD)
+                os.dup2(st_w, FORKSRV_STATUS_FD)
+                devnull = os.open(os.devnull, os.O_WRONLY)
+                os.dup2(devnull, 1)
+                os.dup2(devnull, 2)
+                os.execve(target, [target], env)
+            finally:
+                os._exit(127)
+
+        os.close(ctl_r)
+        os.close(st_w)
+        self.ctl = ctl_w
+        self.st = st_r
+
+        hello, = struct.unpack("<I", _read_exact(self.st, 4))
+        if hello != FORKSRV_HELLO:
+            raise RuntimeError(f"bad fork server handshake from {target}")
+
+    def spawn(self):
+        """Fork a pre-initialized copy; returns its pid (stopped before main)"""
+        os.write(self.ctl, struct.pack("<I", 0))
+        pid, = struct.unpack("<i", _read_exact(self.st, 4))
+        return pid
+
+    def resume(self, pid):
+        """Let a spawned copy run main() without any tracer attached"""
+        os.kill(pid, signal.SIGCONT)
+
+    def wait(self):
+        """
+        Wait for the spawned copy to exit.
+        Returns: (status, usage) - raw wait status and an rusage-like object
+        """
+        fields = struct.unpack(RESULT_FORMAT, _read_exact(self.st, RESULT_SIZE))
+        status, _, utime_us, stime_us, minflt, majflt, nvcsw, nivcsw = fields
+        usage = types.SimpleNamespace(
+            ru_utime=utime_us / 1e6, ru_stime=stime_us / 1e6,
+            ru_minflt=minflt, ru_majflt=majflt,
+            ru_nvcsw=nvcsw, ru_nivcsw=nivcsw,
+        )
+        return status, usage
+
+    def close(self):
+        # EOF on the control pipe makes the server exit
+        os.close(self.ctl)
+        os.close(self.st)
+        os.waitpid(self.pid, 0)
+
+
+# ============================================
+# Per-worker servers
+# ============================================
+
+_servers = {}
+
+
+def get_server(target):
+    """The calling process' fork server for target (started on first use)"""
+    key = (os.getpid(), target)
+    if key not in _servers:
+        _servers[key] = ForkServer(target)
+    return _servers[key]
+
+
+def _ready(fd, timeout):
+    """fd readable within timeout seconds (a pidfd: the process exited)"""
+    readable, _, _ = select.select([fd], [], [], timeout)
+    return bool(readable)
+
+
+def _kill(pid, killpg=False):
+    try:
+        (os.killpg if killpg else os.kill)(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def run_attached(target, tool=None, events=None, args=(), timeout=None):
+    """
+    Run one fork-server copy of target with the counter group attached.
+    tool (e.g. "./simple_injector_fast") is started with args + "-p <pid>"
+    and drives the copy; without a tool the copy simply runs to completion.
+    timeout: deadline in seconds (default FI_TIMEOUT, like aiocampaign.py).
+    Returns: (counts, status, echo, hung) like hpc.run_counted - status is
+    the tool's wait status if a tool was given, otherwise the target's; echo:
+    the fault the tool reported (fault_plan.parse_echo), None if none; hung:
+    the deadline expired and the run was killed (counts up to the kill)
+    """
+    if timeout is None:
+        timeout = aiocampaign.campaign_timeout()
+    server = get_server(target)
+    pid = server.spawn()
+
+    group = None
+    if hpc.backend() == "perf":
+        # Copy is stopped: counting starts with the first instruction of main()
+        group = hpc.CounterGroup(pid, events, on_exec=False)
+
+    echo = None
+    hung = False
+    if tool is None:
+        server.resume(pid)
+        if not _ready(server.st, timeout):
+            hung = True
+            _kill(pid)  # the server then reports its SIGKILL status
+    else:
+        # stderr: the tool's fault echo (one line; the copy writes to the server's stderr)
+        err_r, err_w = os.pipe()
+        actions = [(os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0), (os.POSIX_SPAWN_DUP2, err_w, 2)]
+        try:
+            tool_pid = os.posix_spawn(tool, [tool, *args, "-p", str(pid)], os.environ,
+                                      file_actions=actions, setpgroup=0)
+        finally:
+            os.close(err_w)
+        pidfd = os.pidfd_open(tool_pid)
+        try:
+            if not _ready(pidfd, timeout):
+                # Hang: the tool's group, and the copy (a child of the server, not in it)
+                hung = True
+                _kill(tool_pid, killpg=True)
+                _kill(pid)
+        finally:
+            os.close(pidfd)
+        _, tool_status = os.waitpid(tool_pid, 0)
+        with os.fdopen(err_r, "rb") as f:
+            echo = fault_plan.parse_echo(f.read().decode("utf-8", "replace"))
+        if os.waitstatus_to_exitcode(tool_status) != 0:
+            # Tool could not attach: do not leave the copy stopped forever
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    status, usage = server.wait()
+    if group is not None:
+        counts = group.read()
+        group.close()
+    else:
+        counts = hpc.rusage_counts(usage, events)
+
+    return counts, (status if tool is None else tool_status), echo, hung
@@ -0,0 +1,84 @@
+/*
+ * forkserver_preload.c - AFL-style fork server for the target benchmarks
+ *
+ * Build: gcc -shared -fPIC forkserver_preload.c -o forkserver_preload.so
+ * Usage: started by forkserver.py with LD_PRELOAD and LD_BIND_NOW=1, so the
+ *        dynamic loader, libm relocations and startup page faults are paid
+ *        once. Every request forks a copy that stops itself (SIGSTOP) just
+ *        before main() and waits for the collector / injector to attach.
+ *
+ * Protocol (fds 198/199, see forkserver.h):
+ *   server -> collector : uint32 hello
+ *   collector -> server : uint32 request        (one per run)
+ *   server -> collector : int32 child pid       (child is stopped)
+ *   server -> collector : struct forksrv_result (after the child exited)
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <unistd.h>
+#include <fcntl.h>
+#include <sys/prctl.h>
+#include <sys/resource.h>
+
+#include "forkserver.h"
+
+__attribute__((constructor))
+static void forkserver_main(void) {
+    uint32_t hello = 0x46535256;  // "FSRV"
+    uint32_t request;
+
+    // Not started by the collector: behave like the plain benchmark
+    if (fcntl(FORKSRV_FD, F_GETFD) < 0)
+        return;
+
+    // Children of the benchmark must not turn into fork servers themselves
+    unsetenv("LD_PRELOAD");
+
+    if (write(FORKSRV_STATUS_FD, &hello, sizeof(hello)) != sizeof(hello))
+        return;
+
+    while (read(FORKSRV_FD, &request, sizeof(request)) == sizeof(request)) {
+        struct forksrv_result result = {0};
+        struct rusage usage;
+        int status;
+        pid_t pid = fork();
+
+        if (pid < 0)
+            _exit(1);
+
+        if (pid == 0) {
+            // [Child] continue into main() once somebody resumes us
+            close(FORKSRV_FD);
+            close(FORKSRV_STATUS_FD);
+            // Allow the (non-ancestor) injector to attach under Yama ptrace_scope=1
+            prctl(PR_SET_PTRACER, PR_SET_PTRACER_ANY, 0, 0, 0);
+            raise(SIGSTOP);
+            return;
+        }
+
+        // [Server] report the pid only once the child really sits in its stop
+        waitpid(pid, &status, WUNTRACED);
+        if (write(FORKSRV_STATUS_FD, &pid, sizeof(pid)) != sizeof(pid))
+            _exit(1);
+
+        // Reap it (a tracer sees the exit first, we get it afterwards)
+        do {
+            if (wait4(pid, &status, 0, &usage) < 0)
+                _exit(1);
+        } while (!WIFEXITED(status) && !WIFSIGNALED(status));
+
+        result.status = status;
+        result.utime_us = usage.ru_utime.tv_sec * 1000000ULL + usage.ru_utime.tv_usec;
+        result.stime_us = usage.ru_stime.tv_sec * 1000000ULL + usage.ru_stime.tv_usec;
+        result.minflt = usage.ru_minflt;
+        result.majflt = usage.ru_majflt;
+        result.nvcsw = usage.ru_nvcsw;
+        result.nivcsw = usage.ru_nivcsw;
+        if (write(FORKSRV_STATUS_FD, &result, sizeof(result)) != sizeof(result))
+            _exit(1);
+    }
+
+    // Collector went away
+    _exit(0);
+}
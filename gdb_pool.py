@@ -0,0 +1,273 @@
+"""
+gdb_pool.py - Persistent GDB/MI sessions for the GDB-based collectors
+
+collect_marvin_style.py / collect_gdb_normal.py used to start a fresh
+`gdb --batch -x <script>` under `perf stat` for every fault: GDB re-read the
+debug symbols and re-inserted the breakpoint each time, and GDB's own startup
+dominated the measured cycles. Here every campaign worker keeps one
+`gdb --interpreter=mi2` process with the binary loaded and drives it with
+MI commands per fault (run / next x3 / flip $xN / continue). No script file
+is written, so concurrent collectors cannot race on a shared temp file.
+
+The HPC counter group is attached to the inferior itself at the main()
+breakpoint (hpc.CounterGroup), so only the benchmark is counted, not GDB.
+"""
+
+import os
+import re
+import select
+import signal
+import subprocess
+import time
+import types
+
+import aiocampaign
+import hpc
+
+GDB = "gdb"
+NEXT_STEPS = 3       # "next" x3 after break main, like the old script
+
+_FIELD = re.compile(r'([\w-]+)="((?:[^"\\]|\\.)*)"')
+
+
+class GdbTimeout(Exception):
+    pass
+
+
+def parse_fields(record):
+    """MI record -> dict of its name="value" fields (nested tuples flattened)"""
+    return dict(_FIELD.findall(record))
+
+
+def proc_usage(pid):
+    """
+    rusage-like object of a live process from /proc (for the stand-in
+    counters: GDB reaps the inferior, so wait4() never sees its rusage)
+    """
+    with open(f"/proc/{pid}/stat") as f:
+        # comm may contain spaces: fields start after the closing ')'
+        fields = f.read().rsplit(')', 1)[1].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    switches = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name.endswith("ctxt_switches"):
+                switches[name] = int(value)
+    return types.SimpleNamespace(
+        ru_utime=int(fields[11]) / ticks, ru_stime=int(fields[12]) / ticks,
+        ru_minflt=int(fields[7]), ru_majflt=int(fields[9]),
+        ru_nvcsw=switches.get("voluntary_ctxt_switches", 0),
+        ru_nivcsw=switches.get("nonvoluntary_ctxt_switches", 0),
+    )
+
+
+def exit_fields(outcome):
+    """run() outcome -> (exit_code, signal) like aiocampaign.exit_fields()"""
+    kind, _, value = outcome.partition(':')
+    if kind == "exit":
+        return int(value), 0
+    if kind == "signal" and value in signal.Signals.__members__:
+        return -1, signal.Signals[value].value
+    return -1, 0
+
+
+class GdbSession:
+    """
+    One long-lived GDB/MI process with target loaded; timeout: seconds per
+    fault (None: the campaign deadline, aiocampaign.campaign_timeout())
+    """
+
+    def __init__(self, target, timeout=None, events=None):
+        if timeout is None:
+            timeout = aiocampaign.campaign_timeout()
+        self.target = target
+        self.timeout = timeout
+        self.events = events
+        self.token = 0
+        self.buf = b""
+        self.inferior_pid = None
+        self.proc = subprocess.Popen(
+            [GDB, "--interpreter=mi2", "--nx", "--quiet", target],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+
+        deadline = time.monotonic() + max(timeout, 30)  # symbol loading
+        self._read_until(lambda line: line.startswith("(gdb)"), deadline)
+        for cmd in ["-gdb-set pagination off",
+                    "-gdb-set confirm off",
+                    "-gdb-set startup-with-shell off",
+                    "-inferior-tty-set /dev/null",  # keep inferior output off the MI stream
+                    "-break-insert main"]:
+            self.command(cmd, deadline)
+        if hpc.backend() == "rusage":
+            # Stand-in counters are read from /proc just before the inferior exits
+            self.command('-interpreter-exec console "catch syscall exit_group"', deadline)
+
+    # ----------------------------------------
+    # MI transport
+    # ----------------------------------------
+
+    def _readline(self, deadline):
+        fd = self.proc.stdout.fileno()
+        while b"\n" not in self.buf:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise GdbTimeout(self.target)
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise EOFError("gdb exited")
+            self.buf += chunk
+        line, self.buf = self.buf.split(b"\n", 1)
+        line = line.decode(errors="replace").rstrip("\r")
+
+        if line.startswith("=thread-group-started"):
+            self.inferior_pid = int(parse_fields(line)["pid"])
+        return line
+
+    def _read_until(self, match, deadline):
+        while True:
+            line = self._readline(deadline)
+            if match(line):
+                return line
+
+    def command(self, cmd, deadline):
+        """
+        Send one MI command and wait for its result record.
+        Returns: (result class, fields) e.g. ("done", {...})
+        """
+        self.token += 1
+        prefix = f"{self.token}^"
+        self.proc.stdin.write(f"{self.token}{cmd}\n".encode())
+        self.proc.stdin.flush()
+
+        line = self._read_until(lambda l: l.startswith(prefix), deadline)
+        result = line[len(prefix):]
+        cls = result.split(',', 1)[0]
+        if cls == "error":
+            raise RuntimeError(f"gdb: {cmd}: {parse_fields(result).get('msg', result)}")
+        return cls, parse_fields(result)
+
+    def wait_stopped(self, deadline):
+        """Wait for the next *stopped async record; returns its fields"""
+        line = self._read_until(lambda l: l.startswith("*stopped"), deadline)
+        return parse_fields(line)
+
+    def resume(self, cmd, deadline):
+        self.command(cmd, deadline)
+        return self.wait_stopped(deadline)
+
+    # ----------------------------------------
+    # One run
+    # ----------------------------------------
+
+    def run(self, reg=None, bit=None):
+        """
+        One run of the target: break main, next x3, flip bit `bit` of $reg
+        (no flip if reg is None), continue to the end.
+        Returns: (outcome, counts)
+          outcome: "exit:<code>", "signal:<name>" or "hang"
+          counts: up to the exit, the signal or the deadline; None if the
+          inferior could not be counted (e.g. it never reached main)
+        """
+        deadline = time.monotonic() + self.timeout
+        group = None
+        usage = None
+        try:
+            stop = self.resume("-exec-run", deadline)
+            if stop.get("reason") == "breakpoint-hit":
+                if hpc.backend() == "perf":
+                    # Inferior is stopped at main(): count the benchmark only
+                    group = hpc.CounterGroup(self.inferior_pid, self.events, on_exec=False)
+
+                for _ in range(NEXT_STEPS):
+                    stop = self.resume("-exec-next", deadline)
+                    if stop.get("reason") != "end-stepping-range":
+                        break
+                else:
+                    if reg is not None:
+                        self.command(f'-data-evaluate-expression "${reg} = ${reg} ^ (1ULL << {bit})"',
+                                     deadline)
+                    stop = self.resume("-exec-continue", deadline)
+
+            if stop.get("reason") == "syscall-entry":
+                usage = proc_usage(self.inferior_pid)
+                stop = self.resume("-exec-continue", deadline)
+
+            reason = stop.get("reason")
+            if reason == "exited-normally":
+                outcome = "exit:0"
+            elif reason == "exited":
+                outcome = f"exit:{int(stop.get('exit-code', '0'), 8)}"
+            elif reason in ("signal-received", "exited-signalled"):
+                outcome = f"signal:{stop.get('signal-name')}"
+                if reason == "signal-received":
+                    if usage is None:
+                        usage = self._usage()  # still stopped at the signal: no exit syscall
+                    self.command('-interpreter-exec console "kill"', deadline)
+            else:
+                outcome = f"stopped:{reason}"
+                self.command('-interpreter-exec console "kill"', deadline)
+
+            if group is not None:
+                counts = group.read()
+            elif usage is not None:
+                counts = hpc.rusage_counts(usage, self.events)
+            else:
+                counts = None
+            return outcome, counts
+
+        except GdbTimeout:
+            # Hung inferior (or GDB): counts up to the deadline, then a fresh session
+            if group is not None:
+                counts = group.read()
+            else:
+                usage = usage or self._usage()
+                counts = hpc.rusage_counts(usage, self.events) if usage is not None else None
+            self.restart()
+            return "hang", counts
+        finally:
+            if group is not None:
+                group.close()
+
+    def _usage(self):
+        """proc_usage() of the live inferior, None if it is gone"""
+        try:
+            return proc_usage(self.inferior_pid)
+        except (OSError, TypeError, IndexError, ValueError):
+            return None
+
+    # ----------------------------------------
+    # Lifetime
+    # ----------------------------------------
+
+    def close(self):
+        if self.inferior_pid is not None:
+            try:
+                os.kill(self.inferior_pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        self.proc.stdin.close()
+        self.proc.stdout.close()
+
+    def restart(self):
+        self.close()
+        self.__init__(self.target, self.timeout, self.events)
+
+
+# ============================================
+# Per-worker sessions
+# ============================================
+
+_sessions = {}
+
+
+def get_session(target, timeout=None):
+    """The calling process' GDB session for target (started on first use)"""
+    key = (os.getpid(), target)
+    if key not in _sessions:
+        _sessions[key] = GdbSession(target, timeout)
+    return _sessions[key]
@@ -0,0 +1,114 @@
+/*
+ * golden_profile.c - Golden-run profiler for the fault-space index (ARM64)
+ *
+ * Runs the target once without a fault: advances it to the start of the
+ * injection window (perf_trigger.h), then single-steps through the window
+ * and prints every executed instruction, so fault_space.py can work out
+ * which registers are live at each injection point. A lookahead past the
+ * window lets reads just after its end be seen too.
+ *
+ * Usage: golden_profile [-s start] [-e end] [-l lookahead] <target_program>
+ *   default window: 10000..60000 instructions (simple_injector's range)
+ * Output:
+ *   base <load address of the executable>
+ *   <instructions> <pc> <insn>   one per step: position (instructions retired
+ *                                before it, the -n of simple_injector), pc and
+ *                                instruction word, both hex
+ *   total <instructions>         dynamic instruction count of the whole run
+ *                                (-1 if perf events are unavailable)
+ *   status <wait status>
+ */
+
+#define _GNU_SOURCE  // F_SETOWN_EX / F_SETSIG for perf_trigger.h
+#include <errno.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/ptrace.h>
+#include <sys/types.h>
+#include <sys/wait.h>
+#include <sys/user.h>
+#include <sys/uio.h>
+#include <unistd.h>
+#include <linux/elf.h>
+
+#include "perf_trigger.h"
+#include "hpc_counters.h"
+
+struct user_pt_regs_arm64 {
+    __u64 regs[31];
+    __u64 sp;
+    __u64 pc;
+    __u64 pstate;
+};
+
+static void usage(const char *prog) {
+    fprintf(stderr, "Usage: %s [-s start] [-e end] [-l lookahead] <target_program>\n", prog);
+    exit(1);
+}
+
+int main(int argc, char *argv[]) {
+    long start = 10000, end = 60000, lookahead = 256;
+    struct user_pt_regs_arm64 regs;
+    struct iovec iov;
+    struct hpc_group group;
+    uint64_t values[HPC_NUM_EVENTS];
+    int have_group;
+    pid_t target_pid;
+    int status = -1;
+    int opt;
+
+    while ((opt = getopt(argc, argv, "s:e:l:")) != -1) {
+        switch (opt) {
+        case 's': start = atol(optarg); break;
+        case 'e': end = atol(optarg); break;
+        case 'l': lookahead = atol(optarg); break;
+        default: usage(argv[0]);
+        }
+    }
+    if (optind >= argc || start < 0 || end < start)
+        usage(argv[0]);
+
+    target_pid = fork();
+    if (target_pid == 0) {
+        ptrace(PTRACE_TRACEME, 0, NULL, NULL);
+        execl(argv[optind], argv[optind], NULL);
+        exit(1);
+    }
+
+    // Stopped at exec: both the trigger and the total count start here
+    waitpid(target_pid, &status, 0);
+    have_group = hpc_open(&group, target_pid, 0, 0) == 0;
+    printf("base %#lx\n", exe_load_base(target_pid));
+
+    iov.iov_base = &regs;
+    iov.iov_len = sizeof(regs);
+    long reached = advance_instructions(target_pid, start);  // > start: skid overshot, rows from there
+    int alive = reached >= 0;
+    if (alive) {
+        for (long position = reached; position < end + lookahead; position++) {
+            errno = 0;
+            if (ptrace(PTRACE_GETREGSET, target_pid, NT_PRSTATUS, &iov) < 0)
+                break;
+            long word = ptrace(PTRACE_PEEKTEXT, target_pid, (void *)regs.pc, NULL);
+            if (errno)
+                break;
+            printf("%ld %llx %08x\n", position, (unsigned long long)regs.pc, (unsigned)(word & 0xffffffff));
+            if (singlestep_n(target_pid, 1) < 0) {
+                alive = 0;  // exited inside the window
+                break;
+            }
+        }
+    }
+    // (an early exit leaves a truncated trace: total tells how far the run got)
+
+    status = alive ? finish_tracee(target_pid) : -1;
+    if (have_group && hpc_read(&group, values) == 0)
+        printf("total %llu\n", (unsigned long long)values[1]);
+    else
+        printf("total -1\n");
+    printf("status %d\n", status);
+    if (have_group)
+        hpc_close(&group);
+    return 0;
+}
@@ -0,0 +1,555 @@
+"""
+hpc.py - In-process HPC counter reader (perf_event_open)
+
+Replaces the per-run `sudo perf stat -e ... -x,` shell-outs: the HPC events
+are opened as one counter group on the forked child (enable-on-exec,
+inherit) and read back as a single binary struct after it exits.
+
+When perf events are unavailable (containers, VMs without a PMU) a software
+stand-in built from the child's rusage is used instead, so the collection
+pipeline can still be tested end to end. backend() tells which one is active;
+FI_COUNTERS=perf|rusage forces one (collect.py --counters).
+
+Event sets are configurable per campaign (FI_EVENTS, collect.py --events):
+a preset from EVENT_SETS or a comma list of generic perf names, ARMv8 PMU
+event names (L1D_CACHE_REFILL, BR_MIS_PRED_RETIRED, STALL_BACKEND, ...) and
+raw "r<hex>" codes. More events than the PMU has counters are split into
+groups of at most FI_PMU_COUNTERS that the kernel multiplexes; every value is
+scaled by time_enabled / time_running like perf stat does.
+
+Trace mode (FI_TRACE, collect.py --trace) additionally records the first
+group's counter deltas at fixed intervals - every N us of task time or
+every N instructions. A sampling leader writes PERF_SAMPLE_READ records into
+an mmap'd perf ring buffer, which is only parsed after the run, so the cost
+is one PMU interrupt per interval and no extra process.
+"""
+
+import ctypes
+import errno
+import mmap
+import os
+import platform
+import signal
+import struct
+
+HPC_EVENTS = ("cycles", "instructions", "cache-misses", "branch-misses")
+PMU_COUNTERS = 6  # programmable counters of the Pi 4's Cortex-A72
+TRACE_PAGES = 64  # ring buffer data pages per traced run (FI_TRACE_PAGES)
+
+# ============================================
+# perf_event_open ABI (include/uapi/linux/perf_event.h)
+# ============================================
+PERF_TYPE_HARDWARE = 0
+PERF_TYPE_SOFTWARE = 1
+PERF_TYPE_RAW = 4
+
+PERF_COUNT_SW_TASK_CLOCK = 1
+
+HW_EVENTS = {
+    "cycles": (PERF_TYPE_HARDWARE, 0),         # PERF_COUNT_HW_CPU_CYCLES
+    "instructions": (PERF_TYPE_HARDWARE, 1),   # PERF_COUNT_HW_INSTRUCTIONS
+    "cache-misses": (PERF_TYPE_HARDWARE, 3),   # PERF_COUNT_HW_CACHE_MISSES
+    "branch-misses": (PERF_TYPE_HARDWARE, 5),  # PERF_COUNT_HW_BRANCH_MISSES
+    "branches": (PERF_TYPE_HARDWARE, 4),       # PERF_COUNT_HW_BRANCH_INSTRUCTIONS
+    "cache-references": (PERF_TYPE_HARDWARE, 2),
+    "task-clock": (PERF_TYPE_SOFTWARE, PERF_COUNT_SW_TASK_CLOCK),  # [ns]
+}
+
+# ARMv8 common PMU events (Arm ARM D7.10), opened as PERF_TYPE_RAW
+ARMV8_EVENTS = {
+    "L1I_CACHE_REFILL": 0x01,
+    "L1I_TLB_REFILL": 0x02,
+    "L1D_CACHE_REFILL": 0x03,
+    "L1D_CACHE": 0x04,
+    "L1D_TLB_REFILL": 0x05,
+    "LD_RETIRED": 0x06,
+    "ST_RETIRED": 0x07,
+    "INST_RETIRED": 0x08,
+    "EXC_TAKEN": 0x09,
+    "BR_MIS_PRED": 0x10,
+    "CPU_CYCLES": 0x11,
+    "BR_PRED": 0x12,
+    "MEM_ACCESS": 0x13,
+    "L1I_CACHE": 0x14,
+    "L1D_CACHE_WB": 0x15,
+    "L2D_CACHE": 0x16,
+    "L2D_CACHE_REFILL": 0x17,
+    "L2D_CACHE_WB": 0x18,
+    "BUS_ACCESS": 0x19,
+    "INST_SPEC": 0x1B,
+    "BR_RETIRED": 0x21,
+    "BR_MIS_PRED_RETIRED": 0x22,
+    "STALL_FRONTEND": 0x23,
+    "STALL_BACKEND": 0x24,
+}
+
+EVENT_SETS = {
+    "default": HPC_EVENTS,
+    # Memory / branch / pipeline behaviour of the Cortex-A72 (2 groups of 6)
+    "armv8": HPC_EVENTS + ("L1D_CACHE_REFILL", "L1I_CACHE_REFILL", "L2D_CACHE_REFILL",
+                           "L1D_TLB_REFILL", "BR_MIS_PRED_RETIRED", "BR_RETIRED",
+                           "STALL_FRONTEND", "STALL_BACKEND"),
+}
+
+PERF_FORMAT_TOTAL_TIME_ENABLED = 1 << 0
+PERF_FORMAT_TOTAL_TIME_RUNNING = 1 << 1
+PERF_FORMAT_GROUP = 1 << 3
+
+PERF_SAMPLE_TID = 1 << 1
+PERF_SAMPLE_TIME = 1 << 2
+PERF_SAMPLE_READ = 1 << 4
+
+PERF_RECORD_LOST = 2
+PERF_RECORD_SAMPLE = 9
+
+# struct perf_event_mmap_page: data_head / data_tail / data_offset / data_size
+MMAP_DATA_HEAD = 1024
+MMAP_DATA_TAIL = 1032
+MMAP_DATA_OFFSET = 1040
+
+# perf_event_attr flag bits
+ATTR_DISABLED = 1 << 0
+ATTR_INHERIT = 1 << 1
+ATTR_EXCLUDE_KERNEL = 1 << 5
+ATTR_EXCLUDE_HV = 1 << 6
+ATTR_ENABLE_ON_EXEC = 1 << 12
+
+PERF_FLAG_FD_CLOEXEC = 1 << 3
+
+NR_PERF_EVENT_OPEN = {
+    "aarch64": 241,
+    "armv7l": 364,
+    "armv6l": 364,
+    "x86_64": 298,
+}
+
+
+class PerfEventAttr(ctypes.Structure):
+    """struct perf_event_attr (PERF_ATTR_SIZE_VER5, 112 bytes)"""
+    _fields_ = [
+        ("type", ctypes.c_uint32),
+        ("size", ctypes.c_uint32),
+        ("config", ctypes.c_uint64),
+        ("sample_period", ctypes.c_uint64),
+        ("sample_type", ctypes.c_uint64),
+        ("read_format", ctypes.c_uint64),
+        ("flags", ctypes.c_uint64),
+        ("wakeup_events", ctypes.c_uint32),
+        ("bp_type", ctypes.c_uint32),
+        ("config1", ctypes.c_uint64),
+        ("config2", ctypes.c_uint64),
+        ("branch_sample_type", ctypes.c_uint64),
+        ("sample_regs_user", ctypes.c_uint64),
+        ("sample_stack_user", ctypes.c_uint32),
+        ("clockid", ctypes.c_int32),
+        ("sample_regs_intr", ctypes.c_uint64),
+        ("aux_watermark", ctypes.c_uint32),
+        ("sample_max_stack", ctypes.c_uint16),
+        ("reserved_2", ctypes.c_uint16),
+    ]
+
+
+_libc = ctypes.CDLL(None, use_errno=True)
+_libc.syscall.restype = ctypes.c_long
+
+
+def perf_event_open(attr, pid, cpu=-1, group_fd=-1, flags=PERF_FLAG_FD_CLOEXEC):
+    """Raw syscall wrapper, raises OSError on failure"""
+    nr = NR_PERF_EVENT_OPEN.get(platform.machine())
+    if nr is None:
+        raise OSError(errno.ENOSYS, f"perf_event_open: unsupported arch {platform.machine()}")
+    attr.size = ctypes.sizeof(PerfEventAttr)
+    fd = _libc.syscall(nr, ctypes.byref(attr), ctypes.c_int(pid), ctypes.c_int(cpu),
+                       ctypes.c_int(group_fd), ctypes.c_ulong(flags))
+    if fd < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, f"perf_event_open: {os.strerror(err)}")
+    return fd
+
+
+# ============================================
+# Event sets
+# ============================================
+
+def event_config(name):
+    """Event name -> (perf type, config); raises ValueError for unknown names"""
+    if name in HW_EVENTS:
+        return HW_EVENTS[name]
+    if name.upper() in ARMV8_EVENTS:
+        return PERF_TYPE_RAW, ARMV8_EVENTS[name.upper()]
+    if name[:1] == "r" and len(name) > 1:
+        try:
+            return PERF_TYPE_RAW, int(name[1:], 16)
+        except ValueError:
+            pass
+    raise ValueError(f"unknown HPC event '{name}' (generic perf names, ARMv8 PMU names "
+                     f"such as L1D_CACHE_REFILL, or raw r<hex>)")
+
+
+def parse_events(spec):
+    """"armv8" or "cycles,instructions,L1D_CACHE_REFILL,r24" -> tuple of event names"""
+    if spec in EVENT_SETS:
+        return EVENT_SETS[spec]
+    events = tuple(name.strip() for name in spec.split(",") if name.strip())
+    for name in events:
+        event_config(name)
+    if not events:
+        raise ValueError("empty HPC event list")
+    return events
+
+
+def campaign_events():
+    """Event set of this campaign (FI_EVENTS, default: the four generic events)"""
+    return parse_events(os.environ.get("FI_EVENTS", "default"))
+
+
+def pmu_counters():
+    return max(1, int(os.environ.get("FI_PMU_COUNTERS", PMU_COUNTERS)))
+
+
+def event_column(name):
+    """Sample store column of an event ("cache-misses" -> "cache_misses")"""
+    return name.lower().replace("-", "_")
+
+
+def event_columns(events=None):
+    return [event_column(name) for name in (campaign_events() if events is None else events)]
+
+
+def counted_row(row, events=None):
+    """Row carries every counter column of the event set (a value, or None: not counted on purpose)"""
+    return all(name in row for name in event_columns(events))
+
+
+def schedule(events, counters=None, first=None):
+    """
+    Split events into groups that fit the hardware counters. Each group is
+    scheduled on the PMU as a whole, so ratios inside a group are exact;
+    the kernel time-multiplexes between groups. first: room in the first
+    group if a counter there is taken (trace sampling leader).
+    """
+    counters = counters or pmu_counters()
+    first = counters if first is None else max(1, first)
+    groups = [tuple(events[:first])]
+    return groups + [tuple(events[i:i + counters]) for i in range(first, len(events), counters)]
+
+
+def parse_trace(spec):
+    """
+    "100us" / "2ms" (task time) or "1000000insn" (retired instructions)
+    -> (sampling leader event, period); None/"" -> None (no trace)
+    """
+    if not spec:
+        return None
+    units = [("insn", "instructions", 1), ("us", "task-clock", 1000), ("ms", "task-clock", 1000000)]
+    for suffix, event, factor in units:
+        if spec.endswith(suffix) and spec[:-len(suffix)].isdigit():
+            period = int(spec[:-len(suffix)]) * factor
+            if period > 0:
+                return event, period
+    raise ValueError(f"bad trace interval '{spec}' (e.g. 100us, 2ms, 1000000insn)")
+
+
+def campaign_trace():
+    """Trace interval of this campaign (FI_TRACE), None if not tracing"""
+    return parse_trace(os.environ.get("FI_TRACE", ""))
+
+
+def trace_pages():
+    # Ring buffer size must be a power of two pages
+    pages = max(1, int(os.environ.get("FI_TRACE_PAGES", TRACE_PAGES)))
+    return 1 << (pages - 1).bit_length()
+
+
+def trace_columns(events=None):
+    """Columns of one trace interval: time since start [ns] + first group's deltas"""
+    events = campaign_events() if events is None else events
+    first = pmu_counters() - (1 if campaign_trace() and campaign_trace()[0] == "instructions" else 0)
+    return ["time_ns"] + event_columns(schedule(events, first=first)[0])
+
+
+def scale(value, enabled, running):
+    """Multiplexed count -> estimate for the whole enabled time (perf stat scaling)"""
+    if running == 0:
+        return 0
+    if running >= enabled:
+        return value
+    return int(round(value * enabled / running))
+
+
+# ============================================
+# Counter group
+# ============================================
+
+class CounterGroup:
+    """
+    The HPC events opened as counter groups on a (not yet exec'd) child,
+    at most pmu_counters() events per group (see schedule()).
+    The group leaders are disabled and enabled on exec, so only the target
+    program is counted; inherit makes tracees forked by the injector count too.
+    With on_exec=False the groups count right away (for a child that is
+    already stopped at its start, e.g. a fork-server copy).
+
+    trace=(leader event, period) from parse_trace() puts a sampling leader in
+    front of the first group; after close(), self.trace holds one row per
+    interval: [time_ns, delta of each first-group event] (trace_columns()).
+    """
+
+    def __init__(self, pid, events=None, on_exec=True, trace=None):
+        self.events = tuple(campaign_events() if events is None else events)
+        self.groups = []  # list of fds per group, leader first
+        self.grouped = True
+        self.on_exec = on_exec
+        self.multiplexed = False
+        self.sampling = trace
+        self.ring = None
+        self.final = None  # (time_enabled, raw first-group values) of the last read()
+        self.trace = None
+        self.trace_lost = 0
+        try:
+            self._open(pid, exclude_kernel=False)
+        except PermissionError:
+            # perf_event_paranoid >= 2: user space only (what perf stat falls back to)
+            self._open(pid, exclude_kernel=True)
+
+    def _attr(self, name, leader, exclude_kernel):
+        attr = PerfEventAttr()
+        attr.type, attr.config = event_config(name)
+        attr.read_format = PERF_FORMAT_TOTAL_TIME_ENABLED | PERF_FORMAT_TOTAL_TIME_RUNNING
+        if self.grouped:
+            attr.read_format |= PERF_FORMAT_GROUP
+        attr.flags = ATTR_INHERIT
+        if leader and self.on_exec:
+            attr.flags |= ATTR_DISABLED | ATTR_ENABLE_ON_EXEC
+        if exclude_kernel:
+            attr.flags |= ATTR_EXCLUDE_KERNEL | ATTR_EXCLUDE_HV
+        return attr
+
+    def _open_sampler(self, pid, exclude_kernel):
+        """Sampling leader of the first group, with its ring buffer mapped"""
+        name, period = self.sampling
+        attr = self._attr(name, True, exclude_kernel)
+        attr.sample_period = period
+        attr.sample_type = PERF_SAMPLE_TID | PERF_SAMPLE_TIME | PERF_SAMPLE_READ
+        try:
+            fd = perf_event_open(attr, pid)
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+            # Kernels before 6.13 refuse inherit with PERF_SAMPLE_READ:
+            # trace only the process the group is attached to
+            attr.flags &= ~ATTR_INHERIT
+            fd = perf_event_open(attr, pid)
+        try:
+            # PROT_WRITE: the kernel stops (and counts LOST) instead of overwriting
+            self.ring = mmap.mmap(fd, (1 + trace_pages()) * mmap.PAGESIZE, mmap.MAP_SHARED,
+                                  mmap.PROT_READ | mmap.PROT_WRITE)
+        except OSError:
+            os.close(fd)
+            raise
+        return fd
+
+    def _open(self, pid, exclude_kernel):
+        self.close()
+        tracing = self.sampling is not None
+        first = pmu_counters() - (1 if tracing and self.sampling[0] == "instructions" else 0)
+        try:
+            for g, events in enumerate(schedule(self.events, first=first)):
+                fds = []
+                self.groups.append(fds)
+                if g == 0 and tracing:
+                    fds.append(self._open_sampler(pid, exclude_kernel))
+                for name in events:
+                    fds.append(perf_event_open(self._attr(name, not fds, exclude_kernel), pid,
+                                               group_fd=fds[0] if fds else -1))
+        except OSError as e:
+            self.close()
+            if e.errno != errno.EINVAL or not self.grouped:
+                raise
+            # Older kernels refuse PERF_FORMAT_GROUP together with inherit:
+            # fall back to independent counters read one by one (no trace)
+            self.grouped = False
+            self.sampling = None
+            for name in self.events:
+                self.groups.append([perf_event_open(self._attr(name, True, exclude_kernel), pid)])
+
+    def read(self):
+        """Counter values (ints, in event order), scaled if multiplexed"""
+        counts = []
+        for g, fds in enumerate(self.groups):
+            if self.grouped:
+                n = len(fds)
+                # struct read_format { nr; time_enabled; time_running; values[nr]; }
+                values = struct.unpack(f"<{3 + n}Q", os.read(fds[0], 8 * (3 + n)))
+                enabled, running = values[1], values[2]
+                values = values[3:3 + n]
+                if g == 0 and self.ring is not None:
+                    values = values[1:]  # sampling leader is not a campaign event
+                    self.final = (enabled, values)
+            else:
+                value, enabled, running = struct.unpack("<3Q", os.read(fds[0], 24))
+                values = [value]
+            if running < enabled:
+                self.multiplexed = True
+            counts.extend(scale(value, enabled, running) for value in values)
+        return counts
+
+    def _drain(self):
+        """Ring buffer -> per-interval delta rows of the most sampled thread"""
+        ring = self.ring
+        head, tail = struct.unpack_from("<QQ", ring, MMAP_DATA_HEAD)
+        offset, size = struct.unpack_from("<QQ", ring, MMAP_DATA_OFFSET)
+        if size == 0:
+            offset, size = mmap.PAGESIZE, len(ring) - mmap.PAGESIZE  # kernels before 4.1
+        data = ring[offset:offset + size]
+        start = tail % size
+        data = (data[start:] + data[:start])[:head - tail]
+
+        samples = {}  # tid -> [(time_enabled, values)]
+        pos = 0
+        while pos + 8 <= len(data):
+            kind, _, length = struct.unpack_from("<IHH", data, pos)
+            if length == 0:
+                break
+            if kind == PERF_RECORD_SAMPLE:
+                # { pid, tid; time; nr; time_enabled; time_running; values[nr] }
+                _, tid, _, nr, enabled, _ = struct.unpack_from("<IIQQQQ", data, pos + 8)
+                values = struct.unpack_from(f"<{nr}Q", data, pos + 48)
+                samples.setdefault(tid, []).append((enabled, values[1:]))
+            elif kind == PERF_RECORD_LOST:
+                self.trace_lost += struct.unpack_from("<QQ", data, pos + 8)[1]
+            pos += length
+
+        points = max(samples.values(), key=len) if samples else []
+        if self.final is not None:
+            points.append(self.final)  # last interval: up to the exit
+        rows = []
+        prev = None
+        for enabled, values in points:
+            if prev is None:
+                deltas = list(values)
+            else:
+                deltas = [max(0, value - before) for value, before in zip(values, prev)]
+            rows.append([enabled] + deltas)
+            prev = values
+        return rows
+
+    def close(self):
+        if self.ring is not None:
+            self.trace = self._drain()
+            self.ring.close()
+            self.ring = None
+        for fds in self.groups:
+            for fd in fds:
+                os.close(fd)
+        self.groups = []
+
+
+# ============================================
+# Software stand-in (no perf events available)
+# ============================================
+
+# event name -> value derived from the child's rusage
+RUSAGE_STANDIN = {
+    "cycles": lambda ru: int((ru.ru_utime + ru.ru_stime) * 1e9),   # cpu time [ns]
+    "instructions": lambda ru: int(ru.ru_utime * 1e9),            # user time [ns]
+    "cache-misses": lambda ru: ru.ru_minflt + ru.ru_majflt,       # page faults
+    "branch-misses": lambda ru: ru.ru_nvcsw + ru.ru_nivcsw,       # context switches
+}
+
+
+def rusage_counts(usage, events=None):
+    if events is None:
+        events = campaign_events()
+    return [RUSAGE_STANDIN.get(name, lambda ru: 0)(usage) for name in events]
+
+
+_backend = None
+
+
+def backend():
+    """'perf' if hardware counters can be opened here, otherwise 'rusage'"""
+    global _backend
+    if _backend is None and os.environ.get("FI_COUNTERS") in ("perf", "rusage"):
+        _backend = os.environ["FI_COUNTERS"]
+    if _backend is None:
+        try:
+            CounterGroup(0, HPC_EVENTS[:1]).close()
+            _backend = "perf"
+        except OSError:
+            _backend = "rusage"
+    return _backend
+
+
+# ============================================
+# Measured execution
+# ============================================
+
+def spawn_counted(argv, env=None, events=None, stdout=None, cpu=None, trace=None, stderr=None):
+    """
+    Fork/exec argv with the counter group attached to the child.
+    The child gets its own process group (so a hung tool and its target can
+    be killed together), is pinned to `cpu` if given, and writes its stdout
+    and stderr to the fds `stdout` / `stderr` (default: /dev/null). trace: see CounterGroup.
+    Returns: (pid, group) - group is None with the rusage stand-in
+    """
+    ready_r, ready_w = os.pipe()
+    pid = os.fork()
+
+    if pid == 0:
+        # [Child] wait until the parent has attached the counters, then exec
+        try:
+            os.close(ready_w)
+            os.setpgid(0, 0)
+            os.read(ready_r, 1)
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull if stdout is None else stdout, 1)
+            os.dup2(devnull if stderr is None else stderr, 2)
+            if env is None:
+                os.execv(argv[0], argv)
+            else:
+                os.execve(argv[0], argv, env)
+        finally:
+            os._exit(127)
+
+    # [Parent]
+    os.close(ready_r)
+    group = None
+    try:
+        if cpu is not None:
+            os.sched_setaffinity(pid, {cpu})
+        if backend() == "perf":
+            group = CounterGroup(pid, events, trace=trace)
+    except OSError:
+        # Never mix stand-in values into a perf campaign
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        os.close(ready_w)
+        raise
+    os.write(ready_w, b"1")
+    os.close(ready_w)
+    return pid, group
+
+
+def reap_counted(pid, group, events=None):
+    """
+    Wait for a child started by spawn_counted() and read its counters.
+    Returns: (counts, status) - counts in `events` order, status is the raw
+    wait status of the child (os.waitstatus_to_exitcode() to decode)
+    """
+    _, status, usage = os.wait4(pid, 0)
+    if group is not None:
+        counts = group.read()
+        group.close()
+    else:
+        counts = rusage_counts(usage, events)
+    return counts, status
+
+
+def run_counted(argv, env=None, events=None):
+    """
+    Fork/exec argv with the counter group attached and wait for it.
+    Returns: (counts, status) like reap_counted()
+    """
+    pid, group = spawn_counted(argv, env, events)
+    return reap_counted(pid, group, events)
@@ -0,0 +1,117 @@
+/*
+ * hpc_counters.h - The four HPC events as one perf counter group (C side)
+ *
+ * Same events and order as hpc.py / the CSV schema:
+ *   cycles, instructions, cache-misses, branch-misses
+ * hpc_standin() fills the same slots from rusage (cpu time, user time, page
+ * faults, context switches), like hpc.py - only for a campaign on the rusage
+ * backend (hpc_standin_selected(): FI_COUNTERS=rusage, exported by
+ * collect.py). A perf campaign whose counters cannot be opened fails instead
+ * of mixing stand-in values into the perf columns.
+ */
+
+#ifndef HPC_COUNTERS_H
+#define HPC_COUNTERS_H
+
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+#include <linux/perf_event.h>
+#include <sys/ioctl.h>
+#include <sys/resource.h>
+#include <sys/syscall.h>
+#include <sys/types.h>
+
+#define HPC_NUM_EVENTS 4
+
+static const uint64_t hpc_event_config[HPC_NUM_EVENTS] = {
+    PERF_COUNT_HW_CPU_CYCLES,
+    PERF_COUNT_HW_INSTRUCTIONS,
+    PERF_COUNT_HW_CACHE_MISSES,
+    PERF_COUNT_HW_BRANCH_MISSES,
+};
+
+struct hpc_group {
+    int fds[HPC_NUM_EVENTS];
+};
+
+/*
+ * Open the group on pid. on_exec: count from the next exec (for a child that
+ * has not exec'd yet), otherwise count right away. inherit: also count
+ * children the task forks later. Returns 0, or -1 if perf is unavailable.
+ */
+static inline int hpc_open(struct hpc_group *g, pid_t pid, int on_exec, int inherit) {
+    struct perf_event_attr attr;
+    int exclude_kernel = 0;
+
+    for (int i = 0; i < HPC_NUM_EVENTS; i++)
+        g->fds[i] = -1;
+
+    for (int i = 0; i < HPC_NUM_EVENTS; i++) {
+        memset(&attr, 0, sizeof(attr));
+        attr.size = sizeof(attr);
+        attr.type = PERF_TYPE_HARDWARE;
+        attr.config = hpc_event_config[i];
+        attr.read_format = PERF_FORMAT_GROUP;
+        attr.inherit = inherit;
+        attr.exclude_kernel = exclude_kernel;
+        attr.exclude_hv = 1;
+        if (i == 0 && on_exec) {
+            attr.disabled = 1;
+            attr.enable_on_exec = 1;
+        }
+        g->fds[i] = syscall(__NR_perf_event_open, &attr, pid, -1,
+                            i == 0 ? -1 : g->fds[0], PERF_FLAG_FD_CLOEXEC);
+        if (g->fds[i] < 0 && i == 0 && !exclude_kernel) {
+            // perf_event_paranoid >= 2: user space only (what perf stat does)
+            exclude_kernel = 1;
+            i--;
+            continue;
+        }
+        if (g->fds[i] < 0) {
+            for (int j = 0; j < i; j++)
+                close(g->fds[j]);
+            g->fds[0] = -1;
+            return -1;
+        }
+    }
+    return 0;
+}
+
+/* Read all counters at once (struct read_format with PERF_FORMAT_GROUP) */
+static inline int hpc_read(struct hpc_group *g, uint64_t values[HPC_NUM_EVENTS]) {
+    uint64_t buf[1 + HPC_NUM_EVENTS];
+
+    if (g->fds[0] < 0 || read(g->fds[0], buf, sizeof(buf)) != sizeof(buf))
+        return -1;
+    memcpy(values, &buf[1], sizeof(uint64_t) * HPC_NUM_EVENTS);
+    return 0;
+}
+
+static inline void hpc_close(struct hpc_group *g) {
+    for (int i = 0; i < HPC_NUM_EVENTS; i++) {
+        if (g->fds[i] >= 0)
+            close(g->fds[i]);
+        g->fds[i] = -1;
+    }
+}
+
+/* The campaign runs on the rusage stand-in (FI_COUNTERS=rusage) */
+static inline int hpc_standin_selected(void) {
+    const char *backend = getenv("FI_COUNTERS");
+    return backend != NULL && strcmp(backend, "rusage") == 0;
+}
+
+/* Software stand-in values (same mapping as hpc.py RUSAGE_STANDIN) */
+static inline void hpc_standin(const struct rusage *ru, uint64_t values[HPC_NUM_EVENTS]) {
+    uint64_t utime_ns = ru->ru_utime.tv_sec * 1000000000ULL + ru->ru_utime.tv_usec * 1000ULL;
+    uint64_t stime_ns = ru->ru_stime.tv_sec * 1000000000ULL + ru->ru_stime.tv_usec * 1000ULL;
+
+    values[0] = utime_ns + stime_ns;
+    values[1] = utime_ns;
+    values[2] = ru->ru_minflt + ru->ru_majflt;
+    values[3] = ru->ru_nvcsw + ru->ru_nivcsw;
+}
+
+#endif
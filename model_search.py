@@ -0,0 +1,253 @@
+"""
+model_search.py - Parallel hyperparameter search for the fault detector
+
+Evaluates every configuration of GRID (Random Forest, SVM, gradient boosting)
+with stratified k-fold cross-validation on the campaign worker pool
+(campaign.run_campaign: one pinned worker per core). The feature matrix is
+written once to .npy files that the workers memory-map, so no worker gets a
+pickled copy of the data.
+
+Results are cached per (configuration, fold) in
+models/search/<data key>/results.jsonl, keyed by the content hash of the
+input data: rerunning with an extended grid only evaluates the new points.
+
+  python3 model_search.py                         # GRID, 5 folds
+  python3 model_search.py --models rf,gb --folds 10
+  python3 model_search.py --grid my_grid.json     # {"rf": {"max_depth": [5, 10]}, ...}
+  python3 model_search.py --features derived      # features.py ratios + z-scores
+  python3 model_search.py --features trace        # + trace window statistics (traced inputs)
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import campaign
+import features
+import sample_store
+import train_ml_model
+
+SEARCH_DIR = "models/search"
+FOLDS = 5
+SEED = 42
+
+GRID = {
+    "rf": {"n_estimators": [100, 300], "max_depth": [10, 20, None]},
+    "svm": {"C": [0.1, 1.0, 10.0], "gamma": ["scale", 0.1, 1.0]},
+    "gb": {"learning_rate": [0.05, 0.1], "max_depth": [3, None], "max_iter": [100, 300]},
+}
+
+
+def make_model(name, params):
+    from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+    from sklearn.svm import SVC
+
+    cls = {"rf": RandomForestClassifier, "svm": SVC, "gb": HistGradientBoostingClassifier}[name]
+    return cls(random_state=SEED, **params)
+
+
+def configurations(grid):
+    """(model, params) for every point of the grid, in grid order"""
+    for name, space in grid.items():
+        keys = list(space)
+        for values in itertools.product(*(space[key] for key in keys)):
+            yield name, dict(zip(keys, values))
+
+
+def config_key(name, params):
+    return json.dumps([name, params], sort_keys=True)
+
+
+# ============================================
+# Shared data (memory-mapped .npy)
+# ============================================
+
+def data_key(inputs, folds, stage="raw"):
+    digest = hashlib.sha256(json.dumps([folds, SEED, stage]).encode())
+    for path in inputs:
+        digest.update(sample_store.content_hash(path).encode())
+    return digest.hexdigest()[:16]
+
+
+def prepare_data(inputs, folds, directory, stage="raw"):
+    """
+    Write X.npy (float64 features), y.npy (labels) and fold.npy (stratified
+    fold of each row) once per data key; streamed chunk by chunk from the
+    inputs, so the matrix is never held twice in memory. Rows without
+    measured counters (features.counted_mask) are left out.
+    """
+    if os.path.exists(os.path.join(directory, "fold.npy")):
+        with open(os.path.join(directory, "features.json")) as f:
+            return json.load(f)
+
+    from sklearn.model_selection import StratifiedKFold
+
+    os.makedirs(directory, exist_ok=True)
+    columns, names, base = train_ml_model.feature_plan(inputs, stage)
+    rows = sum(features.counted_rows(path) for path in inputs)
+
+    X = np.lib.format.open_memmap(os.path.join(directory, "X.npy"), mode="w+",
+                                  dtype=np.float64, shape=(rows, len(names)))
+    y = np.lib.format.open_memmap(os.path.join(directory, "y.npy"), mode="w+", dtype=np.int64, shape=(rows,))
+    start = 0
+    trace = any(name in features.TRACE_FEATURES for name in names)
+    for path in inputs:
+        traces = features.trace_arrays(path, golden=inputs[0]) if trace else {}
+        kept = 0  # counted rows consumed (row order of features.load)
+        for chunk in sample_store.iter_chunks(path, features.input_columns(path, columns + ["label"])):
+            chunk = features.counted_only(chunk)
+            end = start + len(chunk["label"])
+            chunk.update({name: values[kept:kept + end - start] for name, values in traces.items()})
+            kept += end - start
+            X[start:end] = features.model_input(chunk, names, base)
+            y[start:end] = chunk["label"]
+            start = end
+    X.flush()
+    y.flush()
+
+    fold = np.empty(rows, dtype=np.int8)
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=SEED)
+    for i, (_, test) in enumerate(splitter.split(np.zeros(rows), y)):
+        fold[test] = i
+    with open(os.path.join(directory, "features.json"), "w") as f:
+        json.dump(names, f)
+    np.save(os.path.join(directory, "fold.npy"), fold)  # last: marks the data complete
+    return names
+
+
+# ============================================
+# Worker
+# ============================================
+
+_data = {}
+
+
+def _load(directory):
+    """Memory-map the shared arrays once per worker"""
+    if _data.get("directory") != directory:
+        _data.update(directory=directory,
+                     **{name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                        for name in ("X", "y", "fold")})
+    return _data["X"], _data["y"], _data["fold"]
+
+
+def _evaluate(task):
+    """One (configuration, fold): fit scaler + model on the other folds"""
+    from sklearn.metrics import accuracy_score, f1_score
+    from sklearn.preprocessing import StandardScaler
+
+    directory, name, params, k = task
+    X, y, fold = _load(directory)
+    train, test = fold != k, fold == k
+
+    start = time.perf_counter()
+    scaler = StandardScaler()
+    model = make_model(name, params)
+    model.fit(scaler.fit_transform(X[train]), y[train])
+    fit_seconds = time.perf_counter() - start
+    pred = model.predict(scaler.transform(X[test]))
+    return {
+        "accuracy": float(accuracy_score(y[test], pred)),
+        "f1": float(f1_score(y[test] != 0, pred != 0)),  # fault = label != 0
+        "fit_seconds": round(fit_seconds, 3),
+    }
+
+
+# ============================================
+# Search
+# ============================================
+
+def load_results(path):
+    results = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    results[(config_key(record["model"], record["params"]), record["fold"])] = record
+    return results
+
+
+def search(inputs, grid, folds=FOLDS, stage="raw"):
+    key = data_key(inputs, folds, stage)
+    directory = os.path.join(SEARCH_DIR, key)
+    names = prepare_data(inputs, folds, directory, stage)
+    results_path = os.path.join(directory, "results.jsonl")
+    results = load_results(results_path)
+
+    configs = list(configurations(grid))
+    tasks = [(directory, name, params, k) for name, params in configs for k in range(folds)
+             if (config_key(name, params), k) not in results]
+    print(f"Data: {key} ({', '.join(names)})")
+    print(f"Configurations: {len(configs)} x {folds} folds, cached: {len(configs) * folds - len(tasks)}, "
+          f"to evaluate: {len(tasks)}")
+    print(f"Workers: {campaign.describe()}")
+
+    # 결과는 parent만 기록 (fold 단위로 바로 append → 중단돼도 다음 실행에서 이어감)
+    with open(results_path, "a") as f:
+        for done, (task, result) in enumerate(campaign.run_campaign(_evaluate, tasks, ordered=False), 1):
+            _, name, params, k = task
+            record = dict(model=name, params=params, fold=k, **result)
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            results[(config_key(name, params), k)] = record
+            print(f"  [{done}/{len(tasks)}] {name} {params} fold {k}: {result['accuracy']:.2%}")
+
+    summary = []
+    for name, params in configs:
+        records = [results[(config_key(name, params), k)] for k in range(folds)]
+        accuracy = np.array([record["accuracy"] for record in records])
+        f1 = np.array([record["f1"] for record in records])
+        summary.append((accuracy.mean(), accuracy.std(), f1.mean(), name, params))
+    summary.sort(key=lambda item: -item[0])
+    return summary
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="model_search.py", description="Detector hyperparameter search")
+    parser.add_argument("--normal", default=train_ml_model.NORMAL_DATA)
+    parser.add_argument("--fault", default=train_ml_model.FAULT_DATA)
+    parser.add_argument("--folds", type=int, default=FOLDS)
+    parser.add_argument("--models", help="comma separated subset of " + ",".join(GRID))
+    parser.add_argument("--features", default="raw", choices=["raw", "derived", "trace"])
+    parser.add_argument("--grid", metavar="JSON", help="grid file replacing GRID (same layout)")
+    args = parser.parse_args(argv)
+
+    if args.features == "trace" and not all(features.traced(path) for path in (args.normal, args.fault)):
+        parser.error("--features trace needs traced inputs (collect with FI_TRACE)")
+
+    grid = GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+    if args.models:
+        names = args.models.split(",")
+        unknown = [name for name in names if name not in grid]
+        if unknown:
+            parser.error(f"unknown models {unknown} (grid has {list(grid)})")
+        grid = {name: grid[name] for name in names}
+
+    print("=" * 60)
+    print("Fault Injection Detection - Hyperparameter Search")
+    print("=" * 60)
+    summary = search([args.normal, args.fault], grid, args.folds, args.features)
+
+    print("\n" + "=" * 60)
+    print(f"{'Model':6s} {'Accuracy':>16s} {'F1':>7s}  Params")
+    print("=" * 60)
+    for accuracy, std, f1, name, params in summary:
+        print(f"{name:6s} {accuracy:8.2%} ± {std:5.2%} {f1:7.3f}  {params}")
+    if summary:
+        accuracy, _, _, name, params = summary[0]
+        print(f"\nBest: {name} {params} ({accuracy:.2%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,81 @@
+"""
+native_batch.py - Consume the batch mode of simple_injector_fast / simple_runner_fast
+
+One tool process performs many fork/ptrace/inject cycles itself and streams
+one CSV record per run, instead of the collector launching it 3000 times.
+"""
+
+import subprocess
+import threading
+
+import aiocampaign
+
+BATCH_FIELDS = ["run", "reg", "bit", "pc", "exit_code", "signal",
+                "cycles", "instructions", "cache_misses", "branch_misses"]
+HPC_FIELDS = ["cycles", "instructions", "cache_misses", "branch_misses"]
+
+
+def parse_record(line):
+    """
+    One batch record -> dict of ints, or {"run", "error"} for a spec the
+    tool rejected ("error,<run>,<reason>", fast_run.h); None for anything
+    else on stdout
+    """
+    parts = line.strip().split(',')
+    if parts[0] == "error" and len(parts) >= 3 and parts[1].lstrip("-").isdigit():
+        return {"run": int(parts[1]), "error": ",".join(parts[2:])}
+    if len(parts) != len(BATCH_FIELDS):
+        return None
+    try:
+        return dict(zip(BATCH_FIELDS, (int(p) for p in parts)))
+    except ValueError:
+        return None
+
+
+def _feed(pipe, specs):
+    try:
+        for spec in specs:
+            pipe.write(" ".join(str(v) for v in spec) + "\n")
+    finally:
+        pipe.close()
+
+
+def stream_batch(tool, target, runs=None, specs=None):
+    """
+    Run tool in batch mode and yield one record dict per run as it finishes.
+    Either runs (random faults) or specs: iterable of (run_id, reg, bit, delay_us)
+    """
+    if specs is not None:
+        args = [tool, "-s", target]
+    else:
+        args = [tool, "-c", str(runs), target]
+
+    proc = subprocess.Popen(args, stdin=subprocess.PIPE if specs is not None else subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, text=True)
+    # Feed specs from a thread: the tool streams records while it reads
+    feeder = None
+    if specs is not None:
+        feeder = threading.Thread(target=_feed, args=(proc.stdin, specs), daemon=True)
+        feeder.start()
+
+    try:
+        for line in proc.stdout:
+            record = parse_record(line)
+            if record is not None:
+                yield record
+    finally:
+        proc.stdout.close()
+        proc.wait()
+        if feeder is not None:
+            feeder.join()
+
+
+def hpc_row(record, label):
+    """Record -> sample row (aiocampaign.OUTCOME_HEADER columns + run metadata)"""
+    outcome = aiocampaign.classify_exit(record["exit_code"], record["signal"])
+    row = dict(zip(aiocampaign.OUTCOME_HEADER,
+                   [record[name] for name in HPC_FIELDS]
+                   + [label, outcome, record["exit_code"], record["signal"]]))
+    # pc where the tool stopped the target; the planned point (delay_us) comes from the task
+    row.update(run=record["run"], reg=record["reg"], bit=record["bit"], pc=record["pc"])
+    return row
@@ -0,0 +1,236 @@
+/*
+ * perf_trigger.h - Deterministic injection trigger without PTRACE_SINGLESTEP
+ *
+ * Arms a perf counter on the tracee that raises a signal on overflow:
+ *   - instruction trigger: PERF_COUNT_HW_INSTRUCTIONS, sample_period = N
+ *   - breakpoint trigger : hardware execute breakpoint at a PC (n-th hit)
+ * The tracee then runs at full speed and the tracer sees a signal-delivery
+ * stop right at the injection point. Overflow interrupts have a little skid,
+ * so the instruction trigger fires TRIGGER_SKID_MARGIN instructions early and
+ * the remainder is single-stepped: exact like the old loop, but only a few
+ * hundred ptrace round-trips instead of 10K-60K (or millions).
+ */
+
+#ifndef PERF_TRIGGER_H
+#define PERF_TRIGGER_H
+
+/* Needs F_SETOWN_EX / F_SETSIG: define _GNU_SOURCE before the first #include */
+
+#include <fcntl.h>
+#include <signal.h>
+#include <stdio.h>
+#include <string.h>
+#include <unistd.h>
+#include <linux/hw_breakpoint.h>
+#include <linux/perf_event.h>
+#include <sys/ioctl.h>
+#include <sys/ptrace.h>
+#include <sys/resource.h>
+#include <sys/syscall.h>
+#include <sys/types.h>
+#include <sys/wait.h>
+
+#define TRIGGER_SIGNAL SIGIO
+#define TRIGGER_SKID_MARGIN 256
+
+static inline int perf_event_open_sys(struct perf_event_attr *attr, pid_t pid,
+                                      int cpu, int group_fd, unsigned long flags) {
+    return syscall(__NR_perf_event_open, attr, pid, cpu, group_fd, flags);
+}
+
+/* Deliver the overflow signal to the tracee thread itself */
+static inline int arm_overflow(int fd, pid_t pid) {
+    struct f_owner_ex owner = { F_OWNER_TID, pid };
+
+    if (fcntl(fd, F_SETFL, O_ASYNC) < 0 ||
+        fcntl(fd, F_SETOWN_EX, &owner) < 0 ||
+        fcntl(fd, F_SETSIG, TRIGGER_SIGNAL) < 0)
+        return -1;
+    // Keep counting after the overflow, so read() includes the skid
+    ioctl(fd, PERF_EVENT_IOC_RESET, 0);
+    return ioctl(fd, PERF_EVENT_IOC_ENABLE, 0);
+}
+
+/* Counter that stops the tracee after `count` user-space instructions */
+static inline int arm_insn_trigger(pid_t pid, long count) {
+    struct perf_event_attr attr;
+    int fd;
+
+    memset(&attr, 0, sizeof(attr));
+    attr.size = sizeof(attr);
+    attr.type = PERF_TYPE_HARDWARE;
+    attr.config = PERF_COUNT_HW_INSTRUCTIONS;
+    attr.sample_period = count;
+    attr.disabled = 1;
+    attr.exclude_kernel = 1;
+    attr.exclude_hv = 1;
+    attr.wakeup_events = 1;
+
+    fd = perf_event_open_sys(&attr, pid, -1, -1, PERF_FLAG_FD_CLOEXEC);
+    if (fd < 0)
+        return -1;
+    if (arm_overflow(fd, pid) < 0) {
+        close(fd);
+        return -1;
+    }
+    return fd;
+}
+
+/* Hardware breakpoint that stops the tracee on the `hit`-th execution of pc */
+static inline int arm_bp_trigger(pid_t pid, unsigned long pc, long hit) {
+    struct perf_event_attr attr;
+    int fd;
+
+    memset(&attr, 0, sizeof(attr));
+    attr.size = sizeof(attr);
+    attr.type = PERF_TYPE_BREAKPOINT;
+    attr.bp_type = HW_BREAKPOINT_X;
+    attr.bp_addr = pc;
+    attr.bp_len = 4;  // one A64 instruction
+    attr.sample_period = hit;
+    attr.disabled = 1;
+    attr.exclude_kernel = 1;
+    attr.exclude_hv = 1;
+    attr.wakeup_events = 1;
+
+    fd = perf_event_open_sys(&attr, pid, -1, -1, PERF_FLAG_FD_CLOEXEC);
+    if (fd < 0)
+        return -1;
+    if (arm_overflow(fd, pid) < 0) {
+        close(fd);
+        return -1;
+    }
+    return fd;
+}
+
+/*
+ * Resume a stopped tracee until the armed trigger fires. Other signals are
+ * passed through. Returns 0 with the tracee stopped (trigger signal
+ * suppressed on the next resume), -1 if it exited first.
+ */
+static inline int run_to_trigger(pid_t pid) {
+    int status;
+    int sig = 0;
+
+    for (;;) {
+        ptrace(PTRACE_CONT, pid, 0, sig);
+        if (waitpid(pid, &status, 0) < 0 || !WIFSTOPPED(status))
+            return -1;
+        if (WSTOPSIG(status) == TRIGGER_SIGNAL)
+            return 0;
+        sig = (status >> 16) ? 0 : WSTOPSIG(status);
+    }
+}
+
+/* Single-step n instructions (the old slow path, now only for the tail) */
+static inline int singlestep_n(pid_t pid, long n) {
+    int status;
+
+    for (long i = 0; i < n; i++) {
+        ptrace(PTRACE_SINGLESTEP, pid, 0, 0);
+        if (waitpid(pid, &status, 0) < 0 || !WIFSTOPPED(status))
+            return -1;
+    }
+    return 0;
+}
+
+/*
+ * Advance a stopped tracee by `count` user-space instructions.
+ * Falls back to pure single-stepping when perf events are unavailable.
+ * Returns the instructions actually advanced: count, or more if the skid
+ * overshot TRIGGER_SKID_MARGIN (the tracee is already past the point: the
+ * caller relabels or drops the run); -1 if the tracee exited before the point.
+ */
+static inline long advance_instructions(pid_t pid, long count) {
+    long coarse = count - TRIGGER_SKID_MARGIN;
+    long long done = 0;
+    int fd;
+
+    if (coarse <= 0)
+        return singlestep_n(pid, count) < 0 ? -1 : count;
+
+    fd = arm_insn_trigger(pid, coarse);
+    if (fd < 0)
+        return singlestep_n(pid, count) < 0 ? -1 : count;
+
+    if (run_to_trigger(pid) < 0) {
+        close(fd);
+        return -1;
+    }
+    // Skid: the stop lands a few instructions after the overflow
+    if (read(fd, &done, sizeof(done)) != sizeof(done))
+        done = coarse;
+    close(fd);
+
+    if (done > count)
+        return done;
+    return singlestep_n(pid, count - done) < 0 ? -1 : count;
+}
+
+/*
+ * Stop a stopped tracee at the `hit`-th execution of pc.
+ * Returns 0 on success, -1 if unavailable or the tracee exited first.
+ */
+static inline int advance_to_pc(pid_t pid, unsigned long pc, long hit) {
+    int fd = arm_bp_trigger(pid, pc, hit);
+    int ret;
+
+    if (fd < 0)
+        return -1;
+    ret = run_to_trigger(pid);
+    close(fd);
+    return ret;
+}
+
+/*
+ * Let a stopped tracee run to the end, forwarding its signals (a fault's
+ * SIGSEGV really kills it). Returns its final wait status, or -1.
+ */
+static inline int finish_tracee(pid_t pid) {
+    int status;
+    int sig = 0;
+
+    for (;;) {
+        ptrace(PTRACE_CONT, pid, 0, sig);
+        if (waitpid(pid, &status, 0) < 0)
+            return -1;
+        if (WIFEXITED(status) || WIFSIGNALED(status))
+            return status;
+        sig = (status >> 16) ? 0 : WSTOPSIG(status);
+        if (sig == SIGSTOP || sig == TRIGGER_SIGNAL)
+            sig = 0;
+    }
+}
+
+/*
+ * Exit with the tracee's wait status, so the collector sees the target's
+ * exit code / terminating signal as the tool's own. No core dump.
+ */
+static inline void exit_like_tracee(int status) {
+    struct rlimit no_core = { 0, 0 };
+
+    if (status >= 0 && WIFSIGNALED(status)) {
+        setrlimit(RLIMIT_CORE, &no_core);
+        signal(WTERMSIG(status), SIG_DFL);
+        raise(WTERMSIG(status));
+    }
+    exit(status >= 0 && WIFEXITED(status) ? WEXITSTATUS(status) : 0);
+}
+
+/* Load address of the tracee's main executable (for PIE breakpoint offsets) */
+static inline unsigned long exe_load_base(pid_t pid) {
+    char path[64];
+    unsigned long base = 0;
+    FILE *maps;
+
+    snprintf(path, sizeof(path), "/proc/%d/maps", pid);
+    maps = fopen(path, "r");
+    if (maps) {
+        if (fscanf(maps, "%lx", &base) != 1)
+            base = 0;
+        fclose(maps);
+    }
+    return base;
+}
+
+#endif
@@ -0,0 +1,130 @@
+"""
+result_cache.py - On-disk memoization of fault-injection results
+
+Many campaign tasks repeat a fault: marvin / gdb-fault always break at
+main, so 3000 faults hit only 8 x 64 = 512 distinct (register, bit) specs,
+and a rerun of a campaign (FI_FRESH, another seed or --runs) repeats all of
+them. With --cache N (FI_CACHE), collect.py measures every distinct fault
+spec only N times and serves the other tasks with that spec from the cache:
+
+  key   : method, mode, label, phase config, content hash of target/tool,
+          counter backend, event set, trace interval (collect.py
+          Method.cache_context)
+  spec  : Method.cache_spec(task) - e.g. (reg, bit) for GDB, (point, reg,
+          bit) for native instruction triggers; None: never cached (no
+          flip, or a time-based trigger)
+
+The N measured runs of a spec are kept for counter variance and served
+round-robin by run id; served rows are stored with cached=1. Results go to
+data/result_cache/<key>.jsonl (one line per measured run), shared by every
+campaign with the same key.
+"""
+
+import collections
+import hashlib
+import json
+import os
+
+import fault_space
+
+CACHE_DIR = "data/result_cache"
+
+
+def cache_key(context, binaries):
+    """Key of everything besides the fault spec that a result depends on"""
+    context = dict(context, binaries={os.path.basename(path): fault_space.binary_hash(path)
+                                      for path in binaries})
+    return hashlib.sha256(json.dumps(context, sort_keys=True).encode()).hexdigest()
+
+
+def _spec_key(spec):
+    return json.dumps(list(spec))
+
+
+class ResultCache:
+    """
+    Measured rows per fault spec. spec(task) -> tuple or None;
+    run_id(task) -> run id of the task's rows; repeats: measured runs per spec
+    """
+
+    def __init__(self, key, spec, run_id, repeats, directory=CACHE_DIR):
+        self.spec = spec
+        self.run_id = run_id
+        self.repeats = repeats
+        self.path = os.path.join(directory, f"{key[:16]}.jsonl")
+        self.entries = collections.defaultdict(list)  # spec key -> [rows of one measured run]
+        self.served = self.measured = 0
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.entries[record["spec"]].append(record["rows"])
+        self.log = open(self.path, "a")
+
+    def close(self):
+        self.log.close()
+
+    def split(self, tasks):
+        """
+        (hits, misses, deferred): hits are served now, misses run now (up to
+        the repeats a spec still lacks), deferred wait for the misses' results
+        """
+        hits, misses, deferred = [], [], []
+        scheduled = collections.Counter()
+        for task in tasks:
+            spec = self.spec(task)
+            if spec is None:
+                misses.append(task)
+                continue
+            key = _spec_key(spec)
+            have = len(self.entries.get(key, ()))
+            if have >= self.repeats:
+                hits.append(task)
+            elif have + scheduled[key] < self.repeats:
+                scheduled[key] += 1
+                misses.append(task)
+            else:
+                deferred.append(task)
+        return hits, misses, deferred
+
+    def serve(self, task, **fields):
+        """Rows of a hit: one of the spec's measured runs, relabeled for this task"""
+        entries = self.entries[_spec_key(self.spec(task))]
+        run = self.run_id(task)
+        self.served += 1
+        return [dict(row, run=run, cached=1, **fields) for row in entries[run % len(entries)]]
+
+    def add(self, tasks, rows):
+        """Store the measured rows of finished tasks (marks them cached=0)"""
+        for task in tasks:
+            spec = self.spec(task)
+            if spec is None:
+                continue
+            run = self.run_id(task)
+            task_rows = [row for row in rows if row["run"] == run]
+            if not task_rows:
+                continue
+            for row in task_rows:
+                row["cached"] = 0
+            key = _spec_key(spec)
+            stored = [{name: value for name, value in row.items() if name not in ("run", "cached")}
+                      for row in task_rows]
+            self.entries[key].append(stored)
+            self.measured += 1
+            self.log.write(json.dumps({"spec": key, "rows": stored}) + "\n")
+        self.log.flush()
+
+    def unstable(self):
+        """Specs whose measured runs disagree on the outcome"""
+        return sum(1 for entries in self.entries.values()
+                   if len({rows[0]["outcome"] for rows in entries}) > 1)
+
+    def describe(self):
+        return (f"{self.path} ({len(self.entries)} specs cached), "
+                f"{self.repeats} measured run{'s' if self.repeats > 1 else ''} per spec")
+
+    def report(self):
+        return (f"Result cache: {self.served} served, {self.measured} measured, "
+                f"{self.unstable()} specs with differing outcomes")
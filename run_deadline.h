@@ -0,0 +1,82 @@
+/*
+ * run_deadline.h - Per-run deadline of the C tools
+ *
+ * Same deadline as the collector (FI_TIMEOUT seconds, default 10):
+ * deadline_start(pid) arms a one-shot ITIMER_REAL whose SIGALRM handler
+ * kills the run (async-signal-safe kill(), so there is no window between a
+ * check and a blocking wait4()). deadline_wait4() retries the interrupted
+ * wait and reaps the killed run; deadline_expired() then tells a hang from
+ * a real SIGKILL. Hung runs are reported with signal HANG_SIGNAL, which the
+ * collector classifies as "hang" (aiocampaign.classify_exit).
+ */
+
+#ifndef RUN_DEADLINE_H
+#define RUN_DEADLINE_H
+
+#include <errno.h>
+#include <signal.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/resource.h>
+#include <sys/time.h>
+#include <sys/types.h>
+#include <sys/wait.h>
+
+#define HANG_SIGNAL (-1)        // signal column of a run killed at the deadline
+#define DEFAULT_TIMEOUT_S 10.0  // aiocampaign.campaign_timeout()
+
+static volatile sig_atomic_t deadline_hit;
+static volatile pid_t deadline_pid;
+
+static void deadline_alarm(int sig) {
+    (void)sig;
+    deadline_hit = 1;
+    if (deadline_pid > 0)
+        kill(deadline_pid, SIGKILL);
+}
+
+static inline void deadline_start(pid_t pid) {
+    const char *env = getenv("FI_TIMEOUT");
+    double seconds = env ? atof(env) : DEFAULT_TIMEOUT_S;
+    struct sigaction sa;
+    struct itimerval timer;
+
+    if (seconds <= 0)
+        seconds = DEFAULT_TIMEOUT_S;
+    memset(&sa, 0, sizeof(sa));
+    sa.sa_handler = deadline_alarm;  // no SA_RESTART: blocked waits return EINTR
+    sigaction(SIGALRM, &sa, NULL);
+
+    memset(&timer, 0, sizeof(timer));
+    timer.it_value.tv_sec = (time_t)seconds;
+    timer.it_value.tv_usec = (suseconds_t)((seconds - (double)timer.it_value.tv_sec) * 1e6);
+    if (timer.it_value.tv_sec == 0 && timer.it_value.tv_usec == 0)
+        timer.it_value.tv_usec = 1;
+    deadline_hit = 0;
+    deadline_pid = pid;
+    setitimer(ITIMER_REAL, &timer, NULL);
+}
+
+static inline void deadline_stop(void) {
+    struct itimerval timer;
+
+    memset(&timer, 0, sizeof(timer));
+    setitimer(ITIMER_REAL, &timer, NULL);
+    deadline_pid = 0;
+}
+
+static inline int deadline_expired(void) {
+    return deadline_hit;
+}
+
+/* wait4() retried across the deadline's SIGALRM (by then the run is being killed) */
+static inline pid_t deadline_wait4(pid_t pid, int *status, int options, struct rusage *usage) {
+    pid_t r;
+
+    do {
+        r = wait4(pid, status, options, usage);
+    } while (r < 0 && errno == EINTR);
+    return r;
+}
+
+#endif
@@ -0,0 +1,547 @@
+"""
+sample_store.py - Binary columnar store for the collected HPC samples
+
+A store is a directory (data/<name>.store/) with one little-endian 8-byte
+column file per field and a meta.json holding the committed row count:
+
+  meta.json      {"version": 1, "rows": N, "columns": [[name, kind], ...], ...}
+  cycles.bin     counters            kind "u64" (uint64)
+  label.bin      integer metadata    kind "i64" (int64, -1 = unknown)
+  outcome.bin    categorical values  kind "cat" (uint64 codes into meta["categories"])
+
+Per-run counter traces (hpc.py trace mode) go to one extra file, trace.bin:
+int64 rows of meta["trace_columns"], one per interval, all runs back to back;
+a run's trace is trace_len rows starting at row trace_offset.
+
+Writers buffer rows and append them chunk by chunk (CHUNK_ROWS rows or
+FLUSH_SECONDS, whichever comes first): every column file is extended first,
+then meta.json is atomically replaced with the new row count and the run ids
+completed so far (campaign.py resumes from those). Readers memory-map the
+first `rows` records of each column - no parsing, and a torn chunk from a
+writer that died is simply not visible.
+
+Writing needs only the standard library (the collectors run on the Pi);
+reading uses numpy, read_frame() pandas. CSV import/export keeps the
+existing data/*.csv files usable:
+
+  python3 sample_store.py import data/faulty_basicmath_native.csv
+  python3 sample_store.py export data/faulty_basicmath_native.store
+  python3 sample_store.py info data/*.store
+"""
+
+import array
+import csv
+import json
+import os
+import sys
+import time
+
+VERSION = 1
+CHUNK_ROWS = 256
+FLUSH_SECONDS = 30
+STORE_SUFFIX = ".store"
+
+COUNTER_COLUMNS = ["cycles", "instructions", "cache_misses", "branch_misses"]
+# Positional row layout of the collectors (aiocampaign.OUTCOME_HEADER)
+DEFAULT_HEADER = COUNTER_COLUMNS + ["label", "outcome", "exit_code", "signal"]
+
+# column -> kind; per-run metadata after the counters
+COLUMNS = {
+    "cycles": "u64",
+    "instructions": "u64",
+    "cache_misses": "u64",
+    "branch_misses": "u64",
+    "label": "i64",       # method label (0 normal, 1 Marvin GDB, 3 ptrace native, ...)
+    "outcome": "cat",     # benign / SDC / crash / hang
+    "exit_code": "i64",
+    "signal": "i64",
+    "run": "i64",         # run / fault id
+    "reg": "i64",         # injected register (x<reg>)
+    "bit": "i64",         # flipped bit
+    "point": "i64",       # planned injection point (instructions, or delay_us in batch mode)
+    "pc": "u64",          # pc the batch tools stopped the target at (0: finished before)
+    "weight": "i64",      # fault-space sites the run stands for (--sites pruned)
+    "cached": "i64",      # 1: served from the result cache (--cache), 0: measured
+    "counted": "i64",     # 0: counters not measured (missing, not zero); -1: counted
+    "trace_offset": "i64",  # first trace.bin row of the run
+    "trace_len": "i64",     # trace intervals of the run
+    "benchmark": "cat",
+}
+
+TYPECODES = {"u64": "Q", "i64": "q", "cat": "Q"}
+DTYPES = {"u64": "<u8", "i64": "<i8", "cat": "<u8"}
+MISSING = {"u64": 0, "i64": -1, "cat": ""}
+
+
+def _column_file(path, name):
+    return os.path.join(path, f"{name}.bin")
+
+
+def _read_meta(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        return json.load(f)
+
+
+def _write_meta(path, meta, durable=False):
+    # Write-then-rename: readers see either the old or the new row count
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(path, "meta.json"))
+    if durable:
+        _fsync_dir(path)
+
+
+def _fsync_dir(path):
+    # Make the rename itself survive a power loss
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# ============================================
+# Writer (standard library only)
+# ============================================
+
+class SampleWriter:
+    """
+    Append rows to a store. Rows are lists in `header` order (like
+    csv.writer) or dicts; keyword metadata and `defaults` (e.g.
+    benchmark="basicmath") fill the other columns.
+
+    mode "w" starts a new store, "a" continues an existing one.
+    durable=True fsyncs every chunk (and the directory) before it is committed.
+    track_runs=True commits rows only together with a complete() call after
+    them, so a resumed campaign never holds a row without its run id.
+    kinds: kinds of columns outside COLUMNS (e.g. extra HPC events: "u64").
+    trace_columns: fields of one trace interval; rows then may carry a
+    "trace" entry (list of intervals) that goes to trace.bin.
+    """
+
+    def __init__(self, path, header=DEFAULT_HEADER, mode="w", chunk_rows=CHUNK_ROWS,
+                 durable=False, flush_seconds=FLUSH_SECONDS, track_runs=False, kinds=None,
+                 trace_columns=None, **defaults):
+        self.path = path
+        self.header = list(header)
+        self.chunk_rows = chunk_rows
+        self.durable = durable
+        self.flush_seconds = flush_seconds
+        self.track_runs = track_runs
+        self.extra_kinds = kinds or {}
+        self.defaults = defaults
+        self.pending = []
+        self.pending_completed = []
+        self.boundary = 0  # pending rows covered by complete() calls
+        self.last_flush = time.monotonic()
+        os.makedirs(path, exist_ok=True)
+
+        if mode == "a" and os.path.exists(os.path.join(path, "meta.json")):
+            self.meta = _read_meta(path)
+        else:
+            self.meta = {"version": VERSION, "rows": 0, "columns": [],
+                         "header": self.header, "present": [], "categories": {},
+                         "completed": []}
+            for name in os.listdir(path):
+                if name.endswith(".bin"):
+                    os.unlink(os.path.join(path, name))
+
+        self.completed = set(self.meta.setdefault("completed", []))
+        self.meta.setdefault("trace_rows", 0)
+        if trace_columns is not None:
+            self.meta["trace_columns"] = list(trace_columns)
+        self.trace_width = len(self.meta.get("trace_columns", []))
+        self.kinds = dict(self.meta["columns"])
+        self.files = {}
+        for name in list(COLUMNS) + self.header + list(defaults):
+            self._add_column(name)
+
+        # Drop whatever a crashed writer appended after the last commit
+        for name, kind in self.kinds.items():
+            self._file(name).truncate(self.meta["rows"] * 8)
+        if self.trace_width:
+            self._file("trace").truncate(self.meta["trace_rows"] * self.trace_width * 8)
+        _write_meta(self.path, self.meta, self.durable)
+
+    def _add_column(self, name, sample=None):
+        if name in self.kinds:
+            return
+        if name in COLUMNS:
+            kind = COLUMNS[name]
+        elif name in self.extra_kinds:
+            kind = self.extra_kinds[name]
+        else:
+            kind = "i64" if isinstance(sample, int) else "cat"
+        self.kinds[name] = kind
+        self.meta["columns"].append([name, kind])
+        # Existing rows of a new column hold the missing value
+        missing = self._encode(name, MISSING[kind])
+        values = array.array(TYPECODES[kind], [missing] * self.meta["rows"])
+        self._write(name, values)
+
+    def _file(self, name):
+        if name not in self.files:
+            self.files[name] = open(_column_file(self.path, name), "ab")
+        return self.files[name]
+
+    def _write(self, name, values):
+        if sys.byteorder != "little":
+            values.byteswap()
+        self._file(name).write(values.tobytes())
+
+    def _encode(self, name, value):
+        kind = self.kinds[name]
+        if kind == "cat":
+            categories = self.meta["categories"].setdefault(name, [""])
+            value = "" if value is None else str(value)
+            if value not in categories:
+                categories.append(value)
+            return categories.index(value)
+        if value is None or value == "":
+            return MISSING[kind]
+        return int(value)
+
+    def writerow(self, row, **meta):
+        values = dict(self.defaults)
+        if isinstance(row, dict):
+            values.update(row)
+        else:
+            values.update(zip(self.header, row))
+        values.update(meta)
+        self.pending.append(values)
+        self._maybe_flush()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def complete(self, run_id):
+        """Mark a run as done; committed together with the rows written before it"""
+        self.pending_completed.append(run_id)
+        self.boundary = len(self.pending)
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if (len(self.pending) >= self.chunk_rows
+                or time.monotonic() - self.last_flush >= self.flush_seconds):
+            self.flush()
+
+    def flush(self):
+        """Append the buffered chunk to every column, then commit the row count"""
+        self.last_flush = time.monotonic()
+        chunk = self.pending[:self.boundary] if self.track_runs else self.pending
+        if not chunk and not self.pending_completed:
+            return
+        trace = self._pack_traces(chunk)
+        for values in chunk:
+            for name, value in values.items():
+                self._add_column(name, value)
+                if name not in self.meta["present"]:
+                    self.meta["present"].append(name)
+
+        for name, kind in self.kinds.items():
+            missing = MISSING[kind]
+            column = array.array(TYPECODES[kind],
+                                 (self._encode(name, values.get(name, missing))
+                                  for values in chunk))
+            self._write(name, column)
+
+        if trace:
+            self._write("trace", trace)
+
+        for f in self.files.values():
+            f.flush()
+            if self.durable:
+                os.fsync(f.fileno())
+        self.meta["rows"] += len(chunk)
+        self.meta["trace_rows"] += len(trace) // max(1, self.trace_width)
+        self.pending = self.pending[len(chunk):]
+        self.boundary = 0
+        self.completed.update(self.pending_completed)
+        self.meta["completed"].extend(self.pending_completed)
+        self.pending_completed = []
+        _write_meta(self.path, self.meta, self.durable)
+
+    def _pack_traces(self, chunk):
+        """Move the chunk's "trace" entries into one int64 array (+ offset/len columns)"""
+        trace = array.array("q")
+        for values in chunk:
+            intervals = values.pop("trace", None)
+            if intervals is None or not self.trace_width:
+                continue
+            values["trace_offset"] = self.meta["trace_rows"] + len(trace) // self.trace_width
+            values["trace_len"] = len(intervals)
+            for interval in intervals:
+                trace.extend(interval[:self.trace_width])
+        return trace
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ============================================
+# Readers (numpy memmap)
+# ============================================
+
+def find(path):
+    """
+    Resolve a data path given with or without suffix ("data/x", "data/x.csv",
+    "data/x.store"). The store is preferred. Returns None if neither exists.
+    """
+    base = path[:-len(STORE_SUFFIX)] if path.endswith(STORE_SUFFIX) else path
+    base = base[:-4] if base.endswith(".csv") else base
+    for candidate in (base + STORE_SUFFIX, base + ".csv"):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def load(path, columns=None, decode=True):
+    """
+    Memory-map a store. Returns: dict column -> numpy array (read-only);
+    categorical columns are decoded to string arrays unless decode=False.
+    """
+    import numpy as np
+
+    meta = _read_meta(path)
+    rows = meta["rows"]
+    kinds = dict(meta["columns"])
+    data = {}
+    for name in (columns or kinds):
+        kind = kinds[name]
+        if rows:
+            values = np.memmap(_column_file(path, name), dtype=DTYPES[kind], mode="r", shape=(rows,))
+        else:
+            values = np.empty(0, dtype=DTYPES[kind])
+        if kind == "cat" and decode:
+            values = np.asarray(meta["categories"].get(name, [""]), dtype=object)[values]
+        data[name] = values
+    return data
+
+
+def load_traces(path):
+    """
+    Per-run traces of a store as a list of numpy arrays [intervals, fields]
+    (row order, empty for untraced runs) and the field names
+    """
+    import numpy as np
+
+    meta = _read_meta(path)
+    columns = meta.get("trace_columns", [])
+    if not columns or not meta.get("trace_rows"):
+        return [np.empty((0, len(columns)), dtype="<i8")] * meta["rows"], columns
+    data = np.memmap(_column_file(path, "trace"), dtype="<i8", mode="r",
+                     shape=(meta["trace_rows"], len(columns)))
+    spans = load(path, ["trace_offset", "trace_len"])
+    traces = [data[offset:offset + length] if length > 0 else data[:0]
+              for offset, length in zip(spans["trace_offset"], spans["trace_len"])]
+    return traces, columns
+
+
+def trace_columns(path):
+    """Fields of one trace interval of a store or CSV (see find()); [] if untraced"""
+    found = find(path)
+    if found is None:
+        raise FileNotFoundError(f"{path}: no {STORE_SUFFIX} or .csv data")
+    if found.endswith(".csv"):
+        return []
+    return list(_read_meta(found).get("trace_columns", []))
+
+
+def present_columns(path):
+    """Columns that were actually written (schema order), for frames and CSV"""
+    meta = _read_meta(path)
+    present = set(meta["present"])
+    return [name for name, _ in meta["columns"] if name in present]
+
+
+def read_frame(path, columns=None):
+    """pandas DataFrame from a store or a CSV (see find())"""
+    import pandas as pd
+
+    found = find(path)
+    if found is None:
+        raise FileNotFoundError(f"{path}: no {STORE_SUFFIX} or .csv data")
+    if found.endswith(".csv"):
+        return pd.read_csv(found, usecols=columns)
+    return pd.DataFrame(load(found, columns or present_columns(found)))
+
+
+def feature_columns(frame):
+    """
+    HPC counter columns of a frame from read_frame() (or of a list of column
+    names): the four generic counters plus any extra event columns (hpc.py
+    event sets)
+    """
+    metadata = set(COLUMNS) - set(COUNTER_COLUMNS)
+    return [name for name in getattr(frame, "columns", frame) if name not in metadata]
+
+
+def rows(path):
+    """Committed row count of a store"""
+    return _read_meta(path)["rows"]
+
+
+def content_hash(path):
+    """
+    sha256 of the committed data of a store or CSV (see find()), for cache
+    keys: same rows -> same hash, regardless of when they were written
+    """
+    import hashlib
+
+    found = find(path)
+    if found is None:
+        raise FileNotFoundError(f"{path}: no {STORE_SUFFIX} or .csv data")
+    digest = hashlib.sha256()
+    if found.endswith(".csv"):
+        files = [(found, None)]
+    else:
+        meta = _read_meta(found)
+        columns = present_columns(found)
+        digest.update(json.dumps([meta["rows"], meta["columns"], columns, meta.get("categories", {})],
+                                 sort_keys=True).encode())
+        files = [(_column_file(found, name), meta["rows"] * 8) for name in columns]
+        if meta.get("trace_rows"):
+            files.append((_column_file(found, "trace"), meta["trace_rows"] * len(meta["trace_columns"]) * 8))
+    for name, size in files:
+        with open(name, "rb") as f:
+            remaining = size
+            while remaining is None or remaining > 0:
+                block = f.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                if remaining is not None:
+                    remaining -= len(block)
+    return digest.hexdigest()
+
+
+def data_columns(path):
+    """Column names of a store or CSV (see find()) without reading its rows"""
+    found = find(path)
+    if found is None:
+        raise FileNotFoundError(f"{path}: no {STORE_SUFFIX} or .csv data")
+    if found.endswith(".csv"):
+        with open(found, newline="") as f:
+            return next(csv.reader(f), [])
+    return present_columns(found)
+
+
+def row_count(path):
+    """Row count of a store or CSV (see find()); streams a CSV once"""
+    found = find(path)
+    if found is None:
+        raise FileNotFoundError(f"{path}: no {STORE_SUFFIX} or .csv data")
+    if not found.endswith(".csv"):
+        return rows(found)
+    with open(found, newline="") as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+
+def iter_chunks(path, columns, chunk_rows=65536):
+    """
+    Yield dicts column -> numpy array of up to chunk_rows consecutive rows of
+    a store or CSV (see find()): memory stays at one chunk however large
+    the data set is
+    """
+    import numpy as np
+
+    found = find(path)
+    if found is None:
+        raise FileNotFoundError(f"{path}: no {STORE_SUFFIX} or .csv data")
+    if found.endswith(".csv"):
+        import pandas as pd
+        for frame in pd.read_csv(found, usecols=columns, chunksize=chunk_rows):
+            yield {name: frame[name].to_numpy() for name in columns}
+        return
+    data = load(found, columns)
+    for start in range(0, rows(found), chunk_rows):
+        yield {name: np.array(values[start:start + chunk_rows]) for name, values in data.items()}
+
+
+# ============================================
+# CSV import / export
+# ============================================
+
+def import_csv(csv_path, store_path=None, **defaults):
+    """Convert a collector CSV into a store (data/x.csv -> data/x.store)"""
+    if store_path is None:
+        store_path = csv_path[:-4] + STORE_SUFFIX if csv_path.endswith(".csv") else csv_path + STORE_SUFFIX
+    with open(csv_path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        with SampleWriter(store_path, header=header, **defaults) as writer:
+            for row in reader:
+                writer.writerow([_parse(value) for value in row])
+    return store_path
+
+
+def _parse(value):
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return int(float(value))
+        except ValueError:
+            return value
+
+
+def export_csv(store_path, csv_path=None, columns=None):
+    """Write a store back out as CSV (columns default to the written ones)"""
+    if csv_path is None:
+        csv_path = store_path[:-len(STORE_SUFFIX)] + ".csv"
+    meta = _read_meta(store_path)
+    columns = columns or present_columns(store_path)
+    kinds = dict(meta["columns"])
+
+    raw = {}
+    for name in columns:
+        values = array.array(TYPECODES[kinds[name]])
+        with open(_column_file(store_path, name), "rb") as f:
+            values.frombytes(f.read(meta["rows"] * 8))
+        if sys.byteorder != "little":
+            values.byteswap()
+        if kinds[name] == "cat":
+            categories = meta["categories"].get(name, [""])
+            values = [categories[code] for code in values]
+        raw[name] = values
+
+    with open(csv_path, "w", newline='') as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(columns)
+        writer.writerows(zip(*(raw[name] for name in columns)))
+    return csv_path
+
+
+def main(argv):
+    if len(argv) < 2 or argv[0] not in ("import", "export", "info"):
+        print("Usage: python3 sample_store.py import <file.csv> [...]")
+        print("       python3 sample_store.py export <dir.store> [...]")
+        print("       python3 sample_store.py info <dir.store> [...]")
+        return 1
+    command, paths = argv[0], argv[1:]
+    for path in paths:
+        if command == "import":
+            print(f"✓ {path} -> {import_csv(path)}")
+        elif command == "export":
+            print(f"✓ {path} -> {export_csv(path)}")
+        else:
+            print(f"{path}: {rows(path)} rows, columns: {', '.join(present_columns(path))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,9 +1,23 @@
 /* * simple_injector.c - A Native Fault Injector for ARM64 (Marvin Implementation)
  * Fixed header conflicts for Raspberry Pi OS
+ *
+ * Injection point (perf_trigger.h, no per-instruction PTRACE_SINGLESTEP):
+ *   default   : random 10K~60K instructions, exact (counter overflow + short tail)
+ *   -n <N>    : exactly N instructions (millions are fine)
+ *   -b <pc>   : hardware breakpoint at pc (PIE: offset into the executable),
+ *   -k <hit>  :   stop at its hit-th execution (default 1)
+ *   -p <pid>  : attach to a fork-server child instead of exec'ing a target
+ *
+ * Fault site: random x0~x7 / bit 0~63, or -r <reg> -x <bit> (fault_space.py live sites)
+ *   -S <seed> : seed of the random choices (default: time ^ pid)
+ *   -i <run>  : echo the fault on stderr once applied (collect.py fault plans):
+ *               "fi-echo <run> <point> <reg> <bit> <pc>", pc 0 = target finished first
  */
 
+ #define _GNU_SOURCE  // F_SETOWN_EX / F_SETSIG for perf_trigger.h
  #include <stdio.h>
  #include <stdlib.h>
+ #include <string.h>
  #include <sys/ptrace.h>
  #include <sys/types.h>
  #include <sys/wait.h>
@@ -12,6 +26,9 @@
  #include <unistd.h>
  #include <time.h>
  #include <linux/elf.h>
+
+ #include "perf_trigger.h"
+ #include "forkserver.h"
  
 
  struct user_pt_regs_arm64 {
@@ -20,48 +37,114 @@
      __u64 pc;
      __u64 pstate;
  };
+
+ /* Applied fault on stderr (stdout belongs to the target: SDC digest) */
+ static void echo_fault(long run_id, unsigned long bp_pc, long insns, int reg, int bit,
+                        unsigned long long pc) {
+     if (run_id < 0)
+         return;
+     if (bp_pc)
+         fprintf(stderr, "fi-echo %ld %#lx %d %d %#llx\n", run_id, bp_pc, reg, bit, pc);
+     else
+         fprintf(stderr, "fi-echo %ld %ld %d %d %#llx\n", run_id, insns, reg, bit, pc);
+     fflush(stderr);
+ }
+
+ static void usage(const char *prog) {
+     fprintf(stderr, "Usage: %s [-n insns | -b pc [-k hit]] [-r reg -x bit] [-S seed] [-i run] <target_program>\n", prog);
+     fprintf(stderr, "       %s [-n insns | -b pc [-k hit]] [-r reg -x bit] [-S seed] [-i run] -p <fork-server child pid>\n", prog);
+     exit(1);
+ }
  
  int main(int argc, char *argv[]) {
      pid_t target_pid;
+     pid_t attach_pid = 0;
      struct user_pt_regs_arm64 regs; 
      struct iovec iov;
+     long instructions_to_skip = 0;
+     unsigned long bp_pc = 0;
+     long bp_hit = 1;
+     int target_reg = -1, target_bit = -1;
+     unsigned int seed = time(NULL) ^ getpid();
+     long run_id = -1;
+     int opt;
      
-     if (argc < 2) {
-         fprintf(stderr, "Usage: %s <target_program>\n", argv[0]);
-         exit(1);
+     while ((opt = getopt(argc, argv, "n:b:k:p:r:x:S:i:")) != -1) {
+         switch (opt) {
+         case 'n': instructions_to_skip = atol(optarg); break;
+         case 'b': bp_pc = strtoul(optarg, NULL, 0); break;
+         case 'k': bp_hit = atol(optarg); break;
+         case 'p': attach_pid = atoi(optarg); break;
+         case 'r': target_reg = atoi(optarg); break;
+         case 'x': target_bit = atoi(optarg); break;
+         case 'S': seed = strtoul(optarg, NULL, 0); break;
+         case 'i': run_id = atol(optarg); break;
+         default: usage(argv[0]);
+         }
      }
+     if (!attach_pid && optind >= argc)
+         usage(argv[0]);
+     if (target_reg > 30 || target_bit > 63)
+         usage(argv[0]);
  
-     srand(time(NULL));
+     srand(seed);
  
-     // 1. Fork a child process
-     target_pid = fork();
+     // 1. Fork a child process (or attach to a fork-server copy)
+     if (attach_pid) {
+         target_pid = attach_pid;
+         if (attach_forkserver_child(target_pid) < 0) {
+             perror("attach");
+             exit(1);
+         }
+     } else {
+         target_pid = fork();
+     }
  
      if (target_pid == 0) {
          // [Child Process]
          ptrace(PTRACE_TRACEME, 0, NULL, NULL);
-         execl(argv[1], argv[1], NULL);
+         execl(argv[optind], argv[optind], NULL);
+         exit(1);
      } else {
          // [Parent Process]
          int status;
+         long reached;
          
          // Wait for child start
-         waitpid(target_pid, &status, 0);
+         if (!attach_pid)
+             waitpid(target_pid, &status, 0);
  
-         // Randomly skip instructions (더 깊숙이 들어가기)
-         long instructions_to_skip = 10000 + (rand() % 50000);  // 10K~60K
-         for(int i=0; i < instructions_to_skip; i++) {
-              ptrace(PTRACE_SINGLESTEP, target_pid, 0, 0);
-              waitpid(target_pid, &status, 0);
+         if (bp_pc) {
+             // Hardware breakpoint (PIE binaries: pc is an offset)
+             unsigned long base = exe_load_base(target_pid);
+             if (bp_pc < base)
+                 bp_pc += base;
+             reached = advance_to_pc(target_pid, bp_pc, bp_hit);
+         } else {
+             // Randomly skip instructions (더 깊숙이 들어가기)
+             if (instructions_to_skip <= 0)
+                 instructions_to_skip = 10000 + (rand() % 50000);  // 10K~60K
+             reached = advance_instructions(target_pid, instructions_to_skip);
+             if (reached > instructions_to_skip)
+                 instructions_to_skip = reached;  // skid overshot: echo the real point (run retried)
+         }
+ 
+         // 3. Inject Fault (랜덤 레지스터, unless -r / -x)
+         if (target_reg < 0)
+             target_reg = rand() % 8;  // x0~x7
+         if (target_bit < 0)
+             target_bit = rand() % 64;
+ 
+         if (reached < 0) {
+             echo_fault(run_id, bp_pc, instructions_to_skip, target_reg, target_bit, 0);
+             return 0;  // target finished before the injection point
          }
  
          // 2. Read Registers
          iov.iov_base = &regs;
          iov.iov_len = sizeof(regs);
          ptrace(PTRACE_GETREGSET, target_pid, NT_PRSTATUS, &iov);
- 
-         // 3. Inject Fault (랜덤 레지스터)
-         int target_reg = rand() % 8;  // x0~x7
-         int target_bit = rand() % 64; 
+         echo_fault(run_id, bp_pc, instructions_to_skip, target_reg, target_bit, regs.pc);
          
          // printf("[Marvin] Flipping x%d bit %d\n", target_reg, target_bit);
          regs.regs[target_reg] ^= (1ULL << target_bit);
@@ -69,10 +152,8 @@
          // 4. Write back
          ptrace(PTRACE_SETREGSET, target_pid, NT_PRSTATUS, &iov);
  
-         // 5. Continue
-         ptrace(PTRACE_CONT, target_pid, 0, 0);
-         
-         waitpid(target_pid, &status, 0);
+         // 5. Continue (the pending trigger signal is suppressed), report the outcome
+         exit_like_tracee(finish_tracee(target_pid));
      }
      return 0;
- }
\ No newline at end of file
+ }
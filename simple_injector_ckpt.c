@@ -0,0 +1,268 @@
+/*
+ * simple_injector_ckpt.c - Checkpoint-and-fork fault injector (ARM64)
+ *
+ * Runs the golden prefix ONCE: a single tracee is advanced to a sorted list
+ * of injection points (perf_trigger.h), and at each point a snapshot child is
+ * forked from it by injecting a clone() syscall. The child gets one bit flip
+ * and runs to completion, then the parent moves on to the next point.
+ * Campaign cost: O(prefix + faults x suffix) instead of O(faults x prefix).
+ *
+ * Usage: simple_injector_ckpt <target_program> < faults
+ *   faults : one "<instructions> <reg> <bit>" per line (any order)
+ * Output : one CSV line per fault on stdout
+ *   id,instructions,reg,bit,exit_code,signal,cycles,instructions,cache_misses,branch_misses
+ *   HPC values = golden prefix (parent counters at the snapshot) + suffix (child)
+ *   signal = -1 (HANG_SIGNAL): suffix killed at the FI_TIMEOUT deadline (hang)
+ *   perf unavailable: exit 1, unless FI_COUNTERS=rusage (stand-in values);
+ *   a fault whose suffix group cannot be opened, or whose point the trigger
+ *   skid overshot, gets no line
+ */
+
+#define _GNU_SOURCE  // F_SETOWN_EX / F_SETSIG for perf_trigger.h
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <fcntl.h>
+#include <signal.h>
+#include <sys/ptrace.h>
+#include <sys/types.h>
+#include <sys/wait.h>
+#include <sys/user.h>
+#include <sys/uio.h>
+#include <unistd.h>
+#include <linux/elf.h>
+
+#include "perf_trigger.h"
+#include "hpc_counters.h"
+#include "run_deadline.h"
+
+#define AARCH64_SVC_0 0xd4000001UL  // svc #0
+#define AARCH64_NR_CLONE 220
+
+struct user_pt_regs_arm64 {
+    __u64 regs[31];
+    __u64 sp;
+    __u64 pc;
+    __u64 pstate;
+};
+
+struct fault {
+    int id;
+    long point;
+    int reg;
+    int bit;
+};
+
+static int get_regs(pid_t pid, struct user_pt_regs_arm64 *regs) {
+    struct iovec iov = { regs, sizeof(*regs) };
+    return ptrace(PTRACE_GETREGSET, pid, NT_PRSTATUS, &iov);
+}
+
+static int set_regs(pid_t pid, struct user_pt_regs_arm64 *regs) {
+    struct iovec iov = { regs, sizeof(*regs) };
+    return ptrace(PTRACE_SETREGSET, pid, NT_PRSTATUS, &iov);
+}
+
+static int by_point(const void *a, const void *b) {
+    const struct fault *fa = a, *fb = b;
+    return (fa->point > fb->point) - (fa->point < fb->point);
+}
+
+/*
+ * Fork the stopped tracee by making it execute clone(SIGCHLD) at its PC.
+ * Both processes are restored to the exact pre-syscall state (registers and
+ * the patched instruction), so the child is a snapshot of the parent.
+ * Returns the child pid (stopped, traced by us) or -1.
+ */
+static pid_t snapshot_tracee(pid_t pid) {
+    struct user_pt_regs_arm64 saved, regs;
+    unsigned long msg;
+    long orig, patched;
+    pid_t child;
+    int status;
+
+    if (get_regs(pid, &saved) < 0)
+        return -1;
+
+    orig = ptrace(PTRACE_PEEKTEXT, pid, saved.pc, 0);
+    patched = (orig & ~0xffffffffL) | AARCH64_SVC_0;
+    ptrace(PTRACE_POKETEXT, pid, saved.pc, patched);
+
+    regs = saved;
+    regs.regs[8] = AARCH64_NR_CLONE;
+    regs.regs[0] = SIGCHLD;  // flags: plain fork
+    regs.regs[1] = 0;        // newsp
+    regs.regs[2] = 0;        // parent_tid
+    regs.regs[3] = 0;        // tls
+    regs.regs[4] = 0;        // child_tid
+    set_regs(pid, &regs);
+
+    // PTRACE_O_TRACEFORK: fork event stop, then the syscall completes
+    ptrace(PTRACE_SINGLESTEP, pid, 0, 0);
+    waitpid(pid, &status, 0);
+    if (!WIFSTOPPED(status) || (status >> 8) != (SIGTRAP | (PTRACE_EVENT_FORK << 8))) {
+        ptrace(PTRACE_POKETEXT, pid, saved.pc, orig);
+        set_regs(pid, &saved);
+        return -1;
+    }
+    ptrace(PTRACE_GETEVENTMSG, pid, 0, &msg);
+    child = (pid_t)msg;
+
+    ptrace(PTRACE_SINGLESTEP, pid, 0, 0);
+    waitpid(pid, &status, 0);
+    waitpid(child, &status, __WALL);  // auto-attached child starts stopped
+
+    // Undo the patch in both address spaces, rewind both to the snapshot PC
+    ptrace(PTRACE_POKETEXT, pid, saved.pc, orig);
+    ptrace(PTRACE_POKETEXT, child, saved.pc, orig);
+    set_regs(pid, &saved);
+    set_regs(child, &saved);
+    return child;
+}
+
+/*
+ * Let a traced child run to the end, forwarding its signals. Killed at the
+ * FI_TIMEOUT deadline (deadline_expired() afterwards: a hang).
+ */
+static int run_to_exit(pid_t pid, struct rusage *usage) {
+    int status = -1;
+    int sig = 0;
+
+    deadline_start(pid);
+    for (;;) {
+        ptrace(PTRACE_CONT, pid, 0, sig);
+        if (deadline_wait4(pid, &status, __WALL, usage) < 0) {
+            status = -1;
+            break;
+        }
+        if (WIFEXITED(status) || WIFSIGNALED(status))
+            break;
+        sig = (status >> 16) ? 0 : WSTOPSIG(status);
+        if (sig == SIGSTOP || sig == TRIGGER_SIGNAL)
+            sig = 0;
+    }
+    deadline_stop();
+    return status;
+}
+
+int main(int argc, char *argv[]) {
+    struct fault *faults = NULL;
+    size_t num_faults = 0, cap = 0;
+    long point;
+    int reg, bit;
+    pid_t target_pid;
+    struct hpc_group golden;
+    int have_golden;
+    long position = 0;
+    int status;
+
+    if (argc < 2) {
+        fprintf(stderr, "Usage: %s <target_program> < faults\n", argv[0]);
+        fprintf(stderr, "  faults: \"<instructions> <reg> <bit>\" per line\n");
+        exit(1);
+    }
+
+    while (scanf("%ld %d %d", &point, &reg, &bit) == 3) {
+        if (num_faults == cap) {
+            cap = cap ? cap * 2 : 256;
+            faults = realloc(faults, cap * sizeof(*faults));
+        }
+        faults[num_faults] = (struct fault){ (int)num_faults, point, reg, bit };
+        num_faults++;
+    }
+    qsort(faults, num_faults, sizeof(*faults), by_point);
+
+    target_pid = fork();
+
+    if (target_pid == 0) {
+        // [Child Process] (its output would mix with our CSV)
+        int devnull = open("/dev/null", O_WRONLY);
+        dup2(devnull, 1);
+        ptrace(PTRACE_TRACEME, 0, NULL, NULL);
+        execl(argv[1], argv[1], NULL);
+        exit(1);
+    }
+
+    // [Parent Process]
+    waitpid(target_pid, &status, 0);
+    ptrace(PTRACE_SETOPTIONS, target_pid, 0, PTRACE_O_TRACEFORK | PTRACE_O_EXITKILL);
+
+    // Golden prefix counters: no inherit, snapshots count for themselves
+    have_golden = hpc_open(&golden, target_pid, 0, 0) == 0;
+    if (!have_golden && !hpc_standin_selected()) {
+        fprintf(stderr, "perf counters unavailable (FI_COUNTERS=rusage for the stand-in)\n");
+        kill(target_pid, SIGKILL);
+        waitpid(target_pid, &status, 0);
+        exit(1);
+    }
+
+    for (size_t i = 0; i < num_faults; i++) {
+        struct fault *f = &faults[i];
+        struct user_pt_regs_arm64 regs;
+        struct hpc_group suffix;
+        struct rusage usage;
+        uint64_t prefix_values[HPC_NUM_EVENTS] = {0};
+        uint64_t values[HPC_NUM_EVENTS] = {0};
+        pid_t snap;
+
+        // 1. Advance the golden run to this injection point
+        if (f->point > position) {
+            long advanced = advance_instructions(target_pid, f->point - position);
+            if (advanced < 0)
+                break;  // golden run ended: remaining points are out of range
+            position += advanced;
+        }
+        if (f->point != position) {
+            // Trigger skid overshot this point: no line, the collector retries the fault
+            fprintf(stderr, "trigger overshot %ld (at %ld)\n", f->point, position);
+            continue;
+        }
+
+        // 2. Snapshot
+        if (have_golden)
+            hpc_read(&golden, prefix_values);
+        snap = snapshot_tracee(target_pid);
+        if (snap < 0) {
+            fprintf(stderr, "snapshot failed at %ld\n", f->point);
+            continue;
+        }
+
+        // 3. Inject Fault into the snapshot only
+        get_regs(snap, &regs);
+        regs.regs[f->reg] ^= (1ULL << f->bit);
+        set_regs(snap, &regs);
+
+        // 4. Run the suffix to completion
+        if (have_golden && hpc_open(&suffix, snap, 0, 1) < 0) {
+            fprintf(stderr, "perf counters unavailable for the snapshot at %ld\n", f->point);
+            kill(snap, SIGKILL);
+            waitpid(snap, &status, __WALL);
+            continue;
+        }
+        status = run_to_exit(snap, &usage);
+        if (have_golden) {
+            hpc_read(&suffix, values);
+            hpc_close(&suffix);
+            for (int e = 0; e < HPC_NUM_EVENTS; e++)
+                values[e] += prefix_values[e];
+        } else {
+            hpc_standin(&usage, values);
+        }
+
+        printf("%d,%ld,%d,%d,%d,%d,%llu,%llu,%llu,%llu\n",
+               f->id, f->point, f->reg, f->bit,
+               WIFEXITED(status) ? WEXITSTATUS(status) : -1,
+               deadline_expired() ? HANG_SIGNAL : WIFSIGNALED(status) ? WTERMSIG(status) : 0,
+               (unsigned long long)values[0], (unsigned long long)values[1],
+               (unsigned long long)values[2], (unsigned long long)values[3]);
+        fflush(stdout);
+    }
+
+    // Golden run: finish it off (its own outcome is not a sample)
+    kill(target_pid, SIGKILL);
+    waitpid(target_pid, &status, 0);
+    if (have_golden)
+        hpc_close(&golden);
+    free(faults);
+    return 0;
+}
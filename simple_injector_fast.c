@@ -1,77 +1,79 @@
 /* 
  * simple_injector_fast.c - Fast Fault Injector (NO SINGLESTEP)
  * Uses sleep-based timing instead of instruction counting
+ *
+ * Batch mode (many runs per process, one CSV record per run on stdout):
+ *   -S <seed> : seed of -c / single-run random choices (default: time ^ pid)
+ *   -c <N>  : N runs with random register / bit / delay
+ *   -s      : fault specs from stdin, "<run_id> <reg> <bit> <delay_us>" per line;
+ *             reg outside 0..30 or bit outside 0..63: "error,<run_id>,<reason>"
+ *   signal = -1 (HANG_SIGNAL): run killed at the FI_TIMEOUT deadline (hang)
+ *   perf counters unavailable: no record for the run (retried by the collector),
+ *             unless FI_COUNTERS=rusage selects the rusage stand-in values
+ *   record  : run,reg,bit,pc,exit_code,signal,cycles,instructions,cache_misses,branch_misses
+ *             (pc = 0: target finished before the injection point)
  */
 
 #include <stdio.h>
 #include <stdlib.h>
-#include <sys/ptrace.h>
-#include <sys/types.h>
-#include <sys/wait.h>
-#include <sys/user.h>
-#include <sys/uio.h> 
 #include <unistd.h>
 #include <time.h>
-#include <linux/elf.h>
 
-struct user_pt_regs_arm64 {
-    __u64 regs[31];
-    __u64 sp;
-    __u64 pc;
-    __u64 pstate;
-};
+#include "fast_run.h"
 
 int main(int argc, char *argv[]) {
-    pid_t target_pid;
-    struct user_pt_regs_arm64 regs; 
-    struct iovec iov;
+    struct run_result res;
+    pid_t attach_pid = 0;
+    long num_runs = 0;
+    int from_stdin = 0;
+    unsigned int seed = time(NULL) ^ getpid();
+    int opt;
     
-    if (argc < 2) {
+    while ((opt = getopt(argc, argv, "p:c:sS:")) != -1) {
+        switch (opt) {
+        case 'p': attach_pid = atoi(optarg); break;
+        case 'c': num_runs = atol(optarg); break;
+        case 's': from_stdin = 1; break;
+        case 'S': seed = strtoul(optarg, NULL, 0); break;
+        default: optind = argc + 1;
+        }
+    }
+    if (optind > argc || (!attach_pid && optind >= argc) ||
+        (attach_pid && (num_runs || from_stdin))) {
         fprintf(stderr, "Usage: %s <target_program>\n", argv[0]);
+        fprintf(stderr, "       %s -p <fork-server child pid>\n", argv[0]);
+        fprintf(stderr, "       %s [-S seed] -c <runs> <target_program>   (batch, random faults)\n", argv[0]);
+        fprintf(stderr, "       %s -s <target_program> < specs  (batch, \"run reg bit delay_us\")\n", argv[0]);
         exit(1);
     }
 
-    srand(time(NULL) ^ getpid());
-
-    // Fork a child process
-    target_pid = fork();
+    srand(seed);
 
-    if (target_pid == 0) {
-        // [Child Process]
-        ptrace(PTRACE_TRACEME, 0, NULL, NULL);
-        execl(argv[1], argv[1], NULL);
-        exit(1);
+    if (from_stdin) {
+        long run_id, delay_us;
+        int reg, bit;
+        while (scanf("%ld %d %d %ld", &run_id, &reg, &bit, &delay_us) == 4) {
+            // Same bounds as simple_injector's -r / -x check
+            if (reg < 0 || reg > FAST_MAX_REG || bit < 0 || bit > FAST_MAX_BIT) {
+                print_error(run_id, "reg must be 0..30 and bit 0..63");
+                continue;
+            }
+            run_one(argv[optind], 0, 1, reg, bit, delay_us, &res);
+            print_record(run_id, reg, bit, &res);
+        }
+    } else if (num_runs > 0) {
+        for (long run_id = 1; run_id <= num_runs; run_id++) {
+            int reg = rand() % 8;  // x0~x7
+            int bit = rand() % 64;
+            run_one(argv[optind], 0, 1, reg, bit, 10000 + (rand() % 90000), &res);
+            print_record(run_id, reg, bit, &res);
+        }
     } else {
-        // [Parent Process]
-        int status;
-        
-        // Wait for child start
-        waitpid(target_pid, &status, 0);
-        
-        // Let program run for random microseconds (10-100ms)
-        usleep(10000 + (rand() % 90000));
-        
-        // Stop the child
-        ptrace(PTRACE_INTERRUPT, target_pid, 0, 0);
-        waitpid(target_pid, &status, 0);
-        
-        // Read Registers
-        iov.iov_base = &regs;
-        iov.iov_len = sizeof(regs);
-        ptrace(PTRACE_GETREGSET, target_pid, NT_PRSTATUS, &iov);
-
-        // Inject Fault (random register)
-        int target_reg = rand() % 8;  // x0~x7
-        int target_bit = rand() % 64;
-        
-        regs.regs[target_reg] ^= (1ULL << target_bit);
-
-        // Write back
-        ptrace(PTRACE_SETREGSET, target_pid, NT_PRSTATUS, &iov);
-
-        // Continue
-        ptrace(PTRACE_CONT, target_pid, 0, 0);
-        waitpid(target_pid, &status, 0);
+        // Single run: random register, random 10-100ms
+        int reg = rand() % 8;  // x0~x7
+        int bit = rand() % 64;
+        run_one(attach_pid ? NULL : argv[optind], attach_pid, 0, reg, bit,
+                10000 + (rand() % 90000), &res);
     }
     return 0;
 }
@@ -1,10 +1,15 @@
 /* 
  * simple_runner.c - Run program with ptrace (NO fault injection)
  * For collecting normal HPC data with same overhead as fault injection
+ * Stops at the same kind of injection point as simple_injector (same options)
+ *   -S <seed> : seed of the random stop point (default: time ^ pid)
+ *   -i <run>  : echo the stop on stderr, "fi-echo <run> <point> -1 -1 <pc>"
  */
 
+#define _GNU_SOURCE  // F_SETOWN_EX / F_SETSIG for perf_trigger.h
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 #include <sys/ptrace.h>
 #include <sys/types.h>
 #include <sys/wait.h>
@@ -14,6 +19,9 @@
 #include <time.h>
 #include <linux/elf.h>
 
+#include "perf_trigger.h"
+#include "forkserver.h"
+
 struct user_pt_regs_arm64 {
     __u64 regs[31];
     __u64 sp;
@@ -21,48 +29,103 @@ struct user_pt_regs_arm64 {
     __u64 pstate;
 };
 
+/* Stop point on stderr, same record as simple_injector's (nothing flipped) */
+static void echo_stop(long run_id, unsigned long bp_pc, long insns, unsigned long long pc) {
+    if (run_id < 0)
+        return;
+    if (bp_pc)
+        fprintf(stderr, "fi-echo %ld %#lx -1 -1 %#llx\n", run_id, bp_pc, pc);
+    else
+        fprintf(stderr, "fi-echo %ld %ld -1 -1 %#llx\n", run_id, insns, pc);
+    fflush(stderr);
+}
+
+static void usage(const char *prog) {
+    fprintf(stderr, "Usage: %s [-n insns | -b pc [-k hit]] [-S seed] [-i run] <target_program>\n", prog);
+    fprintf(stderr, "       %s [-n insns | -b pc [-k hit]] [-S seed] [-i run] -p <fork-server child pid>\n", prog);
+    exit(1);
+}
+
 int main(int argc, char *argv[]) {
     pid_t target_pid;
+    pid_t attach_pid = 0;
     struct user_pt_regs_arm64 regs; 
     struct iovec iov;
+    long instructions_to_skip = 0;
+    unsigned long bp_pc = 0;
+    long bp_hit = 1;
+    unsigned int seed = time(NULL) ^ getpid();
+    long run_id = -1;
+    int opt;
     
-    if (argc < 2) {
-        fprintf(stderr, "Usage: %s <target_program>\n", argv[0]);
-        exit(1);
+    while ((opt = getopt(argc, argv, "n:b:k:p:S:i:")) != -1) {
+        switch (opt) {
+        case 'n': instructions_to_skip = atol(optarg); break;
+        case 'b': bp_pc = strtoul(optarg, NULL, 0); break;
+        case 'k': bp_hit = atol(optarg); break;
+        case 'p': attach_pid = atoi(optarg); break;
+        case 'S': seed = strtoul(optarg, NULL, 0); break;
+        case 'i': run_id = atol(optarg); break;
+        default: usage(argv[0]);
+        }
     }
+    if (!attach_pid && optind >= argc)
+        usage(argv[0]);
 
-    srand(time(NULL));
+    srand(seed);
 
-    // Fork a child process
-    target_pid = fork();
+    // Fork a child process (or attach to a fork-server copy)
+    if (attach_pid) {
+        target_pid = attach_pid;
+        if (attach_forkserver_child(target_pid) < 0) {
+            perror("attach");
+            exit(1);
+        }
+    } else {
+        target_pid = fork();
+    }
 
     if (target_pid == 0) {
         // [Child Process]
         ptrace(PTRACE_TRACEME, 0, NULL, NULL);
-        execl(argv[1], argv[1], NULL);
+        execl(argv[optind], argv[optind], NULL);
+        exit(1);
     } else {
         // [Parent Process]
         int status;
+        long reached;
         
         // Wait for child start
-        waitpid(target_pid, &status, 0);
+        if (!attach_pid)
+            waitpid(target_pid, &status, 0);
 
-        // Skip same number of instructions (for consistency)
-        long instructions_to_skip = 10000 + (rand() % 50000);  // 10K~60K
-        for(int i=0; i < instructions_to_skip; i++) {
-             ptrace(PTRACE_SINGLESTEP, target_pid, 0, 0);
-             waitpid(target_pid, &status, 0);
+        // Stop at the same kind of point (for consistency)
+        if (bp_pc) {
+            unsigned long base = exe_load_base(target_pid);
+            if (bp_pc < base)
+                bp_pc += base;
+            reached = advance_to_pc(target_pid, bp_pc, bp_hit);
+        } else {
+            if (instructions_to_skip <= 0)
+                instructions_to_skip = 10000 + (rand() % 50000);  // 10K~60K
+            reached = advance_instructions(target_pid, instructions_to_skip);
+            if (reached > instructions_to_skip)
+                instructions_to_skip = reached;  // skid overshot: echo the real point (run retried)
+        }
+
+        if (reached < 0) {
+            echo_stop(run_id, bp_pc, instructions_to_skip, 0);
+            return 0;  // target finished before the point
         }
 
         // Read Registers (but don't modify)
         iov.iov_base = &regs;
         iov.iov_len = sizeof(regs);
         ptrace(PTRACE_GETREGSET, target_pid, NT_PRSTATUS, &iov);
+        echo_stop(run_id, bp_pc, instructions_to_skip, regs.pc);
 
-        // NO FAULT INJECTION - just continue
-        ptrace(PTRACE_CONT, target_pid, 0, 0);
-        
-        waitpid(target_pid, &status, 0);
+        // NO FAULT INJECTION - just continue, report the outcome
+        exit_like_tracee(finish_tracee(target_pid));
     }
     return 0;
 }
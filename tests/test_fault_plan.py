@@ -0,0 +1,44 @@
+"""fault_plan.py: echo parsing and plan checks"""
+
+import random
+
+import fault_plan
+
+
+def test_parse_echo_last_line_wins():
+    text = ("fi-echo 3 12000 2 17 0x0\n"
+            "some target output\n"
+            "fi-echo 3 12345 2 17 0x4005f0\n")
+    assert fault_plan.parse_echo(text) == {"run": 3, "point": 12345, "reg": 2, "bit": 17, "pc": 0x4005f0}
+
+
+def test_parse_echo_breakpoint_point_in_hex():
+    assert fault_plan.parse_echo("fi-echo 7 0x1234 -1 -1 0x1234")["point"] == 0x1234
+
+
+def test_parse_echo_ignores_malformed():
+    assert fault_plan.parse_echo("") is None
+    assert fault_plan.parse_echo("fi-echo 1 2 3\nfi-echo x 1 2 3 4\n") is None
+    assert fault_plan.parse_echo("fi-echo 1 2 3 4 0\nfi-echo 1 2 3\n")["run"] == 1
+
+
+def test_matches():
+    task = (4, 20000, 1, 63)
+    assert fault_plan.matches(task, {"run": 4, "point": 20000, "reg": 1, "bit": 63, "pc": 0})
+    assert fault_plan.matches(task, {"run": 4, "reg": 1, "bit": 63})  # batch records carry no point
+    assert not fault_plan.matches(task, {"run": 4, "point": 20001, "reg": 1, "bit": 63})
+
+
+def test_uniform_is_seeded():
+    plan = fault_plan.uniform(random.Random(1), 50)
+    assert plan == fault_plan.uniform(random.Random(1), 50)
+    low, high = fault_plan.TRIGGERS["insn"]
+    assert all(low <= point <= high and 0 <= reg < 8 and 0 <= bit < 64 for _, point, reg, bit in plan)
+    runner = fault_plan.uniform(random.Random(1), 5, flip=False)
+    assert {(reg, bit) for _, _, reg, bit in runner} == {(fault_plan.NO_FLIP, fault_plan.NO_FLIP)}
+
+
+def test_tool_args_and_batch_spec():
+    assert fault_plan.tool_args((2, 15000, 3, 9)) == ["-i", "2", "-n", "15000", "-r", "3", "-x", "9"]
+    assert fault_plan.tool_args((2, 15000, -1, -1)) == ["-i", "2", "-n", "15000"]
+    assert fault_plan.batch_spec((2, 50000, 3, 9)) == (2, 3, 9, 50000)
@@ -0,0 +1,62 @@
+"""fault_space.py: ARM64 register use and def-use equivalence classes"""
+
+import pytest
+
+import fault_space
+
+NOP = 0xd503201f
+MOV_X0_1 = 0xd2800020       # movz x0, #1
+ADD_X1_X0_X0 = 0x8b000001   # add x1, x0, x0
+ADD_W1_W0_W0 = 0x0b000001   # add w1, w0, w0
+
+
+@pytest.mark.parametrize("word, reads, writes", [
+    (0x8b020020, {1: 64, 2: 64}, {0}),                  # add x0, x1, x2
+    (0x0b020020, {1: 32, 2: 32}, {0}),                  # add w0, w1, w2
+    (0x52800020, {}, {0}),                              # movz w0, #1
+    (0xf2a00020, {0: 64}, {0}),                         # movk x0, #1, lsl 16
+    (0xf9400020, {1: 64}, {0}),                         # ldr x0, [x1]
+    (0xd65f03c0, {30: 64}, set()),                      # ret
+    (0x94000000, {}, {30}),                             # bl
+    (0xd4000001, {r: 64 for r in (0, 1, 2, 3, 4, 5, 8)}, {0}),  # svc #0
+    (NOP, {}, set()),
+])
+def test_decode(word, reads, writes):
+    assert fault_space.decode(word) == (reads, writes)
+
+
+def index(insns, ended=True):
+    return {"points": [100 + i for i in range(len(insns))], "insns": insns, "tail": [], "ended": ended}
+
+
+def covered(groups, dead):
+    return sum(size * (hi - lo) for _, _, lo, hi, size in groups) + dead
+
+
+def test_write_ends_a_dead_class():
+    groups, dead = fault_space.equivalence_classes(index([NOP, MOV_X0_1, ADD_X1_X0_X0]), registers=[0])
+    assert dead == 2 * 64  # flips before the mov are overwritten
+    assert groups == [(102, 0, lo, hi, 1) for lo, hi in fault_space.BANDS]
+    assert covered(groups, dead) == 3 * 64
+
+
+def test_narrow_read_leaves_upper_bits():
+    groups, dead = fault_space.equivalence_classes(index([NOP, NOP, ADD_W1_W0_W0]), registers=[0])
+    assert groups == [(102, 0, lo, hi, 3) for lo, hi in fault_space.BANDS[:3]]
+    assert dead == 3 * 32  # bits 32..63 never read before the exit
+
+    groups, dead = fault_space.equivalence_classes(index([NOP, NOP, ADD_W1_W0_W0], ended=False), registers=[0])
+    assert dead == 0 and len(groups) == len(fault_space.BANDS)  # unknown after the trace: kept live
+
+
+def test_classes_cover_the_site_space():
+    insns = [NOP, ADD_X1_X0_X0, MOV_X0_1, ADD_W1_W0_W0, NOP, 0xd65f03c0]
+    registers = range(8)
+    groups, dead = fault_space.equivalence_classes(index(insns), registers=registers)
+    assert covered(groups, dead) == len(insns) * len(registers) * 64
+
+
+def test_liveness_matches_decode():
+    live = fault_space.liveness([MOV_X0_1, ADD_W1_W0_W0], ended=True)
+    assert live[1][0] == fault_space.WIDTH_CHARS[32]  # w0 read next
+    assert live[0][0] == fault_space.WIDTH_CHARS[0]   # written first: dead
@@ -0,0 +1,86 @@
+"""sample_store.py: writer/reader round trip, resume, missing values"""
+
+import csv
+import os
+
+import pytest
+
+import sample_store
+
+
+def read_csv(store):
+    path = sample_store.export_csv(store, os.path.join(os.path.dirname(store), "out.csv"))
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_round_trip(tmp_path):
+    store = str(tmp_path / "x.store")
+    with sample_store.SampleWriter(store, benchmark="basicmath") as writer:
+        writer.writerow([100, 50, 3, 1, 0, "benign", 0, 0], run=1)
+        writer.writerow({"cycles": 200, "instructions": 80, "label": 1, "outcome": "crash", "signal": 11}, run=2)
+
+    assert sample_store.rows(store) == 2
+    rows = read_csv(store)
+    assert rows[0]["cycles"] == "100" and rows[0]["outcome"] == "benign"
+    assert rows[1]["outcome"] == "crash" and rows[1]["signal"] == "11"
+    assert [row["benchmark"] for row in rows] == ["basicmath", "basicmath"]
+    assert [row["run"] for row in rows] == ["1", "2"]
+
+
+def test_missing_values(tmp_path):
+    store = str(tmp_path / "x.store")
+    with sample_store.SampleWriter(store) as writer:
+        writer.writerow({"label": 0, "outcome": "benign"})
+        writer.writerow({"cycles": 5, "label": 0, "reg": 3})
+
+    rows = read_csv(store)
+    assert rows[0]["cycles"] == str(sample_store.MISSING["u64"])
+    assert rows[0]["reg"] == str(sample_store.MISSING["i64"])
+    assert rows[1]["outcome"] == sample_store.MISSING["cat"]
+    assert "exit_code" not in rows[0]  # never written: not a present column
+
+
+def test_commit_and_resume(tmp_path):
+    store = str(tmp_path / "x.store")
+    writer = sample_store.SampleWriter(store, track_runs=True)
+    writer.writerow([1, 1, 1, 1, 0, "benign", 0, 0], run=1)
+    writer.complete(1)
+    writer.writerow([2, 2, 2, 2, 0, "benign", 0, 0], run=2)  # never completed
+    writer.close()
+
+    assert sample_store.rows(store) == 1
+    resumed = sample_store.SampleWriter(store, mode="a", track_runs=True)
+    assert resumed.completed == {1}
+    resumed.writerow([3, 3, 3, 3, 1, "SDC", 0, 0], run=2)
+    resumed.complete(2)
+    resumed.close()
+
+    rows = read_csv(store)
+    assert [(row["run"], row["cycles"]) for row in rows] == [("1", "1"), ("2", "3")]
+
+
+def test_torn_chunk_is_dropped(tmp_path):
+    store = str(tmp_path / "x.store")
+    with sample_store.SampleWriter(store) as writer:
+        writer.writerow([1, 1, 1, 1, 0, "benign", 0, 0])
+    with open(os.path.join(store, "cycles.bin"), "ab") as f:
+        f.write(b"\xff" * 12)  # a writer died mid-chunk
+
+    sample_store.SampleWriter(store, mode="a").close()
+    assert os.path.getsize(os.path.join(store, "cycles.bin")) == 8
+    assert read_csv(store)[0]["cycles"] == "1"
+
+
+def test_load_decodes_categories(tmp_path):
+    np = pytest.importorskip("numpy")
+    store = str(tmp_path / "x.store")
+    with sample_store.SampleWriter(store) as writer:
+        writer.writerow([1, 2, 3, 4, 0, "benign", 0, 0])
+        writer.writerow([5, 6, 7, 8, 1, "hang", -1, -1])
+
+    data = sample_store.load(store, ["cycles", "outcome", "signal"])
+    assert data["cycles"].dtype == np.dtype("<u8")
+    assert data["outcome"].tolist() == ["benign", "hang"]
+    assert data["signal"].tolist() == [0, -1]
+    assert sample_store.load(store, ["outcome"], decode=False)["outcome"].tolist() == [1, 2]
@@ -1,126 +1,591 @@
-import pandas as pd
+"""
+train_ml_model.py - Normal vs Fault 분류 모델 학습 (Random Forest, SVM)
+
+학습된 scaler와 모델은 입력 데이터 내용과 hyperparameter의 hash로 버전이 매겨진
+artifact(models/<key>.pkl)로 저장되고, models/detector.pkl이 최신 artifact를 가리킵니다.
+입력과 PARAMS가 그대로면 다시 학습하지 않고 artifact를 그대로 씁니다.
+
+  python3 train_ml_model.py                      # 학습 (또는 artifact 재사용) + 시각화
+  python3 train_ml_model.py --retrain --no-plot  # 항상 새로 학습, 그림 생략
+  python3 train_ml_model.py --predict data/test  # 저장된 모델로 예측만 (matplotlib 미사용)
+  python3 train_ml_model.py --svm approx         # SVM: auto (기본) / exact / approx
+  python3 train_ml_model.py --trainer stream     # out-of-core: auto (기본) / memory / stream
+  python3 train_ml_model.py --features derived   # IPC/MPKI + golden z-score (features.py)
+  python3 train_ml_model.py --features trace     # derived + trace window 통계 (FI_TRACE로 수집한 데이터)
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import pickle
+import sys
+import zlib
+
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.svm import SVC
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-print("=" * 60)
-print("Fault Injection Detection - ML Training")
-print("=" * 60)
-
-# 데이터 로드
-normal_df = pd.read_csv('data/ptrace_normal_basicmath.csv')
-fault_df = pd.read_csv('data/faulty_basicmath_native.csv')
-
-print(f"\n✓ Normal samples: {len(normal_df)}")
-print(f"✓ Fault samples: {len(fault_df)}")
-
-# 데이터 합치기
-df = pd.concat([normal_df, fault_df], ignore_index=True)
-
-# Features와 Labels
-X = df[['cycles', 'instructions', 'cache_misses', 'branch_misses']].values
-y = df['label'].values
-
-# Train/Test 분리
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
-
-print(f"\nTrain samples: {len(X_train)}")
-print(f"Test samples: {len(X_test)}")
-
-# 정규화
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-# 모델 1: Random Forest
-print("\n" + "=" * 60)
-print("Training Random Forest...")
-print("=" * 60)
-
-rf_model = RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10)
-rf_model.fit(X_train_scaled, y_train)
-
-rf_pred = rf_model.predict(X_test_scaled)
-rf_acc = accuracy_score(y_test, rf_pred)
-
-print(f"\n✓ Random Forest Accuracy: {rf_acc:.2%}")
-print("\nClassification Report:")
-print(classification_report(y_test, rf_pred, target_names=['Normal', 'Fault']))
-
-# 모델 2: SVM
-print("\n" + "=" * 60)
-print("Training SVM...")
-print("=" * 60)
-
-svm_model = SVC(kernel='rbf', C=1.0, gamma='scale', random_state=42)
-svm_model.fit(X_train_scaled, y_train)
-
-svm_pred = svm_model.predict(X_test_scaled)
-svm_acc = accuracy_score(y_test, svm_pred)
-
-print(f"\n✓ SVM Accuracy: {svm_acc:.2%}")
-print("\nClassification Report:")
-print(classification_report(y_test, svm_pred, target_names=['Normal', 'Fault']))
-
-# Feature Importance (Random Forest)
-feature_names = ['Cycles', 'Instructions', 'Cache Misses', 'Branch Misses']
-importances = rf_model.feature_importances_
-
-print("\n" + "=" * 60)
-print("Feature Importance (Random Forest)")
-print("=" * 60)
-for name, imp in zip(feature_names, importances):
-    print(f"{name:20s}: {imp:.4f}")
-
-# 시각화
-fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-
-# 1. Confusion Matrix - Random Forest
-cm_rf = confusion_matrix(y_test, rf_pred)
-sns.heatmap(cm_rf, annot=True, fmt='d', cmap='Blues', ax=axes[0, 0],
-            xticklabels=['Normal', 'Fault'], yticklabels=['Normal', 'Fault'])
-axes[0, 0].set_title(f'Random Forest\nAccuracy: {rf_acc:.2%}')
-axes[0, 0].set_ylabel('True Label')
-axes[0, 0].set_xlabel('Predicted Label')
-
-# 2. Confusion Matrix - SVM
-cm_svm = confusion_matrix(y_test, svm_pred)
-sns.heatmap(cm_svm, annot=True, fmt='d', cmap='Greens', ax=axes[0, 1],
-            xticklabels=['Normal', 'Fault'], yticklabels=['Normal', 'Fault'])
-axes[0, 1].set_title(f'SVM\nAccuracy: {svm_acc:.2%}')
-axes[0, 1].set_ylabel('True Label')
-axes[0, 1].set_xlabel('Predicted Label')
-
-# 3. Feature Importance
-axes[1, 0].barh(feature_names, importances, color='skyblue')
-axes[1, 0].set_xlabel('Importance')
-axes[1, 0].set_title('Feature Importance (Random Forest)')
-axes[1, 0].grid(True, alpha=0.3)
-
-# 4. Model Comparison
-models = ['Random Forest', 'SVM']
-accuracies = [rf_acc, svm_acc]
-axes[1, 1].bar(models, accuracies, color=['blue', 'green'], alpha=0.7)
-axes[1, 1].set_ylabel('Accuracy')
-axes[1, 1].set_title('Model Comparison')
-axes[1, 1].set_ylim([0, 1])
-axes[1, 1].grid(True, alpha=0.3, axis='y')
-for i, acc in enumerate(accuracies):
-    axes[1, 1].text(i, acc + 0.02, f'{acc:.2%}', ha='center', fontweight='bold')
-
-plt.tight_layout()
-plt.savefig('visualize/ml_training_results.png', dpi=300, bbox_inches='tight')
-print("\n✓ Saved: visualize/ml_training_results.png")
-
-print("\n" + "=" * 60)
-print("Training completed!")
-print("=" * 60)
-print(f"\nBest Model: {'Random Forest' if rf_acc > svm_acc else 'SVM'}")
-print(f"Best Accuracy: {max(rf_acc, svm_acc):.2%}")
+
+import features
+import sample_store
+
+NORMAL_DATA = 'data/ptrace_normal_basicmath'
+FAULT_DATA = 'data/faulty_basicmath_native'
+MODEL_DIR = "models"
+MODEL_FILE = "models/detector.pkl"  # 최신 artifact (detector.py가 로드)
+PLOT_FILE = 'visualize/ml_training_results.png'
+
+# 바뀌면 artifact key도 바뀜
+PARAMS = {
+    "test_size": 0.2,
+    "random_state": 42,
+    "rf": {"n_estimators": 100, "random_state": 42, "max_depth": 10},
+    "svm": {"kernel": 'rbf', "C": 1.0, "gamma": 'scale', "random_state": 42},
+    # train row가 svm_exact_max보다 많으면 (--svm auto) exact SVC 대신
+    # Nystroem RBF 근사 + SGD linear SVM (partial_fit, chunk 단위)
+    "svm_exact_max": 20000,
+    "svm_approx": {"n_components": 500, "alpha": 1e-4, "epochs": 5, "chunk_rows": 8192, "random_state": 42},
+    "svm_compare_rows": 5000,  # approx일 때 비교용 exact SVC의 train subsample
+    # 전체 row가 stream_min_rows보다 많으면 (--trainer auto) 데이터를 메모리에 올리지 않고
+    # stream_chunk_rows씩 읽어 학습 (hash split, running scaler, 증분 모델)
+    "stream_min_rows": 1000000,
+    "stream_chunk_rows": 65536,
+}
+
+
+# ============================================
+# Artifacts
+# ============================================
+
+def artifact_key(inputs, params=PARAMS):
+    """Content hash of the input data + hyperparameters (+ sklearn version)"""
+    import sklearn
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"params": params, "sklearn": sklearn.__version__}, sort_keys=True).encode())
+    for path in inputs:
+        digest.update(sample_store.content_hash(path).encode())
+    return digest.hexdigest()[:16]
+
+
+def artifact_path(key):
+    return os.path.join(MODEL_DIR, f"{key}.pkl")
+
+
+def load_artifact(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def save_artifact(artifact):
+    """Write models/<key>.pkl and point models/detector.pkl at it"""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    path = artifact_path(artifact["key"])
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(artifact, f)
+    os.replace(path + ".tmp", path)
+    link_latest(path)
+    return path
+
+
+def link_latest(path):
+    link = MODEL_FILE + ".tmp"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(path), link)
+    os.replace(link, MODEL_FILE)
+
+
+# ============================================
+# Training
+# ============================================
+
+def train_svm(X_train, y_train, X_test, params, mode="auto"):
+    """
+    Exact RBF SVC, or for large training sets an approximate one: Nystroem
+    features fitted on a subsample + SGDClassifier(hinge) trained with
+    partial_fit over chunks, so time and memory grow linearly with the rows.
+    Returns (model, test predictions); in approx mode the predictions also
+    hold an exact SVC trained on a subsample ("svm_exact"), for comparison.
+    """
+    from sklearn.kernel_approximation import Nystroem
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
+    from sklearn.svm import SVC
+
+    if mode == "auto":
+        mode = "approx" if len(X_train) > params["svm_exact_max"] else "exact"
+    if mode == "exact":
+        model = SVC(**params["svm"])
+        model.fit(X_train, y_train)
+        return model, {"svm": model.predict(X_test), "svm_mode": "exact"}
+
+    approx = params["svm_approx"]
+    rng = np.random.RandomState(approx["random_state"])
+    # gamma='scale' = 1 / (n_features * X.var()); 정규화된 X에서는 1 / n_features
+    sample = rng.choice(len(X_train), min(len(X_train), approx["n_components"] * 10), replace=False)
+    kernel = Nystroem(kernel='rbf', gamma=1.0 / X_train.shape[1],
+                      n_components=min(approx["n_components"], len(sample)), random_state=approx["random_state"])
+    kernel.fit(X_train[sample])
+    linear = SGDClassifier(loss='hinge', alpha=approx["alpha"], random_state=approx["random_state"])
+    classes = np.unique(y_train)
+    starts = np.arange(0, len(X_train), approx["chunk_rows"])
+    for epoch in range(approx["epochs"]):
+        for start in rng.permutation(starts):
+            end = start + approx["chunk_rows"]
+            linear.partial_fit(kernel.transform(X_train[start:end]), y_train[start:end], classes=classes)
+    model = Pipeline([("nystroem", kernel), ("sgd", linear)])
+
+    # 비교용 exact SVC (stratified subsample)
+    rows = min(params["svm_compare_rows"], len(X_train))
+    if rows < len(X_train):
+        X_sub, _, y_sub, _ = train_test_split(X_train, y_train, train_size=rows,
+                                              random_state=params["random_state"], stratify=y_train)
+    else:
+        X_sub, y_sub = X_train, y_train
+    exact = SVC(**params["svm"])
+    exact.fit(X_sub, y_sub)
+    return model, {"svm": model.predict(X_test), "svm_mode": "approx",
+                   "svm_exact": exact.predict(X_test), "svm_exact_rows": rows}
+
+
+def feature_plan(inputs, stage="raw"):
+    """
+    (raw columns to read, model feature names, golden baseline): raw = HPC
+    columns common to both inputs; derived = features.py ratios + z-scores
+    against the normal input (the golden runs); trace = derived + the
+    rolling-window trace statistics (features.TRACE_FEATURES, traced inputs)
+    """
+    fault_columns = set(sample_store.data_columns(inputs[1]))
+    raw = [name for name in sample_store.feature_columns(sample_store.data_columns(inputs[0]))
+           if name in fault_columns]
+    if stage == "raw":
+        return raw, raw, None
+    base = features.golden_baseline(inputs[0])
+    names = [name for name in features.derive({name: np.ones(1) for name in raw}, base)]
+    if stage == "trace":
+        names += features.TRACE_FEATURES
+    return raw, names, base
+
+
+def train(inputs, key, params=PARAMS):
+    """Fit scaler + models; returns the artifact (models, test split predictions)"""
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.ensemble import RandomForestClassifier
+
+    # 데이터 로드 (data/*.store 우선, 없으면 기존 CSV; 카운터 미측정 행 제외)
+    normal_df = features.counted_only(sample_store.read_frame(inputs[0]))
+    fault_df = features.counted_only(sample_store.read_frame(inputs[1]))
+
+    print(f"\n✓ Normal samples: {len(normal_df)}")
+    print(f"✓ Fault samples: {len(fault_df)}")
+
+    # 데이터 합치기
+    df = pd.concat([normal_df, fault_df], ignore_index=True)
+
+    # Features와 Labels (두 데이터에 공통인 HPC 이벤트 컬럼, 기본 4개)
+    raw_columns, feature_columns, base = feature_plan(inputs, params.get("features", "raw"))
+    if base is not None:
+        # derived features (data/x.features.npz cache, shared with visualize/)
+        derived = [features.load(path, golden=inputs[0]) for path in inputs]
+        for name in feature_columns:
+            df[name] = np.concatenate([values[name] for values in derived])
+    X = df[feature_columns].values
+    y = df['label'].values
+
+    # Train/Test 분리
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=params["test_size"], random_state=params["random_state"], stratify=y
+    )
+
+    print(f"\nTrain samples: {len(X_train)}")
+    print(f"Test samples: {len(X_test)}")
+
+    # 정규화
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    # 모델 1: Random Forest
+    print("\n" + "=" * 60)
+    print("Training Random Forest...")
+    print("=" * 60)
+
+    rf_model = RandomForestClassifier(**params["rf"])
+    rf_model.fit(X_train_scaled, y_train)
+
+    # 모델 2: SVM
+    print("\n" + "=" * 60)
+    print("Training SVM...")
+    print("=" * 60)
+
+    svm_model, svm_test = train_svm(X_train_scaled, y_train, X_test_scaled, params, params.get("svm_mode", "auto"))
+    print(f"SVM mode: {svm_test['svm_mode']}")
+
+    return {
+        "key": key,
+        "inputs": list(inputs),
+        "params": params,
+        "columns": raw_columns,
+        "features": feature_columns,
+        "baseline": base,
+        "normal_label": 0,
+        "scaler": scaler,
+        "models": {"rf": rf_model, "svm": svm_model},
+        "test": dict(svm_test, y=y_test, rf=rf_model.predict(X_test_scaled)),
+    }
+
+
+# ============================================
+# Out-of-core training
+# ============================================
+
+def hash_split(salt, start, count, test_size):
+    """
+    Test mask of rows [start, start + count) of one input: splitmix64 of
+    (row index + salt), so a row's side never changes as the data grows
+    and no index of the whole data set is needed
+    """
+    z = np.arange(start, start + count, dtype=np.uint64) + np.uint64(salt) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z ^= z >> np.uint64(31)
+    return (z % np.uint64(10000)) < np.uint64(int(test_size * 10000))
+
+
+def stream_chunks(inputs, counts, columns, chunk_rows, test_size, names=None, base=None):
+    """
+    Yield (X, y, test mask) chunks of about chunk_rows rows drawing from
+    every input (counts: its row count) in proportion to its size, so each
+    chunk holds both classes. X holds `names` (features.model_input of the
+    raw `columns`), or the raw columns themselves. Rows without measured
+    counters (features.counted_mask) are dropped after the hash split, so
+    the split of the other rows does not depend on them. Trace features come
+    from the features.load() cache (one array per input, not per chunk).
+    """
+    total = max(1, sum(counts))
+    streams = [sample_store.iter_chunks(path, features.input_columns(path, columns + ["label"]),
+                                        max(1, -(-chunk_rows * count // total)))
+               for path, count in zip(inputs, counts)]
+    salts = [zlib.crc32(os.path.basename(path).encode()) for path in inputs]
+    offsets = [0] * len(inputs)
+    traces = kept = None
+    if names and any(name in features.TRACE_FEATURES for name in names):
+        traces = [features.trace_arrays(path, golden=inputs[0]) for path in inputs]
+        kept = [0] * len(inputs)  # counted rows consumed (row order of features.load)
+    for parts in itertools.zip_longest(*streams):
+        X, y, test = [], [], []
+        for i, part in enumerate(parts):
+            if part is None:
+                continue
+            rows = len(part["label"])
+            split = hash_split(salts[i], offsets[i], rows, test_size)
+            offsets[i] += rows
+            keep = features.counted_mask(part)
+            if keep is not None:
+                part = {name: values[keep] for name, values in part.items()}
+                split = split[keep]
+            if traces is not None:
+                n = len(part["label"])
+                part = dict(part, **{name: values[kept[i]:kept[i] + n] for name, values in traces[i].items()})
+                kept[i] += n
+            X.append(features.model_input(part, names or columns, base))
+            y.append(part["label"].astype(np.int64))
+            test.append(split)
+        yield np.concatenate(X), np.concatenate(y), np.concatenate(test)
+
+
+def train_stream(inputs, key, params=PARAMS):
+    """
+    Out-of-core version of train(): several passes over the inputs, one
+    chunk in memory at a time.
+      pass 1   running scaler statistics (StandardScaler.partial_fit), the
+               Nystroem sample and the exact-SVC comparison subsample
+      epochs   RF grows a few trees per chunk (warm_start), the approximate
+               SVM is updated with partial_fit
+      last     predictions for the hash-split test rows
+    """
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.kernel_approximation import Nystroem
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.svm import SVC
+
+    raw_columns, feature_columns, base = feature_plan(inputs, params.get("features", "raw"))
+    counts = [features.counted_rows(path) for path in inputs]
+    chunk_rows = params["stream_chunk_rows"]
+    approx = params["svm_approx"]
+
+    def chunks():
+        return stream_chunks(inputs, counts, raw_columns, chunk_rows, params["test_size"], feature_columns, base)
+
+    print(f"\n✓ Normal samples: {counts[0]}")
+    print(f"✓ Fault samples: {counts[1]}")
+    print(f"Streaming in chunks of {chunk_rows} rows")
+
+    # Pass 1: scaler 통계, 샘플
+    scaler = StandardScaler()
+    kernel_rows = approx["n_components"] * 10
+    # chunk마다 조금씩 샘플링 (앞쪽 chunk에 치우치지 않게)
+    expected_chunks = max(1, -(-sum(counts) // chunk_rows))
+    kernel_take = max(1, -(-kernel_rows // expected_chunks))
+    compare_take = max(1, -(-params["svm_compare_rows"] // expected_chunks))
+    kernel_sample, compare_X, compare_y = [], [], []
+    n_train = n_test = n_chunks = 0
+    classes = set()
+    for X, y, test in chunks():
+        fit_rows = ~test
+        n_chunks += 1
+        n_train += int(fit_rows.sum())
+        n_test += int(test.sum())
+        if not fit_rows.any():
+            continue
+        scaler.partial_fit(X[fit_rows])
+        classes.update(np.unique(y[fit_rows]).tolist())
+        kernel_sample.append(X[fit_rows][:kernel_take])
+        compare_X.append(X[fit_rows][:compare_take])
+        compare_y.append(y[fit_rows][:compare_take])
+    classes = np.array(sorted(classes))
+
+    print(f"\nTrain samples: {n_train}")
+    print(f"Test samples: {n_test}")
+
+    kernel_sample = scaler.transform(np.concatenate(kernel_sample)[:kernel_rows])
+    kernel = Nystroem(kernel='rbf', gamma=1.0 / len(feature_columns),
+                      n_components=min(approx["n_components"], len(kernel_sample)),
+                      random_state=approx["random_state"])
+    kernel.fit(kernel_sample)
+    linear = SGDClassifier(loss='hinge', alpha=approx["alpha"], random_state=approx["random_state"])
+    trees = max(1, -(-params["rf"]["n_estimators"] // n_chunks))
+    rf_model = RandomForestClassifier(**dict(params["rf"], n_estimators=0), warm_start=True)
+
+    print("\n" + "=" * 60)
+    print("Training Random Forest + SVM (approx, streaming)...")
+    print("=" * 60)
+
+    for epoch in range(approx["epochs"]):
+        for X, y, test in chunks():
+            fit_rows = ~test
+            X_train, y_train = scaler.transform(X[fit_rows]), y[fit_rows]
+            if epoch == 0 and len(np.unique(y_train)) == len(classes):
+                rf_model.n_estimators += trees
+                rf_model.fit(X_train, y_train)
+            for start in range(0, len(X_train), approx["chunk_rows"]):
+                end = start + approx["chunk_rows"]
+                linear.partial_fit(kernel.transform(X_train[start:end]), y_train[start:end], classes=classes)
+    svm_model = Pipeline([("nystroem", kernel), ("sgd", linear)])
+
+    # 비교용 exact SVC (pass 1의 subsample)
+    compare_X = scaler.transform(np.concatenate(compare_X))
+    exact = SVC(**params["svm"])
+    exact.fit(compare_X, np.concatenate(compare_y))
+
+    # 마지막 pass: test rows 예측
+    test_y, rf_pred, svm_pred, exact_pred = [], [], [], []
+    for X, y, test in chunks():
+        if not test.any():
+            continue
+        X_test = scaler.transform(X[test])
+        test_y.append(y[test].astype(np.int8))
+        rf_pred.append(rf_model.predict(X_test).astype(np.int8))
+        svm_pred.append(svm_model.predict(X_test).astype(np.int8))
+        exact_pred.append(exact.predict(X_test).astype(np.int8))
+
+    return {
+        "key": key,
+        "inputs": list(inputs),
+        "params": params,
+        "columns": raw_columns,
+        "features": feature_columns,
+        "baseline": base,
+        "normal_label": 0,
+        "scaler": scaler,
+        "models": {"rf": rf_model, "svm": svm_model},
+        "test": {"y": np.concatenate(test_y), "rf": np.concatenate(rf_pred), "svm": np.concatenate(svm_pred),
+                 "svm_mode": "approx", "svm_exact": np.concatenate(exact_pred), "svm_exact_rows": len(compare_X)},
+    }
+
+
+def report(artifact):
+    """Accuracy / classification report / feature importance of the test split"""
+    from sklearn.metrics import classification_report, accuracy_score
+
+    test = artifact["test"]
+    accuracies = {}
+    for name, title in (("rf", "Random Forest"), ("svm", "SVM")):
+        accuracies[name] = accuracy_score(test["y"], test[name])
+        print(f"\n✓ {title} Accuracy: {accuracies[name]:.2%}")
+        print("\nClassification Report:")
+        print(classification_report(test["y"], test[name], target_names=['Normal', 'Fault']))
+    if "svm_exact" in test:
+        exact = accuracy_score(test["y"], test["svm_exact"])
+        print(f"\n✓ SVM approx Accuracy: {accuracies['svm']:.2%} "
+              f"(exact SVC on a {test['svm_exact_rows']}-row subsample: {exact:.2%})")
+
+    # Feature Importance (Random Forest)
+    feature_names = [name.replace('_', ' ').title() for name in artifact["features"]]
+    importances = artifact["models"]["rf"].feature_importances_
+
+    print("\n" + "=" * 60)
+    print("Feature Importance (Random Forest)")
+    print("=" * 60)
+    for name, imp in zip(feature_names, importances):
+        print(f"{name:20s}: {imp:.4f}")
+    return accuracies
+
+
+def plot(artifact, accuracies):
+    # 시각화 (plotting stack은 여기서만 import)
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from sklearn.metrics import confusion_matrix
+
+    test = artifact["test"]
+    rf_acc, svm_acc = accuracies["rf"], accuracies["svm"]
+    feature_names = [name.replace('_', ' ').title() for name in artifact["features"]]
+    importances = artifact["models"]["rf"].feature_importances_
+
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+
+    # 1. Confusion Matrix - Random Forest
+    cm_rf = confusion_matrix(test["y"], test["rf"])
+    sns.heatmap(cm_rf, annot=True, fmt='d', cmap='Blues', ax=axes[0, 0],
+                xticklabels=['Normal', 'Fault'], yticklabels=['Normal', 'Fault'])
+    axes[0, 0].set_title(f'Random Forest\nAccuracy: {rf_acc:.2%}')
+    axes[0, 0].set_ylabel('True Label')
+    axes[0, 0].set_xlabel('Predicted Label')
+
+    # 2. Confusion Matrix - SVM
+    cm_svm = confusion_matrix(test["y"], test["svm"])
+    sns.heatmap(cm_svm, annot=True, fmt='d', cmap='Greens', ax=axes[0, 1],
+                xticklabels=['Normal', 'Fault'], yticklabels=['Normal', 'Fault'])
+    axes[0, 1].set_title(f'SVM\nAccuracy: {svm_acc:.2%}')
+    axes[0, 1].set_ylabel('True Label')
+    axes[0, 1].set_xlabel('Predicted Label')
+
+    # 3. Feature Importance
+    axes[1, 0].barh(feature_names, importances, color='skyblue')
+    axes[1, 0].set_xlabel('Importance')
+    axes[1, 0].set_title('Feature Importance (Random Forest)')
+    axes[1, 0].grid(True, alpha=0.3)
+
+    # 4. Model Comparison
+    models = ['Random Forest', 'SVM']
+    values = [rf_acc, svm_acc]
+    axes[1, 1].bar(models, values, color=['blue', 'green'], alpha=0.7)
+    axes[1, 1].set_ylabel('Accuracy')
+    axes[1, 1].set_title('Model Comparison')
+    axes[1, 1].set_ylim([0, 1])
+    axes[1, 1].grid(True, alpha=0.3, axis='y')
+    for i, acc in enumerate(values):
+        axes[1, 1].text(i, acc + 0.02, f'{acc:.2%}', ha='center', fontweight='bold')
+
+    plt.tight_layout()
+    plt.savefig(PLOT_FILE, dpi=300, bbox_inches='tight')
+    print(f"\n✓ Saved: {PLOT_FILE}")
+
+
+# ============================================
+# Predict-only
+# ============================================
+
+def predict(path, model_file=MODEL_FILE, model="rf"):
+    """Score a data set with a saved artifact; accuracy if it has labels"""
+    artifact = load_artifact(model_file)
+    frame = features.counted_only(sample_store.read_frame(path))
+    columns = artifact.get("columns", artifact["features"])
+    missing = [name for name in columns if name not in frame.columns]
+    if missing:
+        print(f"Error: {path} lacks feature columns {missing}", file=sys.stderr)
+        return 1
+
+    data = {name: frame[name].values for name in columns + (["benchmark"] if "benchmark" in frame.columns else [])}
+    if any(name in features.TRACE_FEATURES for name in artifact["features"]):
+        data.update(features.trace_arrays(path))
+    X = artifact["scaler"].transform(features.model_input(data, artifact["features"], artifact.get("baseline")))
+    pred = artifact["models"][model].predict(X)
+    fault = int((pred != artifact["normal_label"]).sum())
+    print(f"✓ {path}: {len(pred)} samples, model {model} ({artifact.get('key', '?')})")
+    print(f"  Predicted Normal: {len(pred) - fault}, Fault: {fault}")
+    if "label" in frame.columns:
+        # Fault 라벨은 method마다 다르므로 (1, 2, 3, ...) normal/fault로만 비교
+        truth = frame['label'].values != artifact["normal_label"]
+        accuracy = float(((pred != artifact["normal_label"]) == truth).mean())
+        print(f"  Accuracy: {accuracy:.2%}")
+    return 0
+
+
+# ============================================
+# Main
+# ============================================
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="train_ml_model.py", description="Fault detection model training")
+    parser.add_argument("--normal", default=NORMAL_DATA, help="normal data (store or CSV)")
+    parser.add_argument("--fault", default=FAULT_DATA, help="fault data (store or CSV)")
+    parser.add_argument("--retrain", action="store_true", help="ignore a cached artifact")
+    parser.add_argument("--no-plot", action="store_true", help="skip the matplotlib figure")
+    parser.add_argument("--svm", default="auto", choices=["auto", "exact", "approx"],
+                        help="SVM trainer (auto: approx above PARAMS['svm_exact_max'] train rows)")
+    parser.add_argument("--trainer", default="auto", choices=["auto", "memory", "stream"],
+                        help="stream: out-of-core (auto: above PARAMS['stream_min_rows'] rows)")
+    parser.add_argument("--features", default="raw", choices=["raw", "derived", "trace"],
+                        help="derived: ratios + golden-run z-scores (features.py); trace: + trace windows")
+    parser.add_argument("--predict", metavar="DATA", help="only score DATA with the saved model")
+    parser.add_argument("--model-file", default=MODEL_FILE, help="artifact for --predict")
+    parser.add_argument("--model", default="rf", choices=["rf", "svm"], help="model for --predict")
+    args = parser.parse_args(argv)
+
+    if args.predict:
+        if not os.path.exists(args.model_file):
+            print(f"Error: {args.model_file} not found. Train first: python3 train_ml_model.py",
+                  file=sys.stderr)
+            return 1
+        return predict(args.predict, args.model_file, args.model)
+
+    print("=" * 60)
+    print("Fault Injection Detection - ML Training")
+    print("=" * 60)
+
+    inputs = [args.normal, args.fault]
+    if args.features == "trace" and not all(features.traced(path) for path in inputs):
+        parser.error("--features trace needs traced inputs (collect with FI_TRACE)")
+    trainer = args.trainer
+    if trainer == "auto":
+        rows = sum(sample_store.row_count(path) for path in inputs)
+        trainer = "stream" if rows > PARAMS["stream_min_rows"] else "memory"
+    if trainer == "stream" and args.svm == "exact":
+        parser.error("--trainer stream trains the approximate SVM (--svm exact needs --trainer memory)")
+    params = dict(PARAMS, svm_mode=args.svm, trainer=trainer, features=args.features)
+    key = artifact_key(inputs, params)
+    cached = artifact_path(key)
+    if os.path.exists(cached) and not args.retrain:
+        artifact = load_artifact(cached)
+        print(f"\n✓ Inputs and parameters unchanged: reusing {cached}")
+    else:
+        artifact = (train_stream if trainer == "stream" else train)(inputs, key, params)
+        cached = None
+
+    accuracies = report(artifact)
+    if cached is None:
+        print(f"\n✓ Saved: {save_artifact(artifact)} ({MODEL_FILE})")
+    elif os.path.realpath(MODEL_FILE) != os.path.realpath(cached):
+        link_latest(cached)
+
+    if not args.no_plot:
+        plot(artifact, accuracies)
+
+    rf_acc, svm_acc = accuracies["rf"], accuracies["svm"]
+    print("\n" + "=" * 60)
+    print("Training completed!")
+    print("=" * 60)
+    print(f"\nBest Model: {'Random Forest' if rf_acc > svm_acc else 'SVM'}")
+    print(f"Best Accuracy: {max(rf_acc, svm_acc):.2%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -5,6 +5,12 @@ import numpy as np
 from pathlib import Path
 from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
+import sys
+
+# sample_store.py lives in the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import sample_store
+import features
 
 # 한글 폰트 설정
 plt.rcParams['font.family'] = 'AppleGothic'
@@ -12,20 +18,24 @@ plt.rcParams['axes.unicode_minus'] = False
 
 # 데이터 로드
 data_files = {
-    "Normal": "data/software_normal_basicmath.csv",
-    "Fault": "data/software_fault_basicmath.csv"
+    "Normal": "data/software_normal_basicmath",
+    "Fault": "data/software_fault_basicmath"
 }
 
 # 모든 데이터 로드
 all_data = []
 for name, filepath in data_files.items():
-    if Path(filepath).exists():
-        df = pd.read_csv(filepath)
+    if sample_store.find(filepath):
+        df = features.counted_only(sample_store.read_frame(filepath))
+        # IPC, MPKI (data/x.features.npz 캐시, train_ml_model.py와 공유)
+        derived = features.load(filepath)
+        df['ipc'] = derived['ipc']
+        df['mpki'] = derived['mpki']
         df['method'] = name
         all_data.append(df)
         print(f"✓ {name}: {len(df)} samples")
     else:
-        print(f"✗ {filepath} not found")
+        print(f"✗ {filepath}(.store/.csv) not found")
 
 if len(all_data) == 0:
     print("\n❌ No data files found!")
@@ -76,16 +86,18 @@ for method in data_files.keys():
             f"{method_df['cycles'].mean():.0f}",
             f"{method_df['instructions'].mean():.0f}",
             f"{method_df['cache_misses'].mean():.0f}",
-            f"{method_df['branch_misses'].mean():.0f}"
+            f"{method_df['branch_misses'].mean():.0f}",
+            f"{method_df['ipc'].mean():.3f}",
+            f"{method_df['mpki'].mean():.2f}"
         ])
 
 ax.axis('tight')
 ax.axis('off')
 table = ax.table(cellText=stats_data,
-                colLabels=['Method', 'Count', 'Cycles', 'Instructions', 'Cache Miss', 'Branch Miss'],
+                colLabels=['Method', 'Count', 'Cycles', 'Instructions', 'Cache Miss', 'Branch Miss', 'IPC', 'MPKI'],
                 cellLoc='center',
                 loc='center',
-                colWidths=[0.25, 0.1, 0.15, 0.15, 0.15, 0.15])
+                colWidths=[0.17, 0.08, 0.13, 0.13, 0.13, 0.13, 0.1, 0.1])
 table.auto_set_font_size(False)
 table.set_fontsize(10)
 table.scale(1, 2.5)
@@ -5,14 +5,20 @@ import numpy as np
 from pathlib import Path
 from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
+import sys
+
+# sample_store.py lives in the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import features
+import sample_store
 
 # 한글 폰트 설정
 plt.rcParams['font.family'] = 'AppleGothic'
 plt.rcParams['axes.unicode_minus'] = False
 
 # 데이터 로드
-normal = pd.read_csv('data/software_normal_basicmath.csv')
-fault = pd.read_csv('data/software_fault_basicmath.csv')
+normal = features.counted_only(sample_store.read_frame('data/software_normal_basicmath'))
+fault = features.counted_only(sample_store.read_frame('data/software_fault_basicmath'))
 
 print(f"✓ Normal: {len(normal)} samples")
 print(f"✓ Fault: {len(fault)} samples")